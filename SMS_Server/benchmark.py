@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the SMS server against the pty modem emulator
+
+Runs the real SIM800CController and/or the Flask endpoints + SMS worker against
+modem_emulator.ModemEmulator and reports messages/minute, p50/p99 send latency
+and how many injected faults were recovered by retries.
+
+Usage:
+    python benchmark.py --messages 50 --send-delay 0.5 --error-rate 0.1
+    python benchmark.py --mode api --timeout-rate 0.05 --send-timeout 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from modem_emulator import ModemEmulator
+
+DEFAULT_TEXT = 'کد تایید شما در سامانه همای: 123456'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, failed, elapsed, emulator):
+    sent = len(latencies)
+    return {
+        'mode': name,
+        'messages': sent + failed,
+        'sent': sent,
+        'failed': failed,
+        'elapsed_seconds': round(elapsed, 2),
+        'messages_per_minute': round(sent / elapsed * 60, 1) if elapsed else 0,
+        'latency_p50_seconds': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'latency_p99_seconds': round(percentile(latencies, 0.99), 3) if latencies else None,
+        'injected_faults': emulator.faults,
+        'emulator': dict(emulator.stats),
+    }
+
+
+def quiet_logging():
+    """sim800/sms_server call basicConfig(INFO) on import; keep the benchmark output readable"""
+    for name in (None, 'sim800', 'sms_server'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def configure_controller(controller, emulator, args):
+    controller.port = emulator.port
+    controller.test_mode = False
+    controller.send_timeout = args.send_timeout
+    controller.retry_delay = args.retry_delay
+
+
+def bench_controller(args, emulator):
+    """Send messages one after another through SIM800CController.send_sms"""
+    from sim800 import SIM800CController
+    quiet_logging()
+
+    controller = SIM800CController()
+    configure_controller(controller, emulator, args)
+    if not controller.connect():
+        raise SystemExit(f"Could not connect to emulator on {emulator.port}")
+
+    latencies, failed, recovered = [], 0, 0
+    started = time.monotonic()
+    for index in range(args.messages):
+        faults_before = emulator.faults
+        sent_at = time.monotonic()
+        if controller.send_sms(args.phone, args.text):
+            latencies.append(time.monotonic() - sent_at)
+            recovered += emulator.faults > faults_before
+        else:
+            failed += 1
+    elapsed = time.monotonic() - started
+    controller.close()
+    result = summarize('controller', latencies, failed, elapsed, emulator)
+    result['recovered_messages'] = recovered
+    return result
+
+
+def bench_api(args, emulator):
+    """Queue messages through POST /api/v1/verify/send and wait for the worker to finish them"""
+    workdir = tempfile.mkdtemp(prefix='sms-benchmark-')
+    os.environ['FLASK_ENV'] = 'development'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ['SMS_JOB_RETRY_DELAY'] = str(int(args.retry_delay))
+
+    import sms_server
+    from models import SMSLog
+    quiet_logging()
+
+    configure_controller(sms_server.sim800c, emulator, args)
+    sms_server.initialize_database()
+    if not sms_server.sim800c.connect():
+        raise SystemExit(f"Could not connect to emulator on {emulator.port}")
+    sms_server.modem_monitor.start()
+    sms_server.sms_worker.poll_interval = 0.05
+    sms_server.sms_worker.start()
+
+    client = sms_server.app.test_client()
+    headers = {'X-API-Key': sms_server.app.config['API_KEY']}
+    request_latencies, job_ids = [], []
+    started = time.monotonic()
+    for index in range(args.messages):
+        sent_at = time.monotonic()
+        response = client.post('/api/v1/verify/send', json={'phone_number': args.phone, 'message': args.text},
+                               headers=headers)
+        request_latencies.append(time.monotonic() - sent_at)
+        if response.status_code != 202:
+            raise SystemExit(f"Unexpected response {response.status_code}: {response.get_json()}")
+        job_ids.append(response.get_json()['job_id'])
+
+    deadline = started + args.messages * (args.send_timeout + args.retry_delay) * 3 + 30
+    with sms_server.app.app_context():
+        while time.monotonic() < deadline:
+            pending = SMSLog.query.filter(
+                SMSLog.id.in_(job_ids),
+                SMSLog.status.in_([SMSLog.STATUS_QUEUED, SMSLog.STATUS_SENDING])
+            ).count()
+            if not pending:
+                break
+            time.sleep(0.1)
+        elapsed = time.monotonic() - started
+        jobs = SMSLog.query.filter(SMSLog.id.in_(job_ids)).all()
+
+    sms_server.sms_worker.stop(timeout=5)
+    sms_server.modem_monitor.stop(timeout=5)
+    sms_server.sim800c.close()
+
+    done = [job for job in jobs if job.status == SMSLog.STATUS_SUCCESS]
+    latencies = [(job.completed_at - job.created_at).total_seconds() for job in done]
+    # Faults retried inside SIM800CController.send_sms cannot be attributed to a job,
+    # so only worker-level retries are reported per message here
+    result = summarize('api', latencies, len(jobs) - len(done), elapsed, emulator)
+    result['retried_jobs'] = sum(1 for job in done if job.attempts > 1)
+    result['request_p50_seconds'] = round(percentile(request_latencies, 0.50), 4)
+    result['request_p99_seconds'] = round(percentile(request_latencies, 0.99), 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SMS sending against the SIM800C emulator')
+    parser.add_argument('--mode', choices=['controller', 'api', 'both'], default='both')
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--text', default=DEFAULT_TEXT)
+    parser.add_argument('--phone', default='+989120000000')
+    parser.add_argument('--send-delay', type=float, default=0.5, help='emulated network delay before +CMGS')
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--send-timeout', type=float, default=5.0, help='controller wait for +CMGS')
+    parser.add_argument('--retry-delay', type=float, default=0.5, help='controller/worker delay between retries')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for mode in (['controller', 'api'] if args.mode == 'both' else [args.mode]):
+        emulator = ModemEmulator(
+            send_delay=args.send_delay, jitter=args.jitter, error_rate=args.error_rate,
+            timeout_rate=args.timeout_rate, seed=args.seed
+        ).start()
+        try:
+            results.append((bench_controller if mode == 'controller' else bench_api)(args, emulator))
+        finally:
+            emulator.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"\n== {result['mode']} ==")
+        for key, value in result.items():
+            if key != 'mode':
+                print(f"  {key:22} {value}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
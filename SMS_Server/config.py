@@ -13,6 +13,10 @@ class Config:
     SIM800C_BAUDRATE = int(os.getenv('SIM800C_BAUDRATE', '115200'))
     MAX_VERIFICATION_ATTEMPTS = 3
     VERIFICATION_CODE_EXPIRY = 10  # minutes
+    SMS_JOB_MAX_ATTEMPTS = int(os.getenv('SMS_JOB_MAX_ATTEMPTS', '3'))
+    SMS_JOB_RETRY_DELAY = int(os.getenv('SMS_JOB_RETRY_DELAY', '10'))  # seconds
+    MODEM_MONITOR_INTERVAL = int(os.getenv('MODEM_MONITOR_INTERVAL', '30'))  # seconds
+    MODEM_MONITOR_HISTORY = int(os.getenv('MODEM_MONITOR_HISTORY', '240'))  # samples kept in memory
 
 class DevelopmentConfig(Config):
     """Development configuration"""
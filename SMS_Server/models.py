@@ -63,14 +63,37 @@ class SMSVerification(db.Model):
         }
 
 class SMSLog(db.Model):
-    """SMS sending log model"""
+    """SMS sending log model - each row is also a job in the persistent send queue"""
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    
     id = db.Column(db.Integer, primary_key=True)
     phone_number = db.Column(db.String(20), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), nullable=False)  # success, failed
+    status = db.Column(db.String(20), nullable=False, index=True)  # queued, sending, success, failed
     error_message = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    encoding = db.Column(db.String(8))  # GSM7, UCS2 (same labels as the Django sms app)
+    segments = db.Column(db.Integer)
+    encoded_size = db.Column(db.Integer)  # user-data octets over all segments
+    next_attempt_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
+    # Columns added after the first release; created on existing databases by ensure_schema()
+    ADDED_COLUMNS = {
+        'attempts': 'INTEGER NOT NULL DEFAULT 0',
+        'encoding': 'VARCHAR(8)',
+        'segments': 'INTEGER',
+        'encoded_size': 'INTEGER',
+        'next_attempt_at': 'DATETIME',
+        'started_at': 'DATETIME',
+        'completed_at': 'DATETIME',
+    }
+    
     @classmethod
     def log_sms(cls, phone_number, message, status, error_message=None):
         """Create SMS log entry"""
@@ -82,4 +105,107 @@ class SMSLog(db.Model):
         )
         db.session.add(log)
         db.session.commit()
-        return log 
\ No newline at end of file
+        return log
+    
+    @classmethod
+    def enqueue(cls, phone_number, message, encoding=None, segments=None, encoded_size=None):
+        """Add an SMS to the send queue with its segment estimate (see pdu.analyze)"""
+        log = cls(
+            phone_number=phone_number,
+            message=message,
+            status=cls.STATUS_QUEUED,
+            encoding=encoding,
+            segments=segments,
+            encoded_size=encoded_size
+        )
+        db.session.add(log)
+        db.session.commit()
+        return log
+    
+    @classmethod
+    def claim_next(cls):
+        """Take the oldest due job and mark it as sending"""
+        now = datetime.utcnow()
+        job = cls.query.filter(
+            cls.status == cls.STATUS_QUEUED,
+            db.or_(cls.next_attempt_at.is_(None), cls.next_attempt_at <= now)
+        ).order_by(cls.id).first()
+        if job is None:
+            return None
+        
+        claimed = cls.query.filter_by(id=job.id, status=cls.STATUS_QUEUED).update({
+            'status': cls.STATUS_SENDING,
+            'attempts': cls.attempts + 1,
+            'started_at': now,
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return None
+        db.session.refresh(job)
+        return job
+    
+    @classmethod
+    def recover_interrupted(cls):
+        """Requeue jobs left in 'sending' by a previous process"""
+        count = cls.query.filter_by(status=cls.STATUS_SENDING).update(
+            {'status': cls.STATUS_QUEUED}, synchronize_session=False
+        )
+        db.session.commit()
+        return count
+    
+    def mark_success(self):
+        self.status = self.STATUS_SUCCESS
+        self.error_message = None
+        self.completed_at = datetime.utcnow()
+        db.session.commit()
+    
+    def mark_failed(self, error_message, retry_at=None):
+        """Fail the job, or put it back in the queue until retry_at"""
+        self.error_message = error_message
+        if retry_at:
+            self.status = self.STATUS_QUEUED
+            self.next_attempt_at = retry_at
+        else:
+            self.status = self.STATUS_FAILED
+            self.completed_at = datetime.utcnow()
+        db.session.commit()
+    
+    def queue_position(self):
+        """Number of queued jobs ahead of this one"""
+        if self.status != self.STATUS_QUEUED:
+            return 0
+        return SMSLog.query.filter(SMSLog.status == self.STATUS_QUEUED, SMSLog.id < self.id).count()
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        def iso(value):
+            return value.isoformat() if value else None
+        
+        return {
+            'job_id': self.id,
+            'phone_number': self.phone_number,
+            'status': self.status,
+            'attempts': self.attempts,
+            'encoding': self.encoding,
+            'segments': self.segments,
+            'encoded_size': self.encoded_size,
+            'error_message': self.error_message,
+            'queue_position': self.queue_position(),
+            'next_attempt_at': iso(self.next_attempt_at),
+            'created_at': iso(self.created_at),
+            'started_at': iso(self.started_at),
+            'completed_at': iso(self.completed_at),
+        }
+
+
+def ensure_schema():
+    """Create tables and add columns missing from databases created by older versions"""
+    db.create_all()
+    table = SMSLog.__table__.name
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns(table)}
+    with db.engine.begin() as conn:
+        for name, ddl in SMSLog.ADDED_COLUMNS.items():
+            if name not in existing:
+                conn.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+        # Older versions stored lowercase encoding labels
+        conn.execute(db.text(f"UPDATE {table} SET encoding = UPPER(encoding) WHERE encoding IN ('gsm7', 'ucs2')"))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Pseudo-terminal SIM800C emulator
+
+Speaks the AT dialect used by sim800.py (AT, ATE, CPIN, CSQ, CREG, CMGF, CSCS,
+CPMS, CMGS prompt/PDU) on a pty, so SIM800CController can be exercised without
+hardware. +CMGS results are delayed like a real network, and ERRORs or lost
+responses can be injected at a configurable rate.
+
+Usage:
+    python modem_emulator.py --send-delay 2 --error-rate 0.1
+    SIM800C_PORT=/dev/pts/N python sms_server.py
+"""
+
+import argparse
+import os
+import random
+import re
+import select
+import threading
+import time
+import tty
+
+
+class ModemEmulator:
+    """SIM800C on the slave side of a pty; call start() and open .port with pyserial"""
+
+    def __init__(self, send_delay=1.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0,
+                 csq=20, registration=1, sim_ready=True, seed=None):
+        self.send_delay = send_delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.csq = csq
+        self.registration = registration
+        self.sim_ready = sim_ready
+        self.random = random.Random(seed)
+
+        self.echo = True
+        self.pdu_mode = False
+        self.stats = {'commands': 0, 'submitted': 0, 'accepted': 0, 'errors': 0, 'timeouts': 0, 'rejected': 0}
+
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+
+        self._buffer = b''
+        self._prompt_length = None  # declared AT+CMGS length while waiting for the payload
+        self._scheduled = []  # [(due, data)]
+        self._message_reference = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def faults(self):
+        return self.stats['errors'] + self.stats['timeouts']
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='modem-emulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def inject_urc(self, line, delay=0.0):
+        """Send an unsolicited result code (e.g. '+CMTI: "SM",1' or 'SMS Ready')"""
+        self._send(f'\r\n{line}\r\n', delay)
+
+    def _send(self, text, delay=0.0):
+        with self._lock:
+            self._scheduled.append((time.monotonic() + delay, text.encode()))
+            self._scheduled.sort(key=lambda item: item[0])
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                now = time.monotonic()
+                due = [data for when, data in self._scheduled if when <= now]
+                self._scheduled = [(when, data) for when, data in self._scheduled if when > now]
+                next_due = self._scheduled[0][0] - now if self._scheduled else 0.05
+            for data in due:
+                os.write(self.master_fd, data)
+
+            try:
+                readable, _, _ = select.select([self.master_fd], [], [], max(0.0, min(next_due, 0.05)))
+            except (OSError, ValueError):
+                break
+            if readable:
+                try:
+                    data = os.read(self.master_fd, 4096)
+                except OSError:
+                    break
+                self._feed(data)
+
+    def _feed(self, data):
+        self._buffer += data
+        while self._buffer:
+            if self._prompt_length is not None:
+                end = min((i for i in (self._buffer.find(b'\x1a'), self._buffer.find(b'\x1b')) if i >= 0), default=-1)
+                if end < 0:
+                    return
+                payload, terminator = self._buffer[:end], self._buffer[end:end + 1]
+                self._buffer = self._buffer[end + 1:]
+                self._handle_payload(payload.decode('ascii', errors='replace'), cancelled=terminator == b'\x1b')
+                continue
+
+            end = self._buffer.find(b'\r')
+            if end < 0:
+                return
+            line = self._buffer[:end].decode('ascii', errors='replace').strip()
+            self._buffer = self._buffer[end + 1:].lstrip(b'\n')
+            if line:
+                self._handle_command(line)
+
+    def _handle_command(self, command):
+        self.stats['commands'] += 1
+        echo = f'{command}\r' if self.echo else ''
+        upper = command.upper()
+
+        if upper in ('AT', 'ATE0', 'ATE1'):
+            if upper != 'AT':
+                self.echo = upper == 'ATE1'
+            self._send(f'{echo}\r\nOK\r\n')
+        elif upper == 'AT+CPIN?':
+            status = 'READY' if self.sim_ready else 'NOT INSERTED'
+            self._send(f'{echo}\r\n+CPIN: {status}\r\n\r\nOK\r\n')
+        elif upper == 'AT+CSQ':
+            self._send(f'{echo}\r\n+CSQ: {self.csq},0\r\n\r\nOK\r\n')
+        elif upper == 'AT+CREG?':
+            self._send(f'{echo}\r\n+CREG: 0,{self.registration}\r\n\r\nOK\r\n')
+        elif upper in ('AT+CMGF=0', 'AT+CMGF=1'):
+            self.pdu_mode = upper.endswith('0')
+            self._send(f'{echo}\r\nOK\r\n')
+        elif upper.startswith(('AT+CSCS=', 'AT+CPMS=', 'AT+CMEE=')):
+            self._send(f'{echo}\r\nOK\r\n')
+        elif upper.startswith('AT+CMGS='):
+            self._start_prompt(command[len('AT+CMGS='):], echo)
+        else:
+            self._send(f'{echo}\r\nERROR\r\n')
+
+    def _start_prompt(self, argument, echo):
+        if self.pdu_mode:
+            if not argument.isdigit():
+                self._send(f'{echo}\r\n+CMS ERROR: 304\r\n')
+                return
+            self._prompt_length = int(argument)
+        else:
+            if not re.fullmatch(r'"\+?\d+"', argument):
+                self._send(f'{echo}\r\n+CMS ERROR: 304\r\n')
+                return
+            self._prompt_length = 0
+        if not self.sim_ready or self.registration not in (1, 5):
+            self._prompt_length = None
+            self._send(f'{echo}\r\n+CMS ERROR: 330\r\n')
+            return
+        self._send(f'{echo}\r\n> ')
+
+    def _handle_payload(self, payload, cancelled):
+        declared, self._prompt_length = self._prompt_length, None
+        if cancelled:
+            self._send('\r\n')
+            return
+
+        self.stats['submitted'] += 1
+        if self.pdu_mode:
+            try:
+                octets = bytes.fromhex(payload.strip())
+                valid = len(octets) - octets[0] - 1 == declared
+            except (ValueError, IndexError):
+                valid = False
+            if not valid:
+                self.stats['rejected'] += 1
+                self._send('\r\n+CMS ERROR: 304\r\n')
+                return
+
+        delay = max(0.0, self.send_delay + self.random.uniform(-self.jitter, self.jitter))
+        roll = self.random.random()
+        if roll < self.timeout_rate:
+            self.stats['timeouts'] += 1  # the network never answers
+        elif roll < self.timeout_rate + self.error_rate:
+            self.stats['errors'] += 1
+            self._send('\r\n+CMS ERROR: 500\r\n', delay)
+        else:
+            self.stats['accepted'] += 1
+            self._message_reference = (self._message_reference + 1) % 256
+            self._send(f'\r\n+CMGS: {self._message_reference}\r\n\r\nOK\r\n', delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SIM800C emulator on a pseudo-terminal')
+    parser.add_argument('--send-delay', type=float, default=1.0, help='seconds before +CMGS is returned')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds added to send delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of sends answered with +CMS ERROR')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of sends that never get an answer')
+    parser.add_argument('--csq', type=int, default=20, help='AT+CSQ rssi value (0-31, 99 unknown)')
+    args = parser.parse_args()
+
+    emulator = ModemEmulator(
+        send_delay=args.send_delay, jitter=args.jitter, error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate, csq=args.csq
+    ).start()
+    print(f"SIM800C emulator listening on {emulator.port}")
+    print(f"Run the server with: SIM800C_PORT={emulator.port} python sms_server.py")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+        print(f"Stats: {emulator.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Background signal-quality and SIM-status monitor for the SMS server
+
+Samples AT+CSQ, AT+CPIN? and AT+CREG? on an interval, only while the modem is
+idle, and keeps the latest sample plus a short history in memory. Send and
+health paths read the cached values instead of querying the modem.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger('sms_server')
+
+
+class ModemMonitor:
+    """Caches modem status samples taken between jobs"""
+
+    def __init__(self, modem, interval=30, history_size=240, max_age=None):
+        self.modem = modem
+        self.interval = interval
+        # Samples older than this are not trusted by the send path
+        self.max_age = max_age or interval * 3
+        self.history = deque(maxlen=history_size)
+        self.latest = None
+        self.skipped_busy = 0
+        self._sampled_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='modem-monitor', daemon=True)
+        self._thread.start()
+        logger.info(f"Modem monitor started (every {self.interval}s)")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.age() is None or self.age() >= self.interval:
+                try:
+                    self.sample(blocking=False)
+                except Exception as e:
+                    logger.error(f"Modem monitor error: {e}")
+            self._stop.wait(min(self.interval, 5))
+
+    def age(self):
+        """Seconds since the latest sample, or None before the first one"""
+        sampled_at = self._sampled_at
+        return None if sampled_at is None else time.monotonic() - sampled_at
+
+    def sample_if_stale(self):
+        """Take a sample if the latest one is older than the interval (called by the worker between jobs)"""
+        age = self.age()
+        if age is None or age >= self.interval:
+            return self.sample()
+        return self.latest
+
+    def sample(self, blocking=True):
+        """
+        Query CPIN, CSQ and CREG in one pass while holding the modem.
+        With blocking=False the sample is skipped if a send is in progress.
+        """
+        if not self.modem.lock.acquire(blocking=blocking):
+            self.skipped_busy += 1
+            return None
+
+        started = time.monotonic()
+        try:
+            connected = self.modem.test_mode or self.modem.is_connected
+            record = {
+                'sampled_at': datetime.utcnow().isoformat(),
+                'connected': connected,
+                'sim_ready': None,
+                'signal_percent': 0,
+                'signal_status': 'Disconnected',
+                'registration': None,
+                'registration_status': 'Disconnected',
+            }
+            if connected:
+                record['sim_ready'] = bool(self.modem.check_sim_status())
+                record['signal_percent'], record['signal_status'] = self.modem.get_signal_strength()
+                record['registration'], record['registration_status'] = self.modem.get_network_registration()
+        finally:
+            self.modem.lock.release()
+
+        record['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+        with self._lock:
+            self.latest = record
+            self.history.append(record)
+            self._sampled_at = time.monotonic()
+        return record
+
+    def get_signal_strength(self):
+        """Cached (percent, status), or None when there is no recent connected sample"""
+        latest, age = self.latest, self.age()
+        if latest is None or not latest['connected'] or age is None or age > self.max_age:
+            return None
+        return latest['signal_percent'], latest['signal_status']
+
+    def snapshot(self):
+        """Latest sample with its age, in the shape used by /health and /api/v1/status"""
+        latest, age = self.latest, self.age()
+        if latest is None:
+            return {
+                'sim_status': 'Unknown',
+                'signal_strength': 'Unknown',
+                'network_registration': 'Unknown',
+                'sampled_at': None,
+                'sample_age_seconds': None,
+            }
+        return {
+            'sim_status': 'Ready' if latest['sim_ready'] else 'Not Ready',
+            'signal_strength': f"{latest['signal_percent']}% ({latest['signal_status']})",
+            'network_registration': latest['registration_status'],
+            'sampled_at': latest['sampled_at'],
+            'sample_age_seconds': round(age, 1),
+        }
+
+    def get_history(self, limit=None):
+        with self._lock:
+            samples = list(self.history)
+        return samples[-limit:] if limit else samples
@@ -0,0 +1,173 @@
+"""
+SMS-SUBMIT PDU encoder for the SIM800C (AT+CMGF=0)
+
+Each message is encoded as GSM 7-bit when every character is in the GSM 03.38
+alphabet, otherwise as UCS-2 (Persian text). Long messages are split into
+concatenated segments with an 8-bit reference UDH.
+"""
+
+import re
+
+GSM7 = 'GSM7'
+UCS2 = 'UCS2'
+
+# GSM 03.38 default alphabet; index = septet value (0x1B is the escape to the extension table)
+GSM7_BASIC = (
+    '@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !"#¤%&\'()*+,-./0123456789:;<=>?'
+    '¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà'
+)
+GSM7_EXTENDED = {
+    '\f': 0x0A, '^': 0x14, '{': 0x28, '}': 0x29, '\\': 0x2F,
+    '[': 0x3C, '~': 0x3D, ']': 0x3E, '|': 0x40, '€': 0x65,
+}
+GSM7_ESCAPE = 0x1B
+_GSM7_INDEX = {char: index for index, char in enumerate(GSM7_BASIC) if index != GSM7_ESCAPE}
+
+# Characters per segment: a single SMS, and each part of a concatenated SMS (6-octet UDH)
+SINGLE_LIMITS = {GSM7: 160, UCS2: 70}
+PART_LIMITS = {GSM7: 153, UCS2: 67}
+DATA_CODING = {GSM7: 0x00, UCS2: 0x08}
+MAX_SEGMENTS = 255
+
+
+class EncodedSMS:
+    """PDUs for one message, ready for AT+CMGS=<length> in PDU mode"""
+
+    def __init__(self, encoding, parts, encoded_size):
+        self.encoding = encoding
+        self.parts = parts  # [(pdu_hex, tpdu_length), ...]
+        self.encoded_size = encoded_size
+
+    @property
+    def segment_count(self):
+        return len(self.parts)
+
+    def summary(self):
+        return {
+            'encoding': self.encoding,
+            'segments': self.segment_count,
+            'encoded_size': self.encoded_size,
+        }
+
+
+def _gsm7_units(text):
+    """Septets per character, or None if the text needs UCS-2"""
+    units = []
+    for char in text:
+        if char in _GSM7_INDEX:
+            units.append((_GSM7_INDEX[char],))
+        elif char in GSM7_EXTENDED:
+            units.append((GSM7_ESCAPE, GSM7_EXTENDED[char]))
+        else:
+            return None
+    return units
+
+
+def _ucs2_units(text):
+    """UTF-16 code units per character (surrogate pairs stay together)"""
+    units = []
+    for char in text:
+        data = char.encode('utf-16-be')
+        units.append(tuple(int.from_bytes(data[i:i + 2], 'big') for i in range(0, len(data), 2)))
+    return units
+
+
+def _char_units(text):
+    units = _gsm7_units(text)
+    if units is not None:
+        return GSM7, units
+    return UCS2, _ucs2_units(text)
+
+
+def _split(units, encoding):
+    """Group per-character units into segments without splitting an escape or surrogate pair"""
+    total = sum(len(unit) for unit in units)
+    if total <= SINGLE_LIMITS[encoding]:
+        return [units]
+
+    limit = PART_LIMITS[encoding]
+    segments, current, size = [], [], 0
+    for unit in units:
+        if size + len(unit) > limit:
+            segments.append(current)
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit)
+    segments.append(current)
+    if len(segments) > MAX_SEGMENTS:
+        raise ValueError(f"Message needs {len(segments)} segments (maximum {MAX_SEGMENTS})")
+    return segments
+
+
+def analyze(text):
+    """Encoding, segment count and user-data size (octets, without UDH) of a message"""
+    encoding, units = _char_units(text)
+    segments = _split(units, encoding)
+    return {
+        'encoding': encoding,
+        'segments': len(segments),
+        'encoded_size': sum(_data_octets(segment, encoding) for segment in segments),
+    }
+
+
+def _data_octets(segment, encoding):
+    size = sum(len(unit) for unit in segment)
+    return (size * 7 + 7) // 8 if encoding == GSM7 else size * 2
+
+
+def pack_septets(septets, fill_bits=0):
+    """Pack 7-bit values LSB first, starting after fill_bits padding bits"""
+    packed = bytearray()
+    accumulator, bits = 0, fill_bits
+    for septet in septets:
+        accumulator |= septet << bits
+        bits += 7
+        while bits >= 8:
+            packed.append(accumulator & 0xFF)
+            accumulator >>= 8
+            bits -= 8
+    if bits:
+        packed.append(accumulator & 0xFF)
+    return bytes(packed)
+
+
+def encode_address(phone_number):
+    """TP-DA: digit count, type of address and swapped BCD digits"""
+    digits = re.sub(r'\D', '', phone_number)
+    type_of_address = 0x91 if phone_number.strip().startswith('+') else 0x81
+    padded = digits + 'F' if len(digits) % 2 else digits
+    swapped = ''.join(padded[i + 1] + padded[i] for i in range(0, len(padded), 2))
+    return f'{len(digits):02X}{type_of_address:02X}{swapped}'
+
+
+def _user_data(segment, encoding, udh):
+    if encoding == GSM7:
+        septets = [septet for unit in segment for septet in unit]
+        fill_bits = (7 - (len(udh) * 8) % 7) % 7
+        header_septets = (len(udh) * 8 + fill_bits) // 7
+        return header_septets + len(septets), udh + pack_septets(septets, fill_bits)
+
+    data = b''.join(code.to_bytes(2, 'big') for unit in segment for code in unit)
+    return len(udh) + len(data), udh + data
+
+
+def encode_sms(phone_number, text, reference=0):
+    """
+    Build SMS-SUBMIT PDUs (default SMSC, no validity period).
+    reference identifies the parts of one concatenated message and should change per message.
+    """
+    encoding, units = _char_units(text)
+    segments = _split(units, encoding)
+    total = len(segments)
+    address = encode_address(phone_number)
+
+    parts = []
+    for sequence, segment in enumerate(segments, start=1):
+        udh = bytes([0x05, 0x00, 0x03, reference & 0xFF, total, sequence]) if total > 1 else b''
+        first_octet = 0x01 | (0x40 if udh else 0)  # SMS-SUBMIT, UDHI when concatenated
+        udl, user_data = _user_data(segment, encoding, udh)
+        tpdu = f'{first_octet:02X}00{address}00{DATA_CODING[encoding]:02X}{udl:02X}{user_data.hex().upper()}'
+        parts.append(('00' + tpdu, len(tpdu) // 2))
+
+    encoded_size = sum(_data_octets(segment, encoding) for segment in segments)
+    return EncodedSMS(encoding, parts, encoded_size)
@@ -6,10 +6,13 @@ import serial
 import time
 import threading
 import logging
+from collections import deque
 from datetime import datetime
 import os
 import re
 
+from pdu import encode_sms
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,20 +24,225 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Final result codes that complete an AT command
+FINAL_OK = 'OK'
+FINAL_ERRORS = ('ERROR', '+CME ERROR', '+CMS ERROR', 'NO CARRIER', 'BUSY', 'NO ANSWER', 'NO DIALTONE')
+
+# Lines the module may send at any time; routed to the URC handler unless they
+# carry the information response of the command in flight (e.g. +CPIN: for AT+CPIN?)
+URC_PREFIXES = (
+    'RDY', 'Call Ready', 'SMS Ready', '+CPIN:', '+CFUN:', '+CREG:', '+CMTI:', '+CMT:', '+CDS:',
+    'RING', '+CLIP:', '+CUSD:', '*PSUTTZ', 'DST:', '+CTZV:', 'UNDER-VOLTAGE', 'OVER-VOLTAGE',
+    'NORMAL POWER DOWN',
+)
+
+
+# AT+CREG? <stat> values
+REGISTRATION_STATUS = {
+    0: 'Not registered',
+    1: 'Registered (home)',
+    2: 'Searching',
+    3: 'Registration denied',
+    4: 'Unknown',
+    5: 'Registered (roaming)',
+}
+
+
+class ATResponse:
+    """Outcome of a single AT command, completed by the reader thread"""
+
+    def __init__(self, command, expect_prompt=False, info_prefix=None):
+        self.command = command
+        self.expect_prompt = expect_prompt
+        self.info_prefix = info_prefix or self._info_prefix(command)
+        self.lines = []
+        self.final = None
+        self.prompt = False
+        self.error = None
+        self.started = time.monotonic()
+        self.elapsed = None
+        self.done = threading.Event()
+
+    @staticmethod
+    def _info_prefix(command):
+        match = re.match(r'AT([+*#][A-Z]+)', command or '', re.IGNORECASE)
+        return match.group(1).upper() + ':' if match else None
+
+    @property
+    def ok(self):
+        return self.final == FINAL_OK or self.prompt
+
+    @property
+    def timed_out(self):
+        return not self.done.is_set()
+
+    def finish(self, final=None, prompt=False, error=None):
+        self.final = final
+        self.prompt = prompt
+        self.error = error
+        self.elapsed = time.monotonic() - self.started
+        self.done.set()
+
+    def text(self):
+        """Response in the legacy string form returned by send_command"""
+        tail = [self.final] if self.final else (['>'] if self.prompt else [])
+        return '\r\n'.join(self.lines + tail)
+
+
+class ATEngine:
+    """
+    Event-driven AT command channel
+
+    A reader thread parses lines as they arrive. The command in flight completes
+    as soon as its final result code (OK, ERROR, +CME/+CMS ERROR) or the '>' prompt
+    is seen; unsolicited result codes are passed to urc_handler instead.
+    """
+
+    def __init__(self, serial_conn, urc_handler=None):
+        self.serial_conn = serial_conn
+        self.urc_handler = urc_handler
+        self.recent_urcs = deque(maxlen=50)
+        self.last_error = None
+        self._pending = None
+        self._pending_lock = threading.Lock()
+        self._buffer = b''
+        self._stop = threading.Event()
+        self._reader = None
+
+    @property
+    def alive(self):
+        return self._reader is not None and self._reader.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._reader = threading.Thread(target=self._run, name='sim800-at-reader', daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=2)
+
+    def execute(self, command, timeout=5, expect_prompt=False, payload=None, info_prefix=None):
+        """
+        Write a command (or raw payload) and wait until it completes or timeout expires.
+        The caller must hold the controller lock so only one command is in flight.
+        """
+        response = ATResponse(command, expect_prompt, info_prefix)
+        if not self.alive:
+            response.finish(error=self.last_error or 'AT reader is not running')
+            return response
+
+        with self._pending_lock:
+            self._pending = response
+        try:
+            data = payload if payload is not None else f"{command}\r".encode()
+            logger.debug(f"Sending: {command or repr(payload)}")
+            self.serial_conn.write(data)
+            if not response.done.wait(timeout):
+                response.elapsed = time.monotonic() - response.started
+                response.error = f"Timed out after {timeout}s"
+                logger.warning(f"AT command {command or 'payload'} timed out after {timeout}s")
+        except Exception as e:
+            response.finish(error=str(e))
+            logger.error(f"Command '{command}' failed: {e}")
+        finally:
+            with self._pending_lock:
+                self._pending = None
+
+        logger.debug(f"Response ({response.elapsed:.3f}s): {response.text()}")
+        return response
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+            except Exception as e:
+                self.last_error = f"Serial read failed: {e}"
+                logger.error(self.last_error)
+                break
+            if data:
+                self._feed(data)
+
+        with self._pending_lock:
+            pending = self._pending
+        if pending and not pending.done.is_set():
+            pending.finish(error=self.last_error or 'AT reader stopped')
+
+    def _feed(self, data):
+        self._buffer += data
+        while b'\n' in self._buffer:
+            raw, self._buffer = self._buffer.split(b'\n', 1)
+            self._handle_line(raw.decode('utf-8', errors='ignore').strip())
+
+        # The SMS prompt is "> " without a line terminator
+        if self._buffer.strip() == b'>':
+            with self._pending_lock:
+                pending = self._pending
+            if pending and pending.expect_prompt and not pending.done.is_set():
+                self._buffer = b''
+                pending.finish(prompt=True)
+
+    def _handle_line(self, line):
+        if not line:
+            return
+
+        with self._pending_lock:
+            pending = self._pending
+        if pending is None or pending.done.is_set():
+            self._dispatch_urc(line)
+            return
+
+        if pending.command and line == pending.command:
+            return  # command echo (ATE1)
+        if line == FINAL_OK or line.startswith(FINAL_ERRORS):
+            pending.finish(final=line)
+            return
+        if line.startswith(URC_PREFIXES) and not (pending.info_prefix and line.startswith(pending.info_prefix)):
+            self._dispatch_urc(line)
+            return
+        pending.lines.append(line)
+
+    def _dispatch_urc(self, line):
+        self.recent_urcs.append((datetime.utcnow(), line))
+        logger.info(f"URC: {line}")
+        if self.urc_handler:
+            try:
+                self.urc_handler(line)
+            except Exception as e:
+                logger.error(f"URC handler error for '{line}': {e}")
+
+
 class SIM800CController:
     def __init__(self, port="/dev/ttyAMA0", baudrate=115200, test_mode=False):
         self.port = port
         self.baudrate = baudrate
         self.serial_conn = None
-        self.lock = threading.Lock()
+        self.engine = None
+        # Reentrant: a send holds the modem across several commands (see send_sms)
+        self.lock = threading.RLock()
         self.is_connected = False
+        self.last_error = None
         self.test_mode = test_mode or os.getenv('SMS_TEST_MODE', 'false').lower() == 'true'
         self.max_retries = 3
         self.connection_attempts = 0
         self.max_connection_attempts = 3
+        # Upper bounds only - commands complete as soon as the module answers
+        self.command_timeout = float(os.getenv('SIM800C_COMMAND_TIMEOUT', '5'))
+        self.send_timeout = float(os.getenv('SIM800C_SEND_TIMEOUT', '60'))
+        self.retry_delay = float(os.getenv('SIM800C_RETRY_DELAY', '2'))
+        self.needs_init = True
+        # TP-MR style reference shared by the parts of one concatenated message
+        self.concat_reference = 0
+        # Optional ModemMonitor whose cached signal sample replaces a live AT+CSQ per send
+        self.monitor = None
         
     def connect(self):
         """Establish connection to SIM800C with retry logic"""
+        with self.lock:
+            return self._connect()
+    
+    def _connect(self):
         if self.test_mode:
             logger.info("Running in test mode - simulating SIM800C connection")
             self.is_connected = True
@@ -47,19 +255,13 @@ class SIM800CController:
             
             try:
                 # Close any existing connection
-                if self.serial_conn:
-                    try:
-                        self.serial_conn.close()
-                    except:
-                        pass
-                    self.serial_conn = None
-                    self.is_connected = False
+                self._close_serial()
                 
-                # Create new connection
+                # Create new connection; the short read timeout keeps the reader thread responsive
                 self.serial_conn = serial.Serial(
                     port=self.port,
                     baudrate=self.baudrate,
-                    timeout=3,
+                    timeout=0.1,
                     bytesize=serial.EIGHTBITS,
                     parity=serial.PARITY_NONE,
                     stopbits=serial.STOPBITS_ONE,
@@ -67,11 +269,11 @@ class SIM800CController:
                     rtscts=False,
                     dsrdtr=False
                 )
+                self.serial_conn.reset_input_buffer()
+                self.engine = ATEngine(self.serial_conn, urc_handler=self._handle_urc)
+                self.engine.start()
                 
-                # Wait for module to stabilize
-                time.sleep(3)
-                
-                # Test basic communication with retries
+                # Probe until the module answers instead of waiting a fixed time to stabilize
                 if not self._test_at_command():
                     logger.error("No response to AT command after retries")
                     if self.connection_attempts < self.max_connection_attempts:
@@ -79,6 +281,7 @@ class SIM800CController:
                         continue
                     else:
                         logger.error(f"Max connection attempts ({self.max_connection_attempts}) reached")
+                        self._close_serial()
                         return False
                 
                 # Check if SIM is ready
@@ -92,6 +295,7 @@ class SIM800CController:
                         time.sleep(2)
                         continue
                     else:
+                        self._close_serial()
                         return False
                 
                 # Check signal strength
@@ -104,12 +308,7 @@ class SIM800CController:
                 
             except Exception as e:
                 logger.error(f"Connection attempt {self.connection_attempts} failed: {e}")
-                if self.serial_conn:
-                    try:
-                        self.serial_conn.close()
-                    except:
-                        pass
-                    self.serial_conn = None
+                self._close_serial()
                 
                 if self.connection_attempts < self.max_connection_attempts:
                     time.sleep(2)
@@ -121,140 +320,136 @@ class SIM800CController:
         self.is_connected = False
         return False
     
-    def _test_at_command(self):
-        """Test AT command with retries"""
-        for attempt in range(3):
+    def _close_serial(self):
+        """Stop the reader thread and close the serial port"""
+        if self.engine:
+            self.engine.stop()
+            self.engine = None
+        if self.serial_conn:
             try:
-                if not self.serial_conn or not self.serial_conn.is_open:
-                    logger.error("No serial connection available")
-                    return False
-                
-                # Clear buffers
-                self.serial_conn.reset_input_buffer()
-                self.serial_conn.reset_output_buffer()
-                
-                # Send AT command
-                self.serial_conn.write(b'AT\r\n')
-                time.sleep(1)
-                
-                # Read response
-                response = ""
-                start_time = time.time()
-                while time.time() - start_time < 3:
-                    if self.serial_conn.in_waiting > 0:
-                        chunk = self.serial_conn.read(self.serial_conn.in_waiting)
-                        response += chunk.decode('utf-8', errors='ignore')
-                        if 'OK' in response:
-                            logger.debug(f"AT command successful: {response.strip()}")
-                            return True
-                    time.sleep(0.1)
-                
-                logger.warning(f"AT command attempt {attempt + 1} failed - response: {response}")
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"AT command test error: {e}")
-                time.sleep(1)
+                self.serial_conn.close()
+            except:
+                pass
+            self.serial_conn = None
+        self.is_connected = False
+    
+    def _handle_urc(self, line):
+        """React to unsolicited result codes from the module"""
+        if line in ('RDY', 'Call Ready', 'SMS Ready'):
+            # Module restarted - text mode and character set are back to defaults
+            self.needs_init = True
+        elif line.startswith(('NORMAL POWER DOWN', 'UNDER-VOLTAGE POWER DOWN', 'OVER-VOLTAGE POWER DOWN')):
+            logger.error(f"SIM800C powered down: {line}")
+            self.is_connected = False
+        elif line.startswith('+CPIN:') and 'READY' not in line:
+            logger.warning(f"SIM card status changed: {line}")
+    
+    def _test_at_command(self):
+        """Probe the module with AT until it answers"""
+        for attempt in range(5):
+            response = self.execute("AT", timeout=1)
+            if response.ok:
+                logger.debug(f"AT command successful ({response.elapsed:.3f}s)")
+                return True
+            logger.warning(f"AT command attempt {attempt + 1} failed - response: {response.text() or response.error}")
+            if not self.engine or not self.engine.alive:
+                return False
         
         return False
     
     def _check_sim_ready(self):
         """Check if SIM card is ready"""
-        response = self.send_command("AT+CPIN?", wait_time=2)
-        if response and ("READY" in response or "+CPIN: READY" in response):
+        if self.check_sim_status():
             return True
         logger.warning("SIM card status check failed")
         return False
     
     def _initialize_sms_settings(self):
         """Initialize SMS settings"""
-        # Set to text mode
-        if not self.send_command("AT+CMGF=1", wait_time=1):
-            logger.error("Failed to set text mode")
-            return False
+        # Disable command echo so responses carry only the module's answer
+        if not self.execute("ATE0").ok:
+            logger.warning("Failed to disable command echo")
         
-        # Set character set
-        if not self.send_command('AT+CSCS="GSM"', wait_time=1):
-            logger.error("Failed to set character set")
+        # Set to PDU mode - messages are encoded by pdu.encode_sms (GSM 7-bit or UCS-2)
+        if not self.execute("AT+CMGF=0").ok:
+            logger.error("Failed to set PDU mode")
             return False
         
         # Set SMS storage to SIM card
-        if not self.send_command('AT+CPMS="SM","SM","SM"', wait_time=1):
+        if not self.execute('AT+CPMS="SM","SM","SM"').ok:
             logger.warning("Failed to set SMS storage (continuing anyway)")
         
+        self.needs_init = False
         return True
     
-    def send_command(self, command, wait_time=1, expect_response=True):
-        """Send AT command and get response with improved error handling"""
+    def execute(self, command, timeout=None, expect_prompt=False, payload=None, info_prefix=None):
+        """Send an AT command and return its ATResponse as soon as it completes"""
         if self.test_mode:
-            logger.debug(f"Test mode - simulating command: {command}")
-            if command == "AT":
-                return "OK"
-            elif command == "AT+CPIN?":
-                return "+CPIN: READY\r\nOK"
-            elif command == "AT+CSQ":
-                return "+CSQ: 25,0\r\nOK"
-            return "OK"
+            response = ATResponse(command, expect_prompt, info_prefix)
+            simulated = self._simulate_command(command)
+            response.lines = simulated.split('\r\n')[:-1]
+            response.finish(final='OK', prompt=expect_prompt)
+            return response
         
         with self.lock:
-            if not self.serial_conn:
-                logger.error("No serial connection available")
-                return None
-            
-            if not self.serial_conn.is_open:
-                logger.error("Serial connection is not open")
-                return None
+            if not self.engine or not self.serial_conn or not self.serial_conn.is_open:
+                response = ATResponse(command, expect_prompt, info_prefix)
+                response.finish(error="No serial connection available")
+                logger.error(response.error)
+                return response
             
-            try:
-                # Clear input buffer
-                self.serial_conn.reset_input_buffer()
-                
-                # Send command
-                cmd = f"{command}\r\n"
-                logger.debug(f"Sending: {command}")
-                self.serial_conn.write(cmd.encode())
-                
-                if expect_response:
-                    time.sleep(wait_time)
-                    
-                    # Read response with timeout
-                    response = ""
-                    start_time = time.time()
-                    timeout = wait_time + 2  # Add extra time for response
-                    
-                    while time.time() - start_time < timeout:
-                        if self.serial_conn.in_waiting > 0:
-                            chunk = self.serial_conn.read(self.serial_conn.in_waiting)
-                            response += chunk.decode('utf-8', errors='ignore')
-                            
-                            # Check for complete response
-                            if 'OK' in response or 'ERROR' in response:
-                                break
-                        time.sleep(0.1)
-                    
-                    if response:
-                        logger.debug(f"Response: {response.strip()}")
-                        return response.strip()
-                    else:
-                        logger.warning("No response received")
-                        return None
-                else:
-                    return "OK"
-                    
-            except Exception as e:
-                logger.error(f"Command '{command}' failed: {e}")
-                return None
+            response = self.engine.execute(
+                command, timeout=timeout or self.command_timeout, expect_prompt=expect_prompt,
+                payload=payload, info_prefix=info_prefix
+            )
+            if response.error and not self.engine.alive:
+                self.is_connected = False
+            return response
+    
+    def _simulate_command(self, command):
+        logger.debug(f"Test mode - simulating command: {command}")
+        if command == "AT":
+            return "OK"
+        elif command == "AT+CPIN?":
+            return "+CPIN: READY\r\nOK"
+        elif command == "AT+CSQ":
+            return "+CSQ: 25,0\r\nOK"
+        return "OK"
+    
+    def send_command(self, command, wait_time=1, expect_response=True):
+        """
+        Send AT command and get response (legacy string interface)
+        
+        wait_time is now only an upper bound: the call returns as soon as the
+        module sends its final result code.
+        """
+        if self.test_mode:
+            return self._simulate_command(command)
+        
+        if not expect_response:
+            with self.lock:
+                if not self.serial_conn or not self.serial_conn.is_open:
+                    logger.error("No serial connection available")
+                    return None
+                self.serial_conn.write(f"{command}\r".encode())
+                return "OK"
+        
+        response = self.execute(command, timeout=max(wait_time + 2, self.command_timeout))
+        if response.timed_out and not response.lines:
+            logger.warning("No response received")
+            return None
+        return response.text()
     
     def get_signal_strength(self):
         """Get signal strength with improved parsing"""
         if self.test_mode:
             return 80, "Good"
         
-        response = self.send_command("AT+CSQ", wait_time=2)
-        if response and "+CSQ:" in response:
+        response = self.execute("AT+CSQ")
+        if response.ok:
             try:
                 # Use regex to extract signal value
-                match = re.search(r'\+CSQ:\s*(\d+),\d+', response)
+                match = re.search(r'\+CSQ:\s*(\d+),\d+', response.text())
                 if match:
                     signal = int(match.group(1))
                     if signal == 99:
@@ -276,132 +471,152 @@ class SIM800CController:
         logger.warning("No signal strength response")
         return 0, "No response"
     
+    def get_network_registration(self):
+        """Get network registration state from AT+CREG?"""
+        if self.test_mode:
+            return 1, REGISTRATION_STATUS[1]
+        
+        response = self.execute("AT+CREG?")
+        match = re.search(r'\+CREG:\s*\d+,(\d+)', response.text()) if response.ok else None
+        if not match:
+            logger.warning("No network registration response")
+            return None, "No response"
+        stat = int(match.group(1))
+        return stat, REGISTRATION_STATUS.get(stat, 'Unknown')
+    
     def send_sms(self, phone_number, message):
         """Send SMS message with improved error handling and retry logic"""
+        try:
+            encoded = self.encode_message(phone_number, message)
+        except ValueError as e:
+            self.last_error = str(e)
+            logger.error(f"SMS to {phone_number} cannot be encoded: {e}")
+            return False
+        
         if self.test_mode:
-            logger.info(f"Test mode - simulating SMS to {phone_number}: {message}")
+            logger.info(f"Test mode - simulating SMS to {phone_number} ({encoded.segment_count} {encoded.encoding} segment(s)): {message}")
             return True
         
         max_attempts = 3
+        sent_parts = 0
         for attempt in range(max_attempts):
             logger.info(f"Sending SMS to {phone_number} (Attempt {attempt + 1}/{max_attempts})")
+            started = time.monotonic()
             
             try:
-                # Check connection first
-                if not self.is_connected or not self.serial_conn:
-                    logger.warning("Connection lost, attempting to reconnect...")
-                    if not self.connect():
-                        logger.error("Failed to reconnect")
-                        continue
-                
-                # Test if module is responsive
-                if not self.send_command("AT", wait_time=1):
-                    logger.error("Module not responding")
-                    continue
-                
-                # Check signal quality
-                signal, status = self.get_signal_strength()
-                logger.info(f"Signal strength: {signal}% ({status})")
-                
-                if signal < 5:  # Very weak signal
-                    logger.error(f"SMS sending failed on attempt {attempt + 1}: Signal too weak: {signal}% ({status})")
-                    if attempt < max_attempts - 1:
-                        logger.info("Waiting 5 seconds before retry...")
-                        time.sleep(5)
-                    continue
-                
-                # Reinitialize SMS settings
-                if not self._initialize_sms_settings():
-                    logger.error("Failed to reinitialize SMS settings")
-                    continue
-                
-                # Send SMS command
-                sms_cmd = f'AT+CMGS="{phone_number}"'
-                response = self.send_command(sms_cmd, wait_time=3)
-                
-                if not response or ">" not in response:
-                    logger.error("Failed to get SMS prompt")
-                    continue
-                
-                # Send message content
-                success = self._send_message_content(message)
-                if success:
-                    logger.info("SMS sent successfully")
+                # Hold the modem for the whole sequence so no other command lands between prompt and payload
+                with self.lock:
+                    error, sent_parts = self._send_sms_attempt(phone_number, encoded, sent_parts)
+                if error is None:
+                    logger.info(f"SMS sent successfully in {time.monotonic() - started:.2f}s")
+                    self.last_error = None
                     return True
-                else:
-                    logger.error(f"Failed to send message content on attempt {attempt + 1}")
-                    if attempt < max_attempts - 1:
-                        logger.info("Waiting 5 seconds before retry...")
-                        time.sleep(5)
-                
+                logger.error(f"SMS sending failed on attempt {attempt + 1}: {error}")
             except Exception as e:
+                error = f"SMS sending error: {e}"
                 logger.error(f"SMS sending error on attempt {attempt + 1}: {e}")
-                if attempt < max_attempts - 1:
-                    logger.info("Waiting 5 seconds before retry...")
-                    time.sleep(5)
+            
+            self.last_error = error
+            if attempt < max_attempts - 1:
+                logger.info(f"Waiting {self.retry_delay:.0f} seconds before retry...")
+                time.sleep(self.retry_delay)
         
         logger.error(f"SMS sending failed after {max_attempts} attempts")
         return False
     
-    def _send_message_content(self, message):
-        """Send SMS message content with improved response handling"""
-        try:
-            if not self.serial_conn:
-                logger.error("No serial connection")
-                return False
-            
-            # Clear buffers
-            self.serial_conn.reset_input_buffer()
-            self.serial_conn.reset_output_buffer()
-            
-            # Send message with termination character
-            full_message = f"{message}\x1A"
-            self.serial_conn.write(full_message.encode('utf-8', errors='ignore'))
-            
-            # Wait for response with extended timeout
-            response = ""
-            start_time = time.time()
-            timeout = 30  # 30 second timeout for network operations
-            
-            while time.time() - start_time < timeout:
-                if self.serial_conn.in_waiting > 0:
-                    chunk = self.serial_conn.read(self.serial_conn.in_waiting)
-                    response += chunk.decode('utf-8', errors='ignore')
-                    
-                    # Check for successful response
-                    if "+CMGS:" in response and "OK" in response:
-                        logger.info("SMS sent successfully")
-                        return True
-                    elif "ERROR" in response:
-                        logger.error(f"SMS sending failed with error: {response}")
-                        return False
-                
-                time.sleep(0.5)
+    def encode_message(self, phone_number, message):
+        """Encode a message as PDUs with a fresh concatenation reference"""
+        self.concat_reference = (self.concat_reference + 1) % 256
+        encoded = encode_sms(phone_number, message, reference=self.concat_reference)
+        logger.info(
+            f"SMS to {phone_number}: {encoded.segment_count} {encoded.encoding} segment(s), "
+            f"{encoded.encoded_size} octets"
+        )
+        return encoded
+    
+    def _send_sms_attempt(self, phone_number, encoded, first_part=0):
+        """
+        Send the segments from first_part on, one AT+CMGS sequence each.
+        Returns (error or None, number of segments sent) so a retry resumes at the failed segment.
+        """
+        # Check connection first
+        if not self.is_connected or not self.engine or not self.engine.alive:
+            logger.warning("Connection lost, attempting to reconnect...")
+            if not self.connect():
+                return "SIM800C connection failed", first_part
+        
+        # Check signal quality (recent monitor sample when available)
+        cached = self.monitor.get_signal_strength() if self.monitor else None
+        signal, status = cached or self.get_signal_strength()
+        logger.info(f"Signal strength: {signal}% ({status})")
+        if signal < 5:  # Very weak signal
+            return f"Signal too weak: {signal}% ({status})", first_part
+        
+        # Reinitialize SMS settings only after the module restarted
+        if self.needs_init and not self._initialize_sms_settings():
+            return "Failed to reinitialize SMS settings", first_part
+        
+        for index in range(first_part, encoded.segment_count):
+            pdu, tpdu_length = encoded.parts[index]
             
-            logger.error("SMS sending timed out")
-            return False
+            # Send SMS command and wait for the '>' prompt
+            response = self.execute(f'AT+CMGS={tpdu_length}', expect_prompt=True)
+            if not response.prompt:
+                if response.timed_out:
+                    self._cancel_prompt()
+                return f"Failed to get SMS prompt: {response.text() or response.error}", index
             
-        except Exception as e:
-            logger.error(f"Failed to send message content: {e}")
-            return False
+            # Send message content
+            error = self._send_message_content(pdu)
+            if error:
+                if encoded.segment_count > 1:
+                    error = f"Segment {index + 1}/{encoded.segment_count}: {error}"
+                return error, index
+        
+        return None, encoded.segment_count
+    
+    def _cancel_prompt(self):
+        """Leave a pending SMS prompt (ESC) so the next command is not taken as message text"""
+        with self.lock:
+            if self.serial_conn and self.serial_conn.is_open:
+                try:
+                    self.serial_conn.write(b'\x1B')
+                except Exception as e:
+                    logger.error(f"Failed to cancel SMS prompt: {e}")
+    
+    def _send_message_content(self, pdu):
+        """Send one hex PDU and wait for the network to confirm (+CMGS); returns the error or None"""
+        # Send PDU with termination character
+        full_message = f"{pdu}\x1A"
+        response = self.execute(
+            None, timeout=self.send_timeout,
+            payload=full_message.encode('ascii'), info_prefix='+CMGS:'
+        )
+        
+        if response.ok and any(line.startswith('+CMGS:') for line in response.lines):
+            logger.info(f"SMS accepted by network in {response.elapsed:.2f}s")
+            return None
+        if response.timed_out:
+            return "SMS sending timed out"
+        return f"SMS sending failed with error: {response.text() or response.error}"
     
     def check_sim_status(self):
         """Check if SIM card is ready"""
         if self.test_mode:
             return True
         
-        response = self.send_command("AT+CPIN?", wait_time=2)
-        return response and ("READY" in response or "+CPIN: READY" in response)
+        response = self.execute("AT+CPIN?")
+        return response.ok and any("READY" in line for line in response.lines)
     
     def close(self):
         """Close serial connection"""
         if not self.test_mode and self.serial_conn:
-            try:
-                self.serial_conn.close()
-            except:
-                pass
-            self.is_connected = False
+            self._close_serial()
             logger.info("Serial connection closed")
 
 # Create global controller instance
-controller = SIM800CController(test_mode=False) 
\ No newline at end of file
+controller = SIM800CController(
+    port=os.getenv('SIM800C_PORT', '/dev/ttyAMA0'),
+    baudrate=int(os.getenv('SIM800C_BAUDRATE', '115200')),
+    test_mode=False
+)
@@ -3,13 +3,16 @@ SMS Server with SIM800C Integration
 Flask application providing SMS verification API endpoints with improved error handling
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for
 from datetime import datetime
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from models import db, SMSVerification, SMSLog
+from models import db, SMSVerification, SMSLog, ensure_schema
 from sim800 import controller as sim800c
+from sms_worker import SMSWorker
+from modem_monitor import ModemMonitor
+from pdu import analyze
 from functools import wraps
 from config import config
 import time
@@ -25,7 +28,7 @@ logger.addHandler(handler)
 
 def create_app(config_name='default'):
     """Application factory"""
-app = Flask(__name__)
+    app = Flask(__name__)
     app.config.from_object(config[config_name])
     app.logger.addHandler(handler)
     
@@ -36,6 +39,22 @@ app = Flask(__name__)
 
 app = create_app(os.getenv('FLASK_ENV', 'development'))
 
+# Cached CSQ/CPIN/CREG samples; request handlers never query the modem themselves
+modem_monitor = ModemMonitor(
+    sim800c,
+    interval=app.config['MODEM_MONITOR_INTERVAL'],
+    history_size=app.config['MODEM_MONITOR_HISTORY']
+)
+sim800c.monitor = modem_monitor
+
+# The only code allowed to drive the modem; HTTP handlers just queue jobs for it
+sms_worker = SMSWorker(
+    app, sim800c,
+    max_attempts=app.config['SMS_JOB_MAX_ATTEMPTS'],
+    retry_delay=app.config['SMS_JOB_RETRY_DELAY'],
+    monitor=modem_monitor
+)
+
 def require_api_key(f):
     """Decorator to require API key"""
     @wraps(f)
@@ -50,7 +69,7 @@ def initialize_database():
     """Initialize database tables"""
     try:
         with app.app_context():
-            db.create_all()
+            ensure_schema()
             logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Database initialization error: {e}")
@@ -85,21 +104,22 @@ def handle_exception(e):
 def index():
     """Index page with server status"""
     try:
-        # Get SIM status
-        sim_status = "Ready" if sim800c.check_sim_status() else "Not Ready"
-        signal_strength, signal_status = sim800c.get_signal_strength()
+        # Get cached SIM status
+        modem_status = modem_monitor.snapshot()
         
         return jsonify({
             'service': 'SMS Server',
             'status': 'running',
             'timestamp': datetime.utcnow().isoformat(),
-            'sim_status': sim_status,
-            'signal_strength': f"{signal_strength}% ({signal_status})",
+            'sim_status': modem_status['sim_status'],
+            'signal_strength': modem_status['signal_strength'],
             'endpoints': {
                 'health_check': '/health',
                 'send_verification': '/api/v1/verify/send',
+                'job_status': '/api/v1/verify/status/<job_id>',
                 'check_verification': '/api/v1/verify/check',
-                'server_status': '/api/v1/status'
+                'server_status': '/api/v1/status',
+                'modem_history': '/api/v1/modem/history'
             }
         })
     except Exception as e:
@@ -114,14 +134,10 @@ def index():
 def health_check():
     """Health check endpoint with detailed status"""
     try:
-        sim_status = "Ready" if sim800c.check_sim_status() else "Not Ready"
-        signal_strength, signal_status = sim800c.get_signal_strength()
-        
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.utcnow().isoformat(),
-            'sim_status': sim_status,
-            'signal_strength': f"{signal_strength}% ({signal_status})",
+            **modem_monitor.snapshot(),
             'connection_status': 'connected' if sim800c.is_connected else 'disconnected'
         })
     except Exception as e:
@@ -134,7 +150,7 @@ def health_check():
 @app.route('/api/v1/verify/send', methods=['POST'])
 @require_api_key
 def send_verification():
-    """Send SMS verification with improved error handling and retry logic"""
+    """Queue an SMS for the modem worker and return its job id"""
     try:
         data = request.get_json()
         if not data or 'phone_number' not in data or 'message' not in data:
@@ -147,69 +163,39 @@ def send_verification():
         if not phone_number or len(phone_number) < 10:
             return jsonify({'error': 'Invalid phone number format'}), 400
         
-        # Check if SIM800C is connected
-        if not sim800c.is_connected:
-            logger.warning("SIM800C not connected, attempting to reconnect...")
-            if not sim800c.connect():
-                logger.error("Failed to reconnect to SIM800C")
-                SMSLog.log_sms(phone_number, message, 'failed', 'SIM800C connection failed')
-                return jsonify({'error': 'SMS service unavailable'}), 503
-        
-        # Check signal strength before sending
-        signal_strength, signal_status = sim800c.get_signal_strength()
-        logger.info(f"Current signal strength: {signal_strength}% ({signal_status})")
-        
-        if signal_strength < 5:
-            logger.warning(f"Signal too weak for SMS: {signal_strength}% ({signal_status})")
-            SMSLog.log_sms(phone_number, message, 'failed', f'Signal too weak: {signal_strength}%')
-            return jsonify({'error': 'Signal too weak for SMS sending'}), 503
-        
-        # Send SMS with retry logic
-        max_attempts = 3
-        last_error = None
+        # Segment cost is known before the modem is touched
+        try:
+            estimate = analyze(message)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        for attempt in range(max_attempts):
-            try:
-                logger.info(f"Sending SMS attempt {attempt + 1}/{max_attempts}")
-                
-                if sim800c.send_sms(phone_number, message):
-                    SMSLog.log_sms(phone_number, message, 'success')
-                    return jsonify({
-                        'success': True,
-                        'message': 'SMS sent successfully',
-                        'attempt': attempt + 1,
-                        'signal_strength': f"{signal_strength}% ({signal_status})"
-                    })
-                else:
-                    last_error = f"SMS sending failed on attempt {attempt + 1}"
-                    logger.warning(last_error)
-                    
-                    if attempt < max_attempts - 1:
-                        logger.info("Waiting 3 seconds before retry...")
-                        time.sleep(3)
-                        
-                        # Check connection before retry
-                        if not sim800c.is_connected:
-                            logger.warning("Connection lost, attempting to reconnect...")
-                            sim800c.connect()
-                            
-            except Exception as e:
-                last_error = f"SMS sending error on attempt {attempt + 1}: {str(e)}"
-                logger.error(last_error)
-                
-                if attempt < max_attempts - 1:
-                    logger.info("Waiting 3 seconds before retry...")
-                    time.sleep(3)
+        job = SMSLog.enqueue(phone_number, message, **estimate)
+        sms_worker.notify()
+        logger.info(f"SMS job {job.id} queued for {phone_number} ({estimate['segments']} {estimate['encoding']} segment(s))")
         
-        # All attempts failed
-        error_msg = last_error or 'Failed to send SMS after all attempts'
-        SMSLog.log_sms(phone_number, message, 'failed', error_msg)
-        return jsonify({'error': error_msg}), 500
+        return jsonify({
+            'success': True,
+            'message': 'SMS queued for sending',
+            'job_id': job.id,
+            'status': job.status,
+            'queue_position': job.queue_position(),
+            **estimate,
+            'status_url': url_for('get_job_status', job_id=job.id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in send_verification: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/v1/verify/status/<int:job_id>', methods=['GET'])
+@require_api_key
+def get_job_status(job_id):
+    """Report the progress of a queued SMS job"""
+    job = SMSLog.query.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/api/v1/verify/check', methods=['POST'])
 @require_api_key
 def verify_code():
@@ -255,9 +241,6 @@ def verify_code():
 def get_status():
     """Get comprehensive SMS server status"""
     try:
-        sim_status = "Ready" if sim800c.check_sim_status() else "Not Ready"
-        signal_strength, signal_status = sim800c.get_signal_strength()
-        
         # Get recent logs
         recent_logs = SMSLog.query.order_by(
             SMSLog.created_at.desc()
@@ -267,20 +250,23 @@ def get_status():
         total_sms = SMSLog.query.count()
         successful_sms = SMSLog.query.filter_by(status='success').count()
         failed_sms = SMSLog.query.filter_by(status='failed').count()
+        queued_sms = SMSLog.query.filter(SMSLog.status.in_([SMSLog.STATUS_QUEUED, SMSLog.STATUS_SENDING])).count()
         
         return jsonify({
-            'sim_status': sim_status,
-            'signal_strength': f"{signal_strength}% ({signal_status})",
+            **modem_monitor.snapshot(),
             'connection_status': 'connected' if sim800c.is_connected else 'disconnected',
             'statistics': {
                 'total_sms': total_sms,
                 'successful_sms': successful_sms,
                 'failed_sms': failed_sms,
+                'queued_sms': queued_sms,
                 'success_rate': f"{(successful_sms/total_sms*100):.1f}%" if total_sms > 0 else "0%"
             },
+            'worker': sms_worker.get_stats(),
             'recent_logs': [
                 {
                     'phone_number': log.phone_number,
+                    'job_id': log.id,
                     'status': log.status,
                     'error_message': log.error_message,
                     'created_at': log.created_at.isoformat()
@@ -292,6 +278,18 @@ def get_status():
         logger.error(f"Error in get_status: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/v1/modem/history', methods=['GET'])
+@require_api_key
+def get_modem_history():
+    """Recent signal, SIM and registration samples for diagnosing coverage drops"""
+    limit = request.args.get('limit', type=int)
+    return jsonify({
+        'interval_seconds': modem_monitor.interval,
+        'skipped_busy': modem_monitor.skipped_busy,
+        'latest': modem_monitor.latest,
+        'samples': modem_monitor.get_history(limit)
+    })
+
 if __name__ == '__main__':
     import sys
     port = 5003
@@ -306,5 +304,7 @@ if __name__ == '__main__':
     # Initialize database and SIM800C
     initialize_database()
     initialize_sim800c()
+    modem_monitor.start()
+    sms_worker.start()
     
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,122 @@
+"""
+Single modem-owner worker for the SMS server
+
+HTTP requests only add jobs to the SMSLog queue; this worker is the only code
+that drives the SIM800C, one complete AT+CMGS sequence at a time.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from models import SMSLog
+
+logger = logging.getLogger('sms_server')
+
+
+class SMSWorker:
+    """Consumes queued SMSLog jobs and sends them through the modem controller"""
+
+    def __init__(self, app, modem, max_attempts=3, retry_delay=10, poll_interval=1.0, monitor=None):
+        self.app = app
+        self.modem = modem
+        self.monitor = monitor
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.current_job_id = None
+        self.stats = {'sent': 0, 'failed': 0, 'retried': 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Requeue jobs interrupted by a restart and start consuming the queue"""
+        if self.running:
+            return
+        with self.app.app_context():
+            recovered = SMSLog.recover_interrupted()
+        if recovered:
+            logger.warning(f"Requeued {recovered} SMS job(s) interrupted by a restart")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sms-worker', daemon=True)
+        self._thread.start()
+        logger.info("SMS worker started")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def notify(self):
+        """Wake the worker after a job was queued"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_next()
+            except Exception as e:
+                logger.error(f"SMS worker error: {e}")
+                processed = False
+
+            if not processed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def process_next(self):
+        """Send the next due job; returns False when the queue is empty"""
+        with self.app.app_context():
+            job = SMSLog.claim_next()
+            if job is None:
+                return False
+
+            self.current_job_id = job.id
+            logger.info(f"Sending SMS job {job.id} to {job.phone_number} (attempt {job.attempts}/{self.max_attempts})")
+            try:
+                sent = self.modem.send_sms(job.phone_number, job.message)
+                error = None if sent else (self.modem.last_error or 'SMS sending failed')
+            except Exception as e:
+                sent, error = False, f"SMS sending error: {e}"
+            finally:
+                self.current_job_id = None
+
+            if sent:
+                job.mark_success()
+                self.stats['sent'] += 1
+            elif job.attempts < self.max_attempts:
+                job.mark_failed(error, retry_at=datetime.utcnow() + timedelta(seconds=self.retry_delay))
+                self.stats['retried'] += 1
+                logger.warning(f"SMS job {job.id} failed ({error}), retrying in {self.retry_delay}s")
+            else:
+                job.mark_failed(error)
+                self.stats['failed'] += 1
+                logger.error(f"SMS job {job.id} failed after {job.attempts} attempts: {error}")
+
+            self._refresh_monitor(force=not sent)
+            return True
+
+    def _refresh_monitor(self, force=False):
+        """The modem is idle between jobs: refresh a stale sample (always after a failure)"""
+        if not self.monitor:
+            return
+        try:
+            if force:
+                self.monitor.sample()
+            else:
+                self.monitor.sample_if_stale()
+        except Exception as e:
+            logger.error(f"Modem monitor sample failed: {e}")
+
+    def get_stats(self):
+        return {
+            'running': self.running,
+            'current_job_id': self.current_job_id,
+            **self.stats,
+        }
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Known-vector tests for the SMS-SUBMIT PDU encoder
+
+Run with: python -m unittest test_pdu
+"""
+
+import unittest
+
+import pdu
+
+
+class EncodeAddressTest(unittest.TestCase):
+
+    def test_even_international_number(self):
+        self.assertEqual(pdu.encode_address('+989121234567'), '0C91891912325476')
+
+    def test_odd_length_number_is_padded_with_f(self):
+        self.assertEqual(pdu.encode_address('09121234567'), '0B819021214365F7')
+        self.assertEqual(pdu.encode_address('+98912123456'), '0B918919123254F6')
+
+
+class PackSeptetsTest(unittest.TestCase):
+
+    def test_packs_lsb_first(self):
+        self.assertEqual(pdu.pack_septets(b'hellohello').hex().upper(), 'E8329BFD4697D9EC37')
+
+    def test_fill_bits_shift_the_first_septet(self):
+        self.assertEqual(pdu.pack_septets([0x61] * 8, fill_bits=1).hex().upper(), 'C2E170381C0E8701')
+
+
+class EncodeSMSTest(unittest.TestCase):
+
+    def test_plain_gsm7(self):
+        encoded = pdu.encode_sms('+989121234567', 'hello')
+
+        self.assertEqual(encoded.encoding, pdu.GSM7)
+        self.assertEqual(encoded.parts, [('00' '01' '00' '0C91891912325476' '00' '00' '05' 'E8329BFD06', 18)])
+
+    def test_gsm7_concatenated_part_has_one_fill_bit(self):
+        encoded = pdu.encode_sms('09121234567', 'a' * 161, reference=0x2A)
+
+        self.assertEqual((encoded.encoding, encoded.segment_count), (pdu.GSM7, 2))
+        first_pdu, _ = encoded.parts[0]
+        self.assertTrue(first_pdu.startswith('00' '41' '00' '0B819021214365F7' '00' '00' 'A0' '0500032A0201'))
+        # UDL counts 7 header septets (6-octet UDH + 1 fill bit) + 8 text septets
+        self.assertEqual(encoded.parts[1], (
+            '00' '41' '00' '0B819021214365F7' '00' '00' '0F' '0500032A0202' 'C2E170381C0E8701', 27
+        ))
+
+    def test_ucs2_persian_text(self):
+        encoded = pdu.encode_sms('09121234567', 'سلام')
+
+        self.assertEqual(encoded.encoding, pdu.UCS2)
+        self.assertEqual(encoded.parts, [('00' '01' '00' '0B819021214365F7' '00' '08' '08' '0633064406270645', 21)])
+
+    def test_surrogate_pair_is_not_split_across_parts(self):
+        encoded = pdu.encode_sms('09121234567', 'ا' * 66 + '😀' + 'ا' * 3, reference=1)
+
+        self.assertEqual(encoded.segment_count, 2)
+        self.assertTrue(encoded.parts[0][0].endswith('0627'))
+        self.assertIn('050003010202' 'D83DDE00', encoded.parts[1][0])
+
+    def test_analyze_matches_encode(self):
+        self.assertEqual(pdu.analyze('a' * 161), {'encoding': pdu.GSM7, 'segments': 2, 'encoded_size': 141})
+        self.assertEqual(pdu.analyze('سلام'), {'encoding': pdu.UCS2, 'segments': 1, 'encoded_size': 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
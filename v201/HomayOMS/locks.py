@@ -0,0 +1,88 @@
+"""
+🔒 قفل‌های بین‌پردازه‌ای برای پروژه HomayOMS
+📋 این ماژول یک قفل فایلی ساده ارائه می‌دهد تا چند worker گانیکورن
+⚙️ روی یک منبع مشترک (فایل CSV، وظایف دوره‌ای و ...) هم‌زمان کار نکنند
+"""
+
+import os
+import time
+import logging
+
+try:
+    import fcntl
+except ImportError:  # 🪟 ویندوز - قفل فایلی در دسترس نیست
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """
+    🔒 قفل انحصاری مبتنی بر flock
+
+    🎯 فقط یک پردازه در هر لحظه می‌تواند قفل را در اختیار داشته باشد
+    ⏳ با blocking=False اگر قفل در اختیار پردازه دیگری باشد فوراً False برمی‌گردد
+
+    🔧 استفاده:
+        with FileLock('/tmp/homayoms.lock') as acquired:
+            if acquired:
+                ...
+    """
+
+    def __init__(self, path, blocking=True, timeout=None):
+        self.path = str(path)
+        self.blocking = blocking
+        self.timeout = timeout
+        self._fd = None
+        self.acquired = False
+
+    def acquire(self):
+        """
+        🔑 تلاش برای گرفتن قفل
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        if fcntl is None:
+            # بدون flock فقط تضمین تک‌پردازه‌ای داریم
+            self.acquired = True
+            return True
+
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            try:
+                flags = fcntl.LOCK_EX
+                if not self.blocking or deadline is not None:
+                    flags |= fcntl.LOCK_NB
+                fcntl.flock(self._fd, flags)
+                self.acquired = True
+                return True
+            except BlockingIOError:
+                if not self.blocking or (deadline is not None and time.monotonic() >= deadline):
+                    os.close(self._fd)
+                    self._fd = None
+                    return False
+                time.sleep(0.05)
+
+    def release(self):
+        """
+        🔓 آزادسازی قفل
+        """
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None and self.acquired:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self.acquired = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
@@ -152,6 +152,11 @@ X_FRAME_OPTIONS = 'DENY'              # 🚫 جلوگیری از iframe
 AUTH_USER_MODEL = 'accounts.User' 
 
 # 🔐 تنظیمات احراز هویت
+# 🔗 کاربر همراه با پروفایل مشتری بارگذاری می‌شود؛ ModelBackend برای نشست‌های قدیمی باقی مانده است
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CustomerLinkedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 #LOGIN_URL = '/accounts/customer/sms-login/'
 #LOGIN_REDIRECT_URL = '/accounts/customer/dashboard/'
 
@@ -161,3 +166,52 @@ HANDLER_500 = 'HomayOMS.views.handler500'
 
 # ⏰ تنظیمات لغو خودکار سفارشات
 ORDER_CANCELLATION_TIMEOUT = 1  # زمان به دقیقه برای لغو خودکار سفارشات Processing (1 دقیقه برای تست) 
+PRODUCT_RESERVATION_MINUTES = ORDER_CANCELLATION_TIMEOUT  # 🔒 مدت رزرو محصولات برای سفارش Processing (دقیقه)
+EXPIRY_SWEEP_BATCH_SIZE = 500  # 📦 حداکثر سفارش لغو شده در هر تراکنش sweeper
+WORKING_HOURS_CACHE_TTL = 60  # 🏪 حداکثر عمر کش ساعات کاری در هر worker (ثانیه) - پشتیبان نسخه مشترک در cache
+SHOP_HOURS_CACHE_ALIAS = 'default'  # 🔢 cache نسخه ساعات کاری - برای چند worker باید مشترک باشد (فایل/پایگاه داده)
+CATALOGUE_PAGE_SIZE = 40  # 📄 تعداد محصولات هر صفحه کاتالوگ فروشگاه (بارگذاری تدریجی)
+CATALOGUE_CACHE_ALIAS = 'default'  # 🗂️ cache قطعه‌های کاتالوگ - برای چند worker باید مشترک باشد (فایل/پایگاه داده)
+CATALOGUE_CACHE_LOCAL_SIZE = 256  # 🧠 تعداد قطعه‌های نگه داشته شده در حافظه هر پردازه
+CATALOGUE_CACHE_TIMEOUT = 3600  # ⏳ عمر قطعه‌ها در cache مشترک (ثانیه)
+
+# 🧪 اجرای تست‌ها (manage.py test) - بدون نوشتن در csv_logs و db.sqlite3 واقعی
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+# 📤 تنظیمات خروجی افزایشی لاگ‌ها (csv_logs)
+LOG_EXPORT_DIR = BASE_DIR / 'csv_logs'          # 📁 مسیر فایل‌های CSV
+LOG_EXPORT_ENABLED = not TESTING                # ✅ فعال‌سازی خروجی خودکار پس از ذخیره
+if TESTING:
+    import tempfile
+    LOG_EXPORT_DIR = Path(tempfile.gettempdir()) / 'homayoms-test-csv-logs'  # 🧪 تست‌هایی که خروجی را روشن می‌کنند
+LOG_EXPORT_ASYNC = True                         # 🧵 اجرا در thread پس‌زمینه (خارج از مسیر درخواست)
+LOG_EXPORT_DEBOUNCE_SECONDS = 2                 # ⏳ مکث برای تجمیع ذخیره‌های پشت سر هم
+LOG_EXPORT_SETTLE_SECONDS = 2                   # ⏳ خطوط تازه‌تر از این مقدار به اجرای بعدی موکول می‌شوند
+LOG_EXPORT_GAP_SECONDS = 300                    # 🕳️ مدت بررسی دوباره شناسه‌های خالی (تراکنش commit نشده) پیش از rollback فرض شدن
+LOG_EXPORT_ROTATE_BYTES = 10 * 1024 * 1024      # 🔄 چرخش فایل پس از 10 مگابایت
+LOG_EXPORT_ROTATE_DAILY = True                  # 🔄 چرخش روزانه فایل‌ها
+
+# 📜 تنظیمات نوشتن بافر شده لاگ فعالیت‌ها (ActivityLog)
+ACTIVITY_LOG_BUFFERED = True                    # 🧵 ذخیره دسته‌ای در thread پس‌زمینه (خارج از تراکنش‌ها)
+ACTIVITY_LOG_BATCH_SIZE = 100                   # 📦 حداکثر تعداد لاگ در هر bulk_create
+ACTIVITY_LOG_FLUSH_INTERVAL_MS = 500            # ⏳ حداکثر تاخیر ذخیره یک لاگ
+ACTIVITY_LOG_QUEUE_SIZE = 10000                 # 📏 ظرفیت صف در هر پردازه
+ACTIVITY_LOG_ENQUEUE_TIMEOUT_MS = 50            # ⚖️ انتظار در صف پر پیش از ذخیره هم‌زمان
+ACTIVITY_LOG_VIEW_SAMPLE_RATE = 1.0             # 🎯 نسبت لاگ‌های VIEW با اهمیت LOW که نگه‌داری می‌شوند
+
+# 📱 صف ارسال پیامک (outbox) - ارسال توسط دستور run_sms_dispatcher
+SMS_ASYNC_DISPATCH = True                       # 📤 view ها فقط پیام را در صف ثبت می‌کنند
+SMS_DISPATCH_BATCH_SIZE = 5                     # 📦 تعداد پیام برداشت شده در هر دور (کوچک تا کد تایید منتظر نماند)
+SMS_DISPATCH_LEASE_SECONDS = 120                # 🔒 پیام رها شده پس از این مدت دوباره قابل برداشت است
+SMS_RETRY_BACKOFF_SECONDS = 5                   # ⏳ پایه backoff نمایی بین تلاش‌ها
+SMS_RETRY_BACKOFF_MAX_SECONDS = 300             # ⏳ حداکثر فاصله بین تلاش‌ها
+SMS_REMOTE_POLL_SECONDS = 2                     # 📡 فاصله پرسیدن وضعیت پیام‌های سپرده شده به صف مودم (پاسخ 202)
+SMS_REMOTE_WAIT_SECONDS = 60                    # ⏳ انتظار ارسال همزمان (send_now) برای نتیجه مودم؛ پس از آن run_sms_dispatcher لازم است
+SMS_REMOTE_MAX_AGE_SECONDS = 900                # ⌛ پیام بدون نتیجه در صف مودم پس از این مدت ناموفق ثبت می‌شود
+
+# 🔌 کلاینت HTTP مشترک سرور SMS
+SMS_HTTP_POOL_SIZE = 4                          # ♻️ حداکثر اتصال keep-alive به سرور SMS در هر پردازه
+SMS_HEALTH_CACHE_TTL = 15                       # 🩺 عمر کش وضعیت سلامت (ثانیه)
+SMS_HEALTH_TIMEOUT = 3                          # ⏱️ timeout درخواست /health (جدا از SMS_TIMEOUT ارسال)
+SMS_CIRCUIT_FAILURE_THRESHOLD = 3               # ⚡ تعداد خطای پیاپی برای باز شدن circuit breaker
+SMS_CIRCUIT_RESET_SECONDS = 30                  # ⏳ مدت رد فوری درخواست‌ها پیش از درخواست آزمایشی
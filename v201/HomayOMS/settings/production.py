@@ -106,6 +106,20 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True    # 🚪 انقضا هنگام بستن
 STATIC_ROOT = config('STATIC_ROOT', default=BASE_DIR / 'staticfiles')
 MEDIA_ROOT = config('MEDIA_ROOT', default=BASE_DIR / 'media')
 
+# 🗂️ تنظیمات cache - حافظه محلی + cache فایلی مشترک بین workerهای Gunicorn
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('SHARED_CACHE_DIR', default=str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+CATALOGUE_CACHE_ALIAS = 'shared'
+SHOP_HOURS_CACHE_ALIAS = 'shared'
+
 # 🔧 تنظیمات timezone
 TIME_ZONE = config('TIME_ZONE', default='Asia/Tehran')
 LANGUAGE_CODE = config('LANGUAGE_CODE', default='fa-ir')
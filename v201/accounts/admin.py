@@ -66,6 +66,9 @@ class UserAdmin(BaseUserAdmin):
         'phone'
     ]
     
+    # 🔗 انتخاب پروفایل مشتری بدون بارگذاری کل لیست مشتریان
+    raw_id_fields = ['customer_profile']
+    
     # 🔽 فیلترهای کناری
     list_filter = [
         'role',
@@ -86,7 +89,7 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('first_name', 'last_name', 'email', 'phone')
         }),
         ('🎭 نقش و دسترسی', {
-            'fields': ('role', 'status', 'department'),
+            'fields': ('role', 'status', 'department', 'customer_profile'),
             'classes': ('wide',)
         }),
         ('🔐 مجوزها', {
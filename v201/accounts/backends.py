@@ -0,0 +1,22 @@
+"""
+🔐 backend احراز هویت HomayOMS
+👤 کاربر احراز هویت شده همراه با پروفایل مشتری متصل (select_related) بارگذاری می‌شود
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class CustomerLinkedModelBackend(ModelBackend):
+    """
+    🔗 ModelBackend که در هر درخواست کاربر و Customer متصل را با یک کوئری بارگذاری می‌کند
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('customer_profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,56 @@
+"""
+🔗 اتصال دائمی کاربر به Customer و پر کردن آن برای کاربران موجود
+📞 تطبیق ابتدا بر اساس شماره تلفن و سپس بر اساس نام (همان منطق User.customer)
+"""
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Customer = apps.get_model('core', 'Customer')
+
+    users = list(User.objects.filter(customer_profile__isnull=True).only(
+        'id', 'phone', 'username', 'first_name', 'last_name'
+    ))
+    if not users:
+        return
+
+    phones = {user.phone for user in users if user.phone}
+    by_phone = {}
+    for customer_id, phone in Customer.objects.filter(phone__in=phones).order_by('id').values_list('id', 'phone'):
+        by_phone.setdefault(phone, customer_id)
+
+    def display_name(user):
+        return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+    names = {display_name(user) for user in users if user.phone not in by_phone}
+    by_name = {}
+    for customer_id, name in Customer.objects.filter(customer_name__in=names).order_by('id').values_list('id', 'customer_name'):
+        by_name.setdefault(name, customer_id)
+
+    linked = []
+    for user in users:
+        customer_id = by_phone.get(user.phone) or by_name.get(display_name(user))
+        if customer_id:
+            user.customer_profile_id = customer_id
+            linked.append(user)
+    User.objects.bulk_update(linked, ['customer_profile'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options_alter_user_role'),
+        ('core', '0022_product_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='customer_profile',
+            field=models.ForeignKey(blank=True, help_text='مشتری متصل به این حساب کاربری (به جای جستجو بر اساس تلفن یا نام)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='linked_users', to='core.customer', verbose_name='🔗 پروفایل مشتری'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
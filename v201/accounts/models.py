@@ -95,6 +95,17 @@ class User(AbstractUser, BaseModel):
         help_text="تاریخ انقضای رمز عبور کاربر"
     )
     
+    # 🔗 پروفایل مشتری متصل به کاربر
+    customer_profile = models.ForeignKey(
+        'core.Customer',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='linked_users',
+        verbose_name="🔗 پروفایل مشتری",
+        help_text="مشتری متصل به این حساب کاربری (به جای جستجو بر اساس تلفن یا نام)"
+    )
+    
     class Meta:
         verbose_name = "👤 کاربر"
         verbose_name_plural = "👥 کاربران"
@@ -252,18 +263,8 @@ class User(AbstractUser, BaseModel):
         # جلوگیری از import circular
         from core.models import Customer
         
-        # بررسی اینکه آیا Customer object از قبل وجود دارد یا نه (بر اساس نام یا شماره تلفن)
-        existing_customer = None
-        
-        # ابتدا بر اساس شماره تلفن بررسی کن
-        if self.phone:
-            existing_customer = Customer.objects.filter(phone=self.phone).first()
-        
-        # اگر بر اساس شماره تلفن پیدا نشد، بر اساس نام بررسی کن
-        if not existing_customer:
-            existing_customer = Customer.objects.filter(
-                customer_name=self.get_full_name() or self.username
-            ).first()
+        # بررسی اینکه آیا Customer object از قبل وجود دارد یا نه (بر اساس شماره تلفن یا نام)
+        existing_customer = self.customer_profile if self.customer_profile_id else self._find_customer()
         
         if not existing_customer:
             # ایجاد Customer object جدید
@@ -279,9 +280,8 @@ class User(AbstractUser, BaseModel):
                 national_id=''
             )
             
-            # اتصال Customer به User (در آینده می‌توان یک ForeignKey اضافه کرد)
-            # برای الان از طریق نام و شماره تلفن ارتباط برقرار می‌کنیم
-            
+            # 🔗 اتصال Customer به User
+            self._link_customer(customer)
             return customer
         else:
             # اگر Customer از قبل وجود دارد، آن را به‌روزرسانی کن
@@ -289,8 +289,34 @@ class User(AbstractUser, BaseModel):
             existing_customer.phone = self.phone if self.phone else existing_customer.phone
             existing_customer.comments = f'🔵 به‌روزرسانی خودکار برای کاربر: {self.username}'
             existing_customer.save()
+        self._link_customer(existing_customer)
         return existing_customer
     
+    def _find_customer(self):
+        """
+        🔍 جستجوی Customer مرتبط بر اساس شماره تلفن و سپس نام (بدون اتصال دائمی)
+        """
+        from core.models import Customer
+        
+        # ابتدا بر اساس شماره تلفن جستجو کن
+        if self.phone:
+            customer = Customer.objects.filter(phone=self.phone).first()
+            if customer:
+                return customer
+        
+        # اگر بر اساس شماره تلفن پیدا نشد، بر اساس نام جستجو کن
+        return Customer.objects.filter(
+            customer_name=self.get_full_name() or self.username
+        ).first()
+    
+    def _link_customer(self, customer):
+        """
+        🔗 ذخیره اتصال دائمی کاربر به Customer بدون اجرای دوباره منطق save
+        """
+        self.customer_profile = customer
+        if self.pk and customer is not None:
+            User.objects.filter(pk=self.pk).update(customer_profile=customer)
+    
     def __str__(self):
         """
         📄 نمایش رشته‌ای کاربر
@@ -393,21 +419,25 @@ class User(AbstractUser, BaseModel):
     def customer(self):
         """
         🔵 دسترسی به Customer object مرتبط با کاربر
+        🔗 از اتصال دائمی customer_profile استفاده می‌کند (با select_related بدون کوئری اضافه)
+        🧠 نتیجه روی همین نمونه کاربر (یعنی برای هر درخواست) نگه داشته می‌شود
         """
-        from core.models import Customer
+        if self.customer_profile_id:
+            return self.customer_profile
         
-        # ابتدا بر اساس شماره تلفن جستجو کن
-        if self.phone:
-            customer = Customer.objects.filter(phone=self.phone).first()
-            if customer:
+        if not hasattr(self, '_customer_cache'):
+            # 🔍 کاربران قدیمی بدون اتصال: یک بار جستجو و اتصال دائمی
+            customer = self._find_customer() if self.pk else None
+            if customer is not None:
+                self._link_customer(customer)
                 return customer
-        
-        # اگر بر اساس شماره تلفن پیدا نشد، بر اساس نام جستجو کن
-        customer = Customer.objects.filter(
-            customer_name=self.get_full_name() or self.username
-        ).first()
-        
-        return customer
+            self._customer_cache = None
+        return self._customer_cache
+    
+    @customer.setter
+    def customer(self, value):
+        self.customer_profile = value
+        self.__dict__.pop('_customer_cache', None)
 
 
 class UserSession(BaseModel):
@@ -1,3 +1,42 @@
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.backends import CustomerLinkedModelBackend
+from accounts.models import User
+from core.models import Customer
+
+
+class UserCustomerLinkTest(TestCase):
+    """Test the persistent, memoized User → Customer link"""
+
+    def test_new_customer_user_is_linked(self):
+        user = User.objects.create_user(username='linked', password='x', phone='09120000101', role=User.UserRole.CUSTOMER)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.customer_profile_id)
+        self.assertEqual(user.customer.phone, '09120000101')
+
+    def test_legacy_user_is_resolved_once_and_persisted(self):
+        user = User.objects.create_user(username='legacy', password='x', phone='09120000102', role=User.UserRole.ADMIN)
+        customer = Customer.objects.create(customer_name='Legacy', phone='09120000102')
+        user = User.objects.get(pk=user.pk)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(user.customer, customer)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.customer, customer)
+        self.assertEqual(User.objects.get(pk=user.pk).customer_profile_id, customer.pk)
+
+    def test_missing_customer_is_memoized(self):
+        user = User.objects.create_user(username='nobody', password='x', phone='09120000103', role=User.UserRole.ADMIN)
+        user = User.objects.get(pk=user.pk)
+
+        with self.assertNumQueries(2):
+            self.assertIsNone(user.customer)
+        with self.assertNumQueries(0):
+            self.assertIsNone(user.customer)
+
+    def test_backend_loads_customer_with_user(self):
+        user = User.objects.create_user(username='joined', password='x', phone='09120000104', role=User.UserRole.CUSTOMER)
+
+        with self.assertNumQueries(1):
+            loaded = CustomerLinkedModelBackend().get_user(user.pk)
+            self.assertEqual(loaded.customer.phone, '09120000104')
@@ -286,9 +286,7 @@ def customer_dashboard_view(request):
         return redirect('core:admin_dashboard')
     
     # دریافت اطلاعات مشتری مرتبط
-    customer = Customer.objects.filter(
-        customer_name=request.user.get_full_name() or request.user.username
-    ).first()
+    customer = request.user.customer
     
     context = {
         'user': request.user,
@@ -1054,7 +1052,7 @@ def customer_sms_verify_view(request):
             try:
                 # دریافت کاربر و ورود
                 user = User.objects.get(id=sms_data['user_id'])
-                login(request, user)
+                login(request, user, backend='accounts.backends.CustomerLinkedModelBackend')
                 
                 # پاک کردن اطلاعات تایید از session
                 request.session.pop('sms_verification', None)
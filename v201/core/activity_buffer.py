@@ -0,0 +1,196 @@
+"""
+📜 نوشتن بافر شده لاگ فعالیت‌ها - HomayOMS
+📋 لاگ‌های فعالیت به جای INSERT در مسیر درخواست، در یک صف محدود قرار می‌گیرند
+🧵 یک thread پس‌زمینه هر N رویداد یا هر M میلی‌ثانیه آن‌ها را با bulk_create ذخیره می‌کند
+⚖️ سیاست‌ها:
+    - HIGH / CRITICAL → همیشه ذخیره هم‌زمان
+    - VIEW با اهمیت LOW → نمونه‌برداری و در صورت پر بودن صف حذف
+    - سایر رویدادها → در صورت پر بودن صف، انتظار کوتاه (backpressure) و سپس ذخیره هم‌زمان
+"""
+
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+SYNC_SEVERITIES = ('HIGH', 'CRITICAL')
+
+QUEUED = 'queued'
+SYNC = 'sync'
+SAMPLED = 'sampled'
+DROPPED = 'dropped'
+
+
+class ActivityLogBuffer:
+    """
+    🧵 بافر محدود لاگ‌های فعالیت با ذخیره دسته‌ای
+
+    🔧 استفاده:
+        buffer = get_activity_log_buffer()
+        buffer.submit(ActivityLog(user=user, action='VIEW', description='...'))
+    """
+
+    def __init__(self, batch_size=None, flush_interval_ms=None, queue_size=None,
+                 enqueue_timeout_ms=None, view_sample_rate=None, start_worker=True):
+        self.batch_size = batch_size or getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 100)
+        self.flush_interval = (
+            flush_interval_ms if flush_interval_ms is not None
+            else getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL_MS', 500)
+        ) / 1000
+        self.enqueue_timeout = (
+            enqueue_timeout_ms if enqueue_timeout_ms is not None
+            else getattr(settings, 'ACTIVITY_LOG_ENQUEUE_TIMEOUT_MS', 50)
+        ) / 1000
+        self.view_sample_rate = (
+            view_sample_rate if view_sample_rate is not None
+            else getattr(settings, 'ACTIVITY_LOG_VIEW_SAMPLE_RATE', 1.0)
+        )
+        self.start_worker = start_worker
+        self._queue = queue.Queue(maxsize=queue_size or getattr(settings, 'ACTIVITY_LOG_QUEUE_SIZE', 10000))
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.stats = {QUEUED: 0, SYNC: 0, SAMPLED: 0, DROPPED: 0, 'flushed': 0}
+
+    def submit(self, entry):
+        """
+        📥 ثبت یک لاگ (نمونه ذخیره نشده ActivityLog) بر اساس سیاست‌های صف
+
+        📤 خروجی: یکی از 'queued'، 'sync'، 'sampled' یا 'dropped'
+        """
+        if entry.severity in SYNC_SEVERITIES:
+            return self._write_sync(entry)
+
+        droppable = entry.action == 'VIEW' and entry.severity == 'LOW'
+        if droppable:
+            if self.view_sample_rate < 1 and random.random() >= self.view_sample_rate:
+                self.stats[SAMPLED] += 1
+                return SAMPLED
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self.stats[DROPPED] += 1
+                return DROPPED
+        else:
+            try:
+                # ⏳ backpressure: انتظار کوتاه برای خالی شدن صف
+                self._queue.put(entry, timeout=self.enqueue_timeout)
+            except queue.Full:
+                logger.warning("⚠️ صف لاگ فعالیت پر است - ذخیره هم‌زمان")
+                return self._write_sync(entry)
+
+        self.stats[QUEUED] += 1
+        self._ensure_worker()
+        return QUEUED
+
+    def flush(self):
+        """
+        💾 ذخیره تمام رویدادهای موجود در صف (در thread فراخوان)
+        """
+        flushed = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return flushed
+            self._write_batch(batch)
+            flushed += len(batch)
+
+    def pending(self):
+        """
+        📊 تعداد رویدادهای در انتظار ذخیره
+        """
+        return self._queue.qsize()
+
+    def _write_sync(self, entry):
+        entry.save()
+        self.stats[SYNC] += 1
+        return SYNC
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        model = type(batch[0])
+        with self._flush_lock:
+            try:
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception as e:
+                logger.error(f"❌ خطا در ذخیره دسته‌ای {len(batch)} لاگ فعالیت: {str(e)}")
+                # 🔁 ذخیره تک‌به‌تک تا یک ردیف خراب کل دسته را از بین نبرد
+                for entry in batch:
+                    try:
+                        entry.save()
+                    except Exception as row_error:
+                        logger.error(f"❌ لاگ فعالیت ذخیره نشد: {str(row_error)}")
+            self.stats['flushed'] += len(batch)
+
+    def _ensure_worker(self):
+        if not self.start_worker:
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=60)
+            except queue.Empty:
+                continue
+
+            # ⏳ جمع کردن رویدادها تا رسیدن به batch_size یا پایان بازه زمانی
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            close_old_connections()
+            try:
+                self._write_batch(batch)
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_log_buffer():
+    """
+    🧵 دریافت بافر سراسری لاگ فعالیت (یکی برای هر پردازه)
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = ActivityLogBuffer()
+            atexit.register(_flush_at_exit)
+        return _buffer
+
+
+def _flush_at_exit():
+    if _buffer is None:
+        return
+    try:
+        _buffer.flush()
+    except Exception as e:
+        logger.error(f"❌ خطا در ذخیره لاگ‌های باقی‌مانده هنگام خروج: {str(e)}")
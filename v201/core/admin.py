@@ -10,9 +10,11 @@ from django.contrib import messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.shortcuts import render, redirect
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django import forms
-from .models import Customer, Product, ActivityLog, Order, OrderItem, WorkingHours
+from .catalogue_cache import schedule_catalogue_bump
+from .models import Customer, Product, ActivityLog, Order, OrderItem, WorkingHours, AuditEvent, DailyFinanceRollup
 from HomayOMS.utils import normalize_phone_input, validate_phone_input, normalize_number_input, validate_number_input
 from HomayOMS.utils import NumberValidationError
 
@@ -402,7 +404,8 @@ class ProductAdmin(admin.ModelAdmin):
     # 🎯 اکشن‌های سفارشی
     def mark_as_sold(self, request, queryset):
         """💰 علامت‌گذاری به عنوان فروخته شده"""
-        updated = queryset.update(status='Sold')
+        updated = queryset.update(status='Sold', updated_at=timezone.now())
+        schedule_catalogue_bump()
         self.message_user(
             request,
             f'💰 {updated} محصول به عنوان فروخته شده علامت‌گذاری شدند.'
@@ -411,7 +414,8 @@ class ProductAdmin(admin.ModelAdmin):
     
     def mark_as_in_stock(self, request, queryset):
         """📦 علامت‌گذاری به عنوان موجود در انبار"""
-        updated = queryset.update(status='In-stock')
+        updated = queryset.update(status='In-stock', updated_at=timezone.now())
+        schedule_catalogue_bump()
         self.message_user(
             request,
             f'📦 {updated} محصول به عنوان موجود در انبار علامت‌گذاری شدند.'
@@ -420,7 +424,8 @@ class ProductAdmin(admin.ModelAdmin):
     
     def mark_as_pre_order(self, request, queryset):
         """⏳ علامت‌گذاری به عنوان پیش‌سفارش"""
-        updated = queryset.update(status='Pre-order')
+        updated = queryset.update(status='Pre-order', updated_at=timezone.now())
+        schedule_catalogue_bump()
         self.message_user(
             request,
             f'⏳ {updated} محصول به عنوان پیش‌سفارش علامت‌گذاری شدند.'
@@ -922,6 +927,47 @@ class ActivityLogAdmin(admin.ModelAdmin):
     extra_data_display.short_description = "📄 اطلاعات اضافی"
 
 
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    """
+    🧾 پنل مدیریت رویدادهای تغییرات (جایگزین فیلدهای متنی logs)
+    """
+    
+    list_display = ['timestamp', 'content_type', 'object_id', 'action', 'field_name', 'message', 'actor']
+    list_filter = ['action', 'content_type', 'field_name']
+    search_fields = ['message', 'actor']
+    list_select_related = ['content_type']
+    date_hierarchy = 'timestamp'
+    list_per_page = 50
+    
+    # 🚫 رویدادها فقط از طریق سیستم ثبت می‌شوند و قابل تغییر نیستند
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyFinanceRollup)
+class DailyFinanceRollupAdmin(admin.ModelAdmin):
+    """
+    📈 پنل مدیریت خلاصه‌های مالی روزانه (فقط خواندنی - با backfill_finance_rollups بازسازی می‌شود)
+    """
+    
+    list_display = ['date', 'orders_count', 'revenue_orders_count', 'pending_orders_count', 'revenue', 'expenses', 'failed_payments_count']
+    date_hierarchy = 'date'
+    list_per_page = 50
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(WorkingHours)
 class WorkingHoursAdmin(ModelAdmin):
     """
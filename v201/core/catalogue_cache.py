@@ -0,0 +1,156 @@
+"""
+🗂️ کش قطعه‌های رندر شده کاتالوگ فروشگاه - HomayOMS
+🔢 تمام کلیدها به یک «نسخه کاتالوگ» سراسری وابسته‌اند؛ هر تغییر محصول نسخه را افزایش می‌دهد
+🧠 دو لایه: حافظه محلی هر پردازه (LRU) + cache مشترک Django (مثلاً FileBasedCache بین workerهای Gunicorn)
+📊 آمار hit/miss هر پردازه برای پایش کارایی نگه داشته می‌شود
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'homayoms:catalogue:version'
+KEY_PREFIX = 'homayoms:catalogue'
+
+
+class CatalogueCache:
+    """
+    🗂️ کش نسخه‌دار قطعه‌های کاتالوگ
+
+    🔧 استفاده:
+        catalogue_cache = get_catalogue_cache()
+        payload = catalogue_cache.get_or_set(('index',), build_payload)
+        catalogue_cache.bump()  # پس از تغییر دسته‌ای محصولات
+    """
+
+    def __init__(self, alias=None, local_size=None, timeout=None):
+        self.alias = alias or getattr(settings, 'CATALOGUE_CACHE_ALIAS', 'default')
+        self.local_size = local_size or getattr(settings, 'CATALOGUE_CACHE_LOCAL_SIZE', 256)
+        self.timeout = timeout or getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 3600)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'bumps': 0}
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def get_version(self):
+        """
+        🔢 نسخه فعلی کاتالوگ (از cache مشترک)
+        """
+        version = self.backend.get(VERSION_KEY)
+        if version is None:
+            self.backend.add(VERSION_KEY, 1, timeout=None)
+            version = self.backend.get(VERSION_KEY) or 1
+        return version
+
+    def bump(self):
+        """
+        🔄 افزایش نسخه کاتالوگ - تمام قطعه‌های قبلی در همه workerها بی‌اعتبار می‌شوند
+        """
+        self.backend.add(VERSION_KEY, 1, timeout=None)
+        try:
+            version = self.backend.incr(VERSION_KEY)
+        except ValueError:
+            version = 1
+            self.backend.set(VERSION_KEY, version, timeout=None)
+        with self._lock:
+            self._local.clear()
+            self.stats['bumps'] += 1
+        return version
+
+    def get_or_set(self, key_parts, builder):
+        """
+        📦 دریافت قطعه از کش (محلی، سپس مشترک) یا ساخت و ذخیره آن
+
+        🔑 key_parts هر مقدار قابل تبدیل به JSON است (مثلاً نوع صفحه، cursor و فیلترها)
+        """
+        key = self.make_key(self.get_version(), key_parts)
+
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                self.stats['local_hits'] += 1
+                return self._local[key]
+
+        value = self.backend.get(key)
+        if value is not None:
+            self.stats['shared_hits'] += 1
+        else:
+            self.stats['misses'] += 1
+            value = builder()
+            self.backend.set(key, value, timeout=self.timeout)
+
+        with self._lock:
+            self._local[key] = value
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+        return value
+
+    @staticmethod
+    def make_key(version, key_parts):
+        digest = hashlib.md5(
+            json.dumps(key_parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f'{KEY_PREFIX}:{version}:{digest}'
+
+    def get_stats(self):
+        """
+        📊 آمار hit/miss این پردازه
+        """
+        stats = dict(self.stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 3) if lookups else 0
+        stats['local_entries'] = len(self._local)
+        return stats
+
+
+_catalogue_cache = None
+_catalogue_cache_lock = threading.Lock()
+_bump_state = threading.local()
+
+
+def get_catalogue_cache():
+    """
+    🗂️ دریافت کش سراسری کاتالوگ (یکی برای هر پردازه)
+    """
+    global _catalogue_cache
+    with _catalogue_cache_lock:
+        if _catalogue_cache is None:
+            _catalogue_cache = CatalogueCache()
+        return _catalogue_cache
+
+
+def schedule_catalogue_bump():
+    """
+    ⏰ بی‌اعتبار کردن کاتالوگ پس از تغییر محصولات
+
+    🎯 نسخه فوراً افزایش می‌یابد و پس از commit یک بار دیگر (فقط یک بار برای هر تراکنش)
+    تا workerهایی که پیش از commit داده قدیمی را کش کرده‌اند هم بازسازی کنند
+    """
+    catalogue_cache = get_catalogue_cache()
+    try:
+        catalogue_cache.bump()
+    except Exception as e:
+        logger.error(f"❌ خطا در افزایش نسخه کاتالوگ: {str(e)}")
+
+    _bump_state.pending = True
+
+    def _after_commit():
+        if getattr(_bump_state, 'pending', False):
+            _bump_state.pending = False
+            try:
+                catalogue_cache.bump()
+            except Exception as e:
+                logger.error(f"❌ خطا در افزایش نسخه کاتالوگ: {str(e)}")
+
+    transaction.on_commit(_after_commit)
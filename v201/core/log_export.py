@@ -0,0 +1,520 @@
+"""
+📤 خروجی افزایشی لاگ‌های تحلیلی - HomayOMS
+📋 این ماژول لاگ‌های مشتری، سفارش و پرداخت را به صورت append-only در csv_logs می‌نویسد
+⏰ برای هر فایل یک high-water mark (شناسه آخرین AuditEvent خروجی) نگه‌داری می‌شود تا فقط خطوط جدید اضافه شوند
+🧵 خروجی در یک thread پس‌زمینه و خارج از مسیر درخواست اجرا می‌شود
+🔄 فایل‌ها بر اساس حجم یا روز چرخش (rotate) پیدا می‌کنند
+"""
+
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from HomayOMS.locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+STATE_FILENAME = '.export_state.json'
+LOCK_FILENAME = '.export.lock'
+
+
+def _customer_row(customer):
+    return [customer.id, customer.customer_name]
+
+
+def _order_row(order):
+    return [order.id, order.order_number]
+
+
+def _payment_row(payment):
+    order = payment.order
+    return [
+        payment.id,
+        payment.tracking_code,
+        order.order_number if order else '',
+        order.customer.customer_name if order and order.customer else '',
+        payment.get_gateway_display_persian(),
+        f"{payment.display_amount:,.0f}" if payment.display_amount else '',
+        payment.get_status_display_persian(),
+    ]
+
+
+def _payment_tail(payment):
+    return [payment.created_at.strftime(TIMESTAMP_FORMAT) if payment.created_at else '']
+
+
+# 📋 تعریف منابع خروجی: هر منبع یک فایل CSV در csv_logs دارد
+LOG_EXPORT_SOURCES = {
+    'customers': {
+        'model': 'core.Customer',
+        'filename': 'customers_logs.csv',
+        'header': ['customer_id', 'customer_name', 'log_line'],
+        'row': _customer_row,
+        'select_related': [],
+    },
+    'orders': {
+        'model': 'core.Order',
+        'filename': 'orders_logs.csv',
+        'header': ['order_id', 'order_number', 'log_line'],
+        'row': _order_row,
+        'select_related': [],
+    },
+    'payments': {
+        'model': 'payments.Payment',
+        'filename': 'payments_logs.csv',
+        'header': [
+            'Payment ID', 'Tracking Code', 'Order Number', 'Customer Name',
+            'Gateway', 'Amount (Toman)', 'Status', 'Logs', 'Created At'
+        ],
+        'row': _payment_row,
+        'tail': _payment_tail,
+        'select_related': ['order__customer'],
+    },
+}
+
+
+def get_log_export_dir():
+    """
+    📁 مسیر پوشه csv_logs
+    """
+    return str(getattr(settings, 'LOG_EXPORT_DIR', os.path.join(settings.BASE_DIR, 'csv_logs')))
+
+
+def split_log_lines(logs):
+    """
+    ✂️ جدا کردن رشته لاگ‌های قدیمی (جداشده با کاما) به خطوط مجزا
+    """
+    if not logs:
+        return []
+    return [line.strip() for line in logs.split(',') if line.strip()]
+
+
+def line_timestamp(line):
+    """
+    ⏰ استخراج زمان از ابتدای خط لاگ (فرمت YYYY-MM-DD HH:MM:SS یا [YYYY-MM-DD HH:MM:SS])
+    """
+    candidate = line.lstrip('[')[:19]
+    try:
+        datetime.strptime(candidate, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return candidate
+
+
+_ACTOR_PATTERN = re.compile(r' By (?P<actor>.*)$')
+_CHANGE_PATTERN = re.compile(r"^(?P<label>[A-Za-z ]+?) changed from (?P<old>.*) to (?P<new>.*?)(?: Toman)? By .*$")
+_LEGACY_FIELD_NAMES = {
+    'name': 'customer_name',
+    'discount': 'discount_percentage',
+    'payment method': 'payment_method',
+    'total amount': 'total_amount',
+    'final amount': 'final_amount',
+}
+
+
+def parse_legacy_log_line(line):
+    """
+    🧩 تبدیل یک خط لاگ متنی قدیمی به اجزای رویداد ساخت‌یافته
+
+    📊 خروجی:
+        {'timestamp': datetime یا None, 'message', 'action', 'field_name', 'old_value', 'new_value', 'actor'}
+    """
+    ts = line_timestamp(line)
+    message = line.lstrip('[')[19:].lstrip(']').strip() if ts else line.strip()
+    parsed = {
+        'timestamp': datetime.strptime(ts, TIMESTAMP_FORMAT).replace(tzinfo=dt_timezone.utc) if ts else None,
+        'message': message,
+        'action': 'INFO',
+        'field_name': '',
+        'old_value': '',
+        'new_value': '',
+        'actor': '',
+    }
+
+    actor = _ACTOR_PATTERN.search(message)
+    if actor:
+        parsed['actor'] = actor.group('actor')[:150]
+
+    change = _CHANGE_PATTERN.match(message)
+    if change:
+        label = change.group('label').strip().lower()
+        parsed.update({
+            'action': 'UPDATE',
+            'field_name': _LEGACY_FIELD_NAMES.get(label, label.replace(' ', '_'))[:50],
+            'old_value': change.group('old').strip("'%"),
+            'new_value': change.group('new').strip("'%"),
+        })
+    elif ' Created By ' in message:
+        parsed['action'] = 'CREATE'
+    elif ' Updated By ' in message:
+        parsed['action'] = 'UPDATE'
+    return parsed
+
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class LogExporter:
+    """
+    📤 خروجی‌گیر افزایشی لاگ‌ها
+
+    🎯 برای هر منبع فقط رویدادهای AuditEvent با شناسه بزرگ‌تر از high-water mark خوانده می‌شوند
+    ⏳ رویدادهای خیلی تازه (کمتر از settle_seconds) به اجرای بعدی موکول می‌شوند
+       تا تراکنش‌های هم‌زمانی که هنوز commit نشده‌اند از قلم نیفتند
+    🕳️ شناسه‌های خالی زیر high-water mark (تراکنش commit نشده) در open_ids نگه داشته و در اجراهای بعدی
+       دوباره بررسی می‌شوند؛ پس از gap_seconds تراکنش rollback شده فرض می‌شود
+
+    🔧 استفاده:
+        LogExporter().export('orders')             # فقط خطوط جدید
+        LogExporter().export('orders', full=True)  # بازسازی کامل فایل
+    """
+
+    def __init__(self, export_dir=None, settle_seconds=None, rotate_bytes=None, rotate_daily=None, gap_seconds=None):
+        self.export_dir = str(export_dir or get_log_export_dir())
+        self.settle_seconds = (
+            settle_seconds if settle_seconds is not None
+            else getattr(settings, 'LOG_EXPORT_SETTLE_SECONDS', 2)
+        )
+        self.gap_seconds = (
+            gap_seconds if gap_seconds is not None
+            else getattr(settings, 'LOG_EXPORT_GAP_SECONDS', 300)
+        )
+        self.rotate_bytes = (
+            rotate_bytes if rotate_bytes is not None
+            else getattr(settings, 'LOG_EXPORT_ROTATE_BYTES', 10 * 1024 * 1024)
+        )
+        self.rotate_daily = (
+            rotate_daily if rotate_daily is not None
+            else getattr(settings, 'LOG_EXPORT_ROTATE_DAILY', True)
+        )
+
+    # ------------------------------------------------------------------
+    # 📌 وضعیت (high-water mark) هر فایل
+    # ------------------------------------------------------------------
+    @property
+    def state_path(self):
+        return os.path.join(self.export_dir, STATE_FILENAME)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+        finally:
+            _remove_if_exists(tmp_path)
+
+    def get_state(self, name):
+        """
+        📌 دریافت high-water mark فعلی یک منبع
+        """
+        return self._load_state().get(name, {})
+
+    # ------------------------------------------------------------------
+    # 🔄 چرخش فایل‌ها
+    # ------------------------------------------------------------------
+    def _archive_path(self, path, day):
+        base, ext = os.path.splitext(path)
+        candidate = f"{base}.{day.replace('-', '')}{ext}"
+        counter = 1
+        while os.path.exists(candidate):
+            candidate = f"{base}.{day.replace('-', '')}-{counter}{ext}"
+            counter += 1
+        return candidate
+
+    def _rotate_if_needed(self, path, source_state, today):
+        if not os.path.exists(path):
+            return False
+        file_day = source_state.get('file_day') or today
+        too_big = self.rotate_bytes and os.path.getsize(path) >= self.rotate_bytes
+        new_day = self.rotate_daily and file_day != today
+        if not (too_big or new_day):
+            return False
+        archive = self._archive_path(path, file_day)
+        os.replace(path, archive)
+        logger.info(f"🔄 فایل لاگ {os.path.basename(path)} به {os.path.basename(archive)} منتقل شد")
+        return True
+
+    # ------------------------------------------------------------------
+    # 📤 خروجی
+    # ------------------------------------------------------------------
+    def _iter_lines(self, source, after_id=0, chunk_size=1000, ids=None):
+        """
+        📋 پیمایش (event, csv_row) برای رویدادهای بعد از after_id به ترتیب شناسه (یا فقط شناسه‌های ids)
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from core.models import AuditEvent
+
+        model = apps.get_model(source['model'])
+        content_type = ContentType.objects.get_for_model(model)
+        tail = source.get('tail')
+        prefix_width = len(source['header']) - 1 - (1 if tail else 0)
+
+        events = AuditEvent.objects.filter(content_type=content_type)
+        if ids is not None:
+            events = events.filter(id__in=ids)
+        last_id = after_id
+        while True:
+            chunk = list(events.filter(id__gt=last_id).order_by('id')[:chunk_size])
+            if not chunk:
+                return
+            queryset = model.objects.all()
+            if source['select_related']:
+                queryset = queryset.select_related(*source['select_related'])
+            objects = queryset.in_bulk({event.object_id for event in chunk})
+
+            for event in chunk:
+                obj = objects.get(event.object_id)
+                if obj is not None:
+                    prefix = source['row'](obj)
+                    suffix = tail(obj) if tail else []
+                else:
+                    # 🗑️ آبجکت حذف شده - تاریخچه همچنان خروجی گرفته می‌شود
+                    prefix = [event.object_id] + [''] * (prefix_width - 1)
+                    suffix = [''] if tail else []
+                yield event, prefix + [event.as_log_line()] + suffix
+            last_id = chunk[-1].id
+
+    def _find_gaps(self, low_id, high_id, horizon):
+        """
+        🕳️ شناسه‌های (low_id, high_id] که در هیچ منبعی وجود ندارند - احتمالاً تراکنش هنوز commit نشده
+
+        📊 خروجی: {شناسه: زمان اولین رویداد موجود بعد از آن} - شکاف‌های قدیمی‌تر از horizon کنار گذاشته می‌شوند
+        """
+        from core.models import AuditEvent
+
+        gaps = {}
+        expected = low_id + 1
+        rows = AuditEvent.objects.filter(id__gt=low_id, id__lte=high_id).order_by('id').values_list('id', 'timestamp')
+        for event_id, timestamp in rows.iterator(chunk_size=2000):
+            if event_id > expected and timestamp >= horizon:
+                gaps.update({str(missing): timestamp.isoformat() for missing in range(expected, event_id)})
+            expected = event_id + 1
+        return gaps
+
+    def _recheck_open_ids(self, source, open_ids, horizon):
+        """
+        🔁 بررسی دوباره شکاف‌های قبلی: رویدادهای commit شده این منبع خروجی گرفته می‌شوند
+
+        📊 خروجی: (ردیف‌های جدید, شکاف‌هایی که هنوز باز هستند)
+        """
+        from core.models import AuditEvent
+
+        if not open_ids:
+            return [], {}
+        ids = [int(event_id) for event_id in open_ids]
+        rows = [row for event, row in self._iter_lines(source, ids=ids)]
+        # ✅ شناسه‌هایی که اکنون وجود دارند (در این منبع یا منبع دیگر) دیگر شکاف نیستند
+        resolved = {str(event_id) for event_id in AuditEvent.objects.filter(id__in=ids).values_list('id', flat=True)}
+        still_open = {
+            event_id: seen for event_id, seen in open_ids.items()
+            if event_id not in resolved and datetime.fromisoformat(seen) >= horizon
+        }
+        return rows, still_open
+
+    def export(self, name, full=False):
+        """
+        📤 خروجی یک منبع (customers / orders / payments)
+
+        📊 خروجی:
+            {'name': ..., 'lines': تعداد خطوط نوشته شده, 'deferred': آیا خطوط تازه‌ای منتظر اجرای بعدی هستند}
+        """
+        source = LOG_EXPORT_SOURCES[name]
+        os.makedirs(self.export_dir, exist_ok=True)
+
+        with FileLock(os.path.join(self.export_dir, LOCK_FILENAME)):
+            state = self._load_state()
+            path = os.path.join(self.export_dir, source['filename'])
+            # 🔁 فایل قدیمی بدون high-water mark: یک بار بازسازی کامل
+            bootstrap = 'hwm_id' not in (state.get(name) or {}) and os.path.exists(path)
+            if full or bootstrap:
+                result = self._export_full(name, source, state)
+            else:
+                result = self._export_incremental(name, source, state)
+            self._save_state(state)
+        return result
+
+    def _export_full(self, name, source, state):
+        path = os.path.join(self.export_dir, source['filename'])
+        today = timezone.now().strftime('%Y-%m-%d')
+        tmp_path = f"{path}.tmp"
+        hwm_id, count = 0, 0
+
+        try:
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(source['header'])
+                for event, row in self._iter_lines(source):
+                    writer.writerow(row)
+                    count += 1
+                    hwm_id = event.id
+
+            # 🧹 فایل بازسازی شده جایگزین آرشیوهای قبلی این منبع می‌شود
+            base, ext = os.path.splitext(path)
+            for archive in glob.glob(f"{glob.escape(base)}.*{ext}"):
+                os.remove(archive)
+            os.replace(tmp_path, path)
+        finally:
+            # 🧹 خطا پیش از os.replace فایل tmp نیمه‌کاره باقی نمی‌گذارد
+            _remove_if_exists(tmp_path)
+
+        state[name] = {
+            'hwm_id': hwm_id,
+            'open_ids': self._find_gaps(0, hwm_id, timezone.now() - timedelta(seconds=self.gap_seconds)),
+            'file_day': today,
+            'exported_at': timezone.now().isoformat(),
+        }
+        return {'name': name, 'path': path, 'lines': count, 'deferred': False}
+
+    def _export_incremental(self, name, source, state):
+        path = os.path.join(self.export_dir, source['filename'])
+        source_state = state.get(name) or {}
+        start_id = hwm_id = source_state.get('hwm_id', 0)
+        today = timezone.now().strftime('%Y-%m-%d')
+        cutoff = timezone.now() - timedelta(seconds=self.settle_seconds)
+        horizon = timezone.now() - timedelta(seconds=self.gap_seconds)
+
+        # 🕳️ رویدادهایی که پس از عبور high-water mark commit شده‌اند
+        new_rows, open_ids = self._recheck_open_ids(source, source_state.get('open_ids') or {}, horizon)
+        deferred = False
+        for event, row in self._iter_lines(source, after_id=hwm_id):
+            if event.timestamp > cutoff:
+                # ⏳ از این رویداد به بعد در اجرای بعدی (ترتیب شناسه‌ها حفظ می‌شود)
+                deferred = True
+                break
+            new_rows.append(row)
+            hwm_id = event.id
+
+        if new_rows:
+            self._rotate_if_needed(path, source_state, today)
+            write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(source['header'])
+                    source_state['file_day'] = today
+                writer.writerows(new_rows)
+
+        open_ids.update(self._find_gaps(start_id, hwm_id, horizon))
+        source_state.update({
+            'hwm_id': hwm_id,
+            'open_ids': open_ids,
+            'exported_at': timezone.now().isoformat(),
+        })
+        source_state.setdefault('file_day', today)
+        state[name] = source_state
+        # 🔁 شکاف‌های باز باید در اجرای بعدی دوباره بررسی شوند
+        return {'name': name, 'path': path, 'lines': len(new_rows), 'deferred': deferred or bool(open_ids)}
+
+
+class LogExportWorker:
+    """
+    🧵 کارگر پس‌زمینه خروجی لاگ‌ها
+
+    🎯 ذخیره مدل‌ها فقط نام منبع را در صف قرار می‌دهند
+    ⏳ کارگر پس از یک مکث کوتاه (debounce) همه درخواست‌های جمع شده را یک‌جا خروجی می‌گیرد
+    """
+
+    def __init__(self, debounce_seconds=None):
+        self.debounce_seconds = (
+            debounce_seconds if debounce_seconds is not None
+            else getattr(settings, 'LOG_EXPORT_DEBOUNCE_SECONDS', 2)
+        )
+        self._pending = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, name):
+        """
+        📥 افزودن یک منبع به صف خروجی
+        """
+        with self._condition:
+            self._pending.add(name)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='log-export-worker', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        exporter = LogExporter()
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            # ⏳ جمع کردن ذخیره‌های پشت سر هم در یک خروجی
+            time.sleep(self.debounce_seconds)
+            with self._condition:
+                names, self._pending = self._pending, set()
+
+            close_old_connections()
+            try:
+                for name in sorted(names):
+                    try:
+                        result = exporter.export(name)
+                        if result['deferred']:
+                            self.schedule(name)
+                    except Exception as e:
+                        logger.error(f"❌ خطا در خروجی افزایشی لاگ {name}: {str(e)}")
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_log_export_worker():
+    """
+    🧵 دریافت کارگر سراسری خروجی لاگ (یکی برای هر پردازه)
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = LogExportWorker()
+        return _worker
+
+
+def schedule_log_export(name):
+    """
+    📤 درخواست خروجی افزایشی برای یک منبع پس از commit تراکنش فعلی
+
+    ⚙️ تنظیمات:
+        LOG_EXPORT_ENABLED = False  → غیرفعال
+        LOG_EXPORT_ASYNC = False    → اجرای هم‌زمان (مثلاً در اسکریپت‌ها)
+    """
+    if not getattr(settings, 'LOG_EXPORT_ENABLED', True):
+        return
+
+    def _dispatch():
+        if getattr(settings, 'LOG_EXPORT_ASYNC', True):
+            get_log_export_worker().schedule(name)
+        else:
+            try:
+                LogExporter(settle_seconds=0).export(name)
+            except Exception as e:
+                logger.error(f"❌ خطا در خروجی لاگ {name}: {str(e)}")
+
+    transaction.on_commit(_dispatch)
@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import DailyFinanceRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DailyFinanceRollup rows from orders and payments (all history by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='First day to rebuild (YYYY-MM-DD). Defaults to the oldest order/payment.',
+        )
+        parser.add_argument(
+            '--end',
+            help='Last day to rebuild (YYYY-MM-DD). Defaults to today.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        if start and end and start > end:
+            raise CommandError('--start must not be after --end')
+
+        days = DailyFinanceRollup.backfill(start, end)
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {days} daily finance rollup rows'))
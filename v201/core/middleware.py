@@ -46,4 +46,15 @@ def set_current_user(user):
     """
     👤 تنظیم کاربر فعلی در thread-local storage
     """
-    _thread_locals.user = user 
\ No newline at end of file
+    _thread_locals.user = user 
+
+def get_current_username(default='system'):
+    """
+    👤 نام نمایشی کاربر فعلی برای ثبت در لاگ‌های تغییرات
+    """
+    user = get_current_user()
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return default
+    if hasattr(user, 'get_full_name'):
+        return user.get_full_name() or user.username
+    return getattr(user, 'username', default) or default
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0017_workinghours_cash_purchases_disabled_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='🆔 شناسه آبجکت')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, help_text='زمان ثبت رویداد', verbose_name='⏰ زمان')),
+                ('action', models.CharField(choices=[('CREATE', '✅ ایجاد'), ('UPDATE', '📝 ویرایش'), ('INFO', 'ℹ️ اطلاعات')], default='UPDATE', max_length=10, verbose_name='🎭 نوع رویداد')),
+                ('field_name', models.CharField(blank=True, default='', max_length=50, verbose_name='🏷️ فیلد')),
+                ('old_value', models.TextField(blank=True, default='', verbose_name='⬅️ مقدار قبلی')),
+                ('new_value', models.TextField(blank=True, default='', verbose_name='➡️ مقدار جدید')),
+                ('message', models.TextField(verbose_name='📝 پیام')),
+                ('actor', models.CharField(blank=True, default='', max_length=150, verbose_name='👤 انجام‌دهنده')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype', verbose_name='🔗 نوع محتوا')),
+            ],
+            options={
+                'verbose_name': '🧾 رویداد تغییرات',
+                'verbose_name_plural': '🧾 رویدادهای تغییرات',
+                'ordering': ['timestamp', 'id'],
+                'indexes': [models.Index(fields=['content_type', 'object_id', 'timestamp'], name='core_audite_content_a8188c_idx'), models.Index(fields=['timestamp'], name='core_audite_timesta_3a802b_idx')],
+            },
+        ),
+    ]
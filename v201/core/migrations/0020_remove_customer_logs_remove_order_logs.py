@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_split_logs_into_auditevent'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customer',
+            name='logs',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='logs',
+        ),
+    ]
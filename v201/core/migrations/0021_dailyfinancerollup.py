@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_remove_customer_logs_remove_order_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFinanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='تاریخ و زمان ایجاد رکورد به صورت خودکار ثبت می\u200cشود', verbose_name='📅 تاریخ ایجاد')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='تاریخ و زمان آخرین به\u200cروزرسانی رکورد به صورت خودکار ثبت می\u200cشود', verbose_name='🔄 تاریخ به\u200cروزرسانی')),
+                ('date', models.DateField(help_text='روزی که آمار آن در این سطر نگه\u200cداری می\u200cشود', unique=True, verbose_name='📅 تاریخ')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='🛒 تعداد سفارشات')),
+                ('revenue_orders_count', models.PositiveIntegerField(default=0, verbose_name='✅ تعداد سفارشات درآمدزا')),
+                ('pending_orders_count', models.PositiveIntegerField(default=0, verbose_name='⏳ تعداد سفارشات در انتظار')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='💰 درآمد (تومان)')),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='💸 هزینه (تومان)')),
+                ('failed_payments_count', models.PositiveIntegerField(default=0, verbose_name='❌ تعداد پرداخت\u200cهای ناموفق')),
+            ],
+            options={
+                'verbose_name': '📈 خلاصه مالی روزانه',
+                'verbose_name_plural': '📈 خلاصه\u200cهای مالی روزانه',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_dailyfinancerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved_for',
+            field=models.ForeignKey(blank=True, help_text='سفارش در حال پردازشی که این محصول را موقتاً نگه داشته است', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reserved_products', to='core.order', verbose_name='🔒 رزرو شده برای سفارش'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='پس از این زمان رزرو منقضی شده و محصول برای دیگران قابل خرید است', null=True, verbose_name='⌛ پایان رزرو'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_product_catalogue_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='Products_updated_98c5ac_idx'),
+        ),
+    ]
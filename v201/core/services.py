@@ -0,0 +1,693 @@
+"""
+📊 سرویس‌های اپلیکیشن Core - HomayOMS
+📦 محاسبه آمار انبار با حداقل تعداد کوئری روی جدول محصولات
+💰 خواندن آمار مالی از جدول خلاصه روزانه
+🛒 ساخت دسته‌ای سفارش از سبد انتخاب شده
+🔒 رزرو اتمیک محصولات برای جلوگیری از فروش هم‌زمان یک ریل
+🛍️ صفحه‌بندی cursor کاتالوگ فروشگاه
+⏰ لغو دسته‌ای (set-based) سفارشات منقضی شده
+"""
+
+import base64
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .catalogue_cache import schedule_catalogue_bump
+from .middleware import get_current_username
+from .log_export import schedule_log_export
+from .models import (
+    ActivityLog, AuditEvent, DailyFinanceRollup, Order, OrderItem, Product,
+    product_area_expression, product_weight_expression,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WarehouseStatsService:
+    """
+    📦 سرویس آمار انبار
+
+    🎯 تمام شمارش‌های وضعیت × انبار در یک کوئری گروه‌بندی شده (conditional aggregation)
+    🪟 آخرین محصولات هر انبار در یک کوئری با window function (ROW_NUMBER)
+
+    🔧 استفاده:
+        stats = WarehouseStatsService.get_inventory_stats()
+        totals = WarehouseStatsService.get_status_totals()
+    """
+
+    STATUS_KEYS = {
+        'In-stock': 'in_stock',
+        'Sold': 'sold',
+        'Pre-order': 'pre_order',
+    }
+
+    @classmethod
+    def get_location_counts(cls):
+        """
+        📊 شمارش محصولات هر انبار به تفکیک وضعیت - یک کوئری
+
+        📤 خروجی: {location: {'total', 'in_stock', 'sold', 'pre_order', 'unpriced_in_stock',
+                             'in_stock_area', 'in_stock_weight'}}
+        """
+        aggregates = {
+            key: Count('id', filter=Q(status=status))
+            for status, key in cls.STATUS_KEYS.items()
+        }
+        rows = (
+            Product.objects.order_by()
+            .values('location')
+            .annotate(
+                total=Count('id'),
+                unpriced_in_stock=Count('id', filter=Q(status='In-stock', price=0)),
+                in_stock_area=Sum(product_area_expression(), filter=Q(status='In-stock')),
+                in_stock_weight=Sum(product_weight_expression(), filter=Q(status='In-stock')),
+                **aggregates
+            )
+        )
+        return {row.pop('location'): row for row in rows}
+
+    @classmethod
+    def get_status_totals(cls, location_counts=None):
+        """
+        🧮 جمع کل شمارش‌ها برای تمام انبارها
+        """
+        if location_counts is None:
+            location_counts = cls.get_location_counts()
+        keys = ['total', 'unpriced_in_stock'] + list(cls.STATUS_KEYS.values())
+        totals = dict.fromkeys(keys, 0)
+        totals.update(in_stock_area=Decimal('0'), in_stock_weight=Decimal('0'))
+        for counts in location_counts.values():
+            for key in keys:
+                totals[key] += counts[key]
+            for key in ('in_stock_area', 'in_stock_weight'):
+                totals[key] += counts[key] or 0
+        return totals
+
+    @staticmethod
+    def get_recent_products_by_location(per_location=4):
+        """
+        🪟 آخرین محصولات هر انبار - یک کوئری با ROW_NUMBER() OVER (PARTITION BY location)
+
+        📤 خروجی: {location: [product, ...]}
+        """
+        recent = {}
+        if per_location <= 0:
+            return recent
+        products = (
+            Product.objects.annotate(
+                location_rank=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('location')],
+                    order_by=[F('created_at').desc(), F('id').desc()],
+                )
+            )
+            .filter(location_rank__lte=per_location)
+            .order_by('location', 'location_rank')
+        )
+        for product in products:
+            recent.setdefault(product.location, []).append(product)
+        return recent
+
+    @classmethod
+    def get_inventory_stats(cls, recent_per_location=4):
+        """
+        📦 آمار کامل صفحه موجودی - دو کوئری صرف‌نظر از تعداد انبارها
+        """
+        location_counts = cls.get_location_counts()
+        totals = cls.get_status_totals(location_counts)
+        recent = cls.get_recent_products_by_location(recent_per_location)
+
+        location_stats = {}
+        for location_code, location_name in Product.LOCATION_CHOICES:
+            counts = location_counts.get(location_code)
+            # فقط انبارهایی که حداقل یک محصول دارند را نمایش بده
+            if not counts or counts['total'] == 0:
+                continue
+            location_stats[location_code] = {
+                'name': location_name,
+                'total': counts['total'],
+                'in_stock': counts['in_stock'],
+                'sold': counts['sold'],
+                'pre_order': counts['pre_order'],
+                'in_stock_weight': counts['in_stock_weight'] or Decimal('0'),
+                'capacity_percentage': round((counts['in_stock'] / max(counts['total'], 1)) * 100),
+                'products': recent.get(location_code, []),
+            }
+
+        return {
+            'total_products': totals['total'],
+            'in_stock_count': totals['in_stock'],
+            'sold_count': totals['sold'],
+            'pre_order_count': totals['pre_order'],
+            'unpriced_in_stock_count': totals['unpriced_in_stock'],
+            'in_stock_area': totals['in_stock_area'],
+            'in_stock_weight': totals['in_stock_weight'],
+            'warehouse_capacity_percentage': round((totals['in_stock'] / max(totals['total'], 1)) * 100),
+            'warehouses_count': len(Product.LOCATION_CHOICES),
+            'low_stock_count': 0,  # می‌توانید منطق کم موجودی را اضافه کنید
+            'out_of_stock_count': 0,  # می‌توانید منطق ناموجودی را اضافه کنید
+            'location_stats': location_stats,
+        }
+
+
+class CatalogueService:
+    """
+    🛍️ سرویس کاتالوگ فروشگاه (صفحه اصلی و صفحه محصولات)
+
+    📄 صفحه‌بندی cursor (keyset) روی (created_at, id) - بدون OFFSET و بدون بارگذاری کل موجودی
+    🧮 آمار صفحه در یک aggregate محاسبه می‌شود
+
+    🔧 استفاده:
+        products, next_cursor = CatalogueService.get_page(CatalogueService.priced_products(), cursor)
+    """
+
+    # 📋 فقط فیلدهایی که کارت/ردیف محصول نمایش می‌دهد (بدون qr_code و ...)
+    CARD_FIELDS = ('id', 'reel_number', 'location', 'width', 'gsm', 'length', 'grade', 'breaks', 'price', 'created_at')
+
+    @staticmethod
+    def get_page_size():
+        return getattr(settings, 'CATALOGUE_PAGE_SIZE', 40)
+
+    @staticmethod
+    def available_products():
+        """
+        📦 محصولات موجود در انبار
+        """
+        return Product.objects.filter(status='In-stock')
+
+    @classmethod
+    def priced_products(cls):
+        """
+        💰 محصولات موجود و قیمت‌گذاری شده (جدول‌های نقدی/نسیه صفحه اصلی)
+        """
+        return cls.available_products().filter(price__gt=0)
+
+    @classmethod
+    def filter_products(cls, search='', location='', min_price='', max_price=''):
+        """
+        🔍 اعمال فیلترهای صفحه محصولات
+        """
+        products = cls.available_products()
+        if search:
+            products = products.filter(Q(reel_number__icontains=search) | Q(grade__icontains=search))
+        if location:
+            products = products.filter(location=location)
+        for lookup, value in (('price__gte', min_price), ('price__lte', max_price)):
+            if value:
+                try:
+                    products = products.filter(**{lookup: float(value)})
+                except ValueError:
+                    pass
+        return products
+
+    @staticmethod
+    def encode_cursor(product):
+        raw = f"{product.created_at.isoformat()}|{product.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        🔓 تبدیل cursor به (created_at, id) - در صورت نامعتبر بودن ValueError
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, UnicodeDecodeError, ValueError) as e:
+            raise ValueError(f'Invalid catalogue cursor: {cursor!r}') from e
+
+    @classmethod
+    def get_page(cls, queryset, cursor=None, limit=None):
+        """
+        📄 یک صفحه از کاتالوگ بعد از cursor داده شده (جدیدترین اول)
+
+        📤 خروجی: (لیست محصولات، cursor صفحه بعد یا None)
+        """
+        limit = limit or cls.get_page_size()
+        queryset = queryset.only(*cls.CARD_FIELDS).order_by('-created_at', '-id')
+        if cursor:
+            created_at, pk = cls.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        products = list(queryset[:limit + 1])
+        if len(products) <= limit:
+            return products, None
+        products = products[:limit]
+        return products, cls.encode_cursor(products[-1])
+
+    @staticmethod
+    def count_with_first_page(queryset, first_page, next_cursor):
+        """
+        🔢 تعداد کل - اگر همه محصولات در صفحه اول جا شده‌اند بدون کوئری اضافه
+        """
+        return queryset.count() if next_cursor else len(first_page)
+
+    @staticmethod
+    def get_stats(queryset):
+        """
+        📊 آمار صفحه محصولات در یک کوئری
+        """
+        stats = queryset.order_by().aggregate(total_products=Count('id'), avg_price=Avg('price'))
+        stats['avg_price'] = stats['avg_price'] or 0
+        return stats
+
+
+class FinanceStatsService:
+    """
+    💰 سرویس آمار مالی
+
+    📈 آمار دوره‌ها از DailyFinanceRollup خوانده می‌شود (O(روز) سطر، یک کوئری)
+    🧾 آخرین پرداخت هر سفارش با یک کوئری window function
+
+    🔧 استفاده:
+        stats = FinanceStatsService.get_period_stats(start_date, end_date, prev_start, prev_end)
+        FinanceStatsService.attach_latest_payments(orders)
+    """
+
+    @staticmethod
+    def get_period_stats(start_date, end_date, previous_start_date, previous_end_date):
+        """
+        📊 آمار دوره جاری، دوره قبل و شمارش‌های کلی - یک کوئری روی جدول خلاصه
+        """
+        current = Q(date__gte=start_date, date__lte=end_date)
+        previous = Q(date__gte=previous_start_date, date__lte=previous_end_date)
+        stats = DailyFinanceRollup.objects.aggregate(
+            total_revenue=Sum('revenue', filter=current),
+            total_expenses=Sum('expenses', filter=current),
+            total_orders=Sum('orders_count', filter=current),
+            prev_revenue=Sum('revenue', filter=previous),
+            prev_orders=Sum('orders_count', filter=previous),
+            pending_orders=Sum('pending_orders_count'),
+            failed_payments=Sum('failed_payments_count'),
+        )
+        for key in ('total_revenue', 'total_expenses', 'prev_revenue'):
+            stats[key] = stats[key] or Decimal('0')
+        for key in ('total_orders', 'prev_orders', 'pending_orders', 'failed_payments'):
+            stats[key] = stats[key] or 0
+        return stats
+
+    @staticmethod
+    def get_recently_changed_stats(start_date, end_date, previous_start_date, previous_end_date):
+        """
+        🔄 آمار بر اساس زمان آخرین تغییر (updated_at)
+
+        ⚠️ خلاصه روزانه بر اساس تاریخ ایجاد است، پس این حالت از جداول اصلی
+        با بازه‌های زمانی قابل استفاده با ایندکس محاسبه می‌شود
+        """
+        from .models import Order, OrderItem
+
+        start, end = DailyFinanceRollup.day_bounds(start_date, end_date)
+        prev_start, prev_end = DailyFinanceRollup.day_bounds(previous_start_date, previous_end_date)
+        revenue_statuses = DailyFinanceRollup.REVENUE_STATUSES
+        current = Q(updated_at__gte=start, updated_at__lt=end)
+        previous = Q(updated_at__gte=prev_start, updated_at__lt=prev_end)
+        revenue = Q(status__in=revenue_statuses)
+
+        stats = Order.objects.filter(current | previous).aggregate(
+            total_revenue=Sum('final_amount', filter=current & revenue),
+            total_orders=Count('id', filter=current),
+            prev_revenue=Sum('final_amount', filter=previous & revenue),
+            prev_orders=Count('id', filter=previous),
+        )
+        stats['total_expenses'] = OrderItem.objects.filter(
+            order__status__in=revenue_statuses,
+            order__updated_at__gte=start,
+            order__updated_at__lt=end,
+        ).aggregate(total=Sum('total_price'))['total']
+        stats.update(DailyFinanceRollup.objects.aggregate(
+            pending_orders=Sum('pending_orders_count'),
+            failed_payments=Sum('failed_payments_count'),
+        ))
+        for key in ('total_revenue', 'total_expenses', 'prev_revenue'):
+            stats[key] = stats[key] or Decimal('0')
+        for key in ('pending_orders', 'failed_payments'):
+            stats[key] = stats[key] or 0
+        return stats
+
+    @staticmethod
+    def attach_latest_payments(orders):
+        """
+        🧾 اضافه کردن latest_payment به هر سفارش - یک کوئری برای همه سفارشات
+        """
+        from payments.models import Payment
+
+        orders = list(orders)
+        if not orders:
+            return orders
+        payments = (
+            Payment.objects.filter(order__in=[order.pk for order in orders])
+            .annotate(order_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('order_id')],
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(order_rank=1)
+            .order_by()
+        )
+        latest = {payment.order_id: payment for payment in payments}
+        for order in orders:
+            order.latest_payment = latest.get(order.pk)
+        return orders
+
+
+class ReservationService:
+    """
+    🔒 سرویس رزرو محصولات
+
+    🎯 تمام تغییر وضعیت‌ها با یک دستور UPDATE شرطی (compare-and-set) انجام می‌شوند:
+        UPDATE Products SET ... WHERE id IN (...) AND status = 'In-stock' AND <رزرو آزاد یا متعلق به همین سفارش>
+    ⚖️ پایگاه داده تضمین می‌کند فقط یکی از درخواست‌های هم‌زمان ردیف را تغییر دهد
+        (قفل نوشتن در SQLite و قفل ردیف در PostgreSQL) - بدون نیاز به select_for_update
+    ⌛ رزروها به سفارش Processing گره خورده و پس از PRODUCT_RESERVATION_MINUTES منقضی می‌شوند
+
+    🔧 استفاده:
+        held = ReservationService.reserve(order, product_ids)
+        sold = ReservationService.sell(product_ids, order=order)
+        ReservationService.release_expired()
+    """
+
+    @staticmethod
+    def get_hold_minutes():
+        return getattr(settings, 'PRODUCT_RESERVATION_MINUTES', getattr(settings, 'ORDER_CANCELLATION_TIMEOUT', 5))
+
+    @classmethod
+    def reserve(cls, order, product_ids, minutes=None):
+        """
+        🔒 رزرو (یا تمدید رزرو) محصولات برای یک سفارش
+
+        📤 خروجی: مجموعه شناسه محصولاتی که اکنون در اختیار این سفارش هستند
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return set()
+        now = timezone.now()
+        minutes = cls.get_hold_minutes() if minutes is None else minutes
+        Product.objects.filter(id__in=product_ids).claimable(order=order, now=now).update(
+            reserved_for=order,
+            reserved_until=now + timedelta(minutes=minutes),
+            updated_at=now,
+        )
+        return set(
+            Product.objects.filter(id__in=product_ids, status='In-stock', reserved_for=order)
+            .values_list('id', flat=True)
+        )
+
+    @staticmethod
+    def sell(product_ids, order=None):
+        """
+        💰 تغییر وضعیت محصولات به فروخته شده - فقط اگر هنوز موجود و رزرو نشده (یا رزرو همین سفارش) باشند
+
+        📤 خروجی: تعداد محصولاتی که فروخته شدند
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        now = timezone.now()
+        sold = Product.objects.filter(id__in=product_ids).claimable(order=order, now=now).update(
+            status='Sold',
+            reserved_for=None,
+            reserved_until=None,
+            updated_at=now,
+        )
+        if sold:
+            # 🗂️ UPDATE سیگنال ندارد - کاتالوگ را صریحاً بی‌اعتبار کن
+            schedule_catalogue_bump()
+        return sold
+
+    @staticmethod
+    def release_orders(order_ids):
+        """
+        🔓 آزادسازی رزرو محصولات سفارش‌های داده شده (مثلاً پس از لغو) - یک UPDATE
+        """
+        order_ids = list(order_ids)
+        if not order_ids:
+            return 0
+        return Product.objects.filter(reserved_for__in=order_ids).update(
+            reserved_for=None,
+            reserved_until=None,
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def release_expired(now=None):
+        """
+        ⌛ آزادسازی دسته‌ای تمام رزروهای منقضی شده - یک UPDATE
+        """
+        now = now or timezone.now()
+        released = Product.objects.expired_holds(now).update(
+            reserved_for=None,
+            reserved_until=None,
+            updated_at=now,
+        )
+        if released:
+            logger.info(f"🔓 {released} رزرو منقضی شده محصول آزاد شد")
+        return released
+
+
+class OrderPlacementError(Exception):
+    """❌ خطای قابل نمایش به کاربر هنگام ثبت سفارش"""
+    pass
+
+
+class OrderBuilderService:
+    """
+    🛒 سرویس ساخت دسته‌ای سفارش
+
+    🎯 تعداد کوئری‌ها مستقل از تعداد اقلام سبد است:
+        - دریافت همه محصولات با یک کوئری id__in
+        - ذخیره سفارش فقط یک بار با مبالغ نهایی (یک دسته رویداد تغییرات)
+        - ایجاد اقلام با bulk_create (بدون بازمحاسبه مبلغ سفارش به ازای هر قلم)
+        - تغییر وضعیت محصولات با یک UPDATE ... WHERE id IN
+
+    🔧 استفاده:
+        products = OrderBuilderService.get_in_stock_products(product_ids)
+        OrderBuilderService.fill_order(order, lines, payment_method='Cash')
+    """
+
+    @staticmethod
+    def get_in_stock_products(product_ids):
+        """
+        📦 دریافت محصولات موجود با یک کوئری
+
+        ❌ اگر یکی از محصولات یافت نشود یا موجود نباشد OrderPlacementError
+        """
+        ids = []
+        for product_id in product_ids:
+            try:
+                ids.append(int(product_id))
+            except (TypeError, ValueError):
+                raise OrderPlacementError(f'محصول با شماره {product_id} یافت نشد یا موجود نیست.')
+
+        products = Product.objects.filter(status='In-stock').in_bulk(ids)
+        for product_id in ids:
+            if product_id not in products:
+                raise OrderPlacementError(f'محصول با شماره {product_id} یافت نشد یا موجود نیست.')
+        return products
+
+    @staticmethod
+    def build_line(product, quantity):
+        """
+        🧾 ساخت یک قلم سبد با قیمت فعلی محصول
+        """
+        return {
+            'product': product,
+            'quantity': quantity,
+            'total': product.price * quantity,
+        }
+
+    @staticmethod
+    def ensure_order_number(order, attempts=5):
+        """
+        🏷️ تولید شماره یکتا برای سفارش جدید (در صورت خالی بودن)
+        """
+        if order.order_number:
+            return order.order_number
+        for _ in range(attempts):
+            candidate = order.generate_order_number()
+            if not Order.objects.filter(order_number=candidate).exists():
+                order.order_number = candidate
+                return candidate
+        raise OrderPlacementError('❌ خطا در تولید شماره سفارش یکتا. لطفاً مجدداً تلاش کنید.')
+
+    @classmethod
+    def fill_order(cls, order, lines, payment_method, hold_order=None):
+        """
+        💾 ذخیره سفارش به همراه اقلام و فروخته شده کردن محصولات
+
+        🔒 hold_order: سفارش Processing که محصولات را رزرو کرده است (پیش‌فرض: خود سفارش)
+        ⚠️ باید داخل transaction.atomic فراخوانی شود؛ اگر محصولی در این فاصله
+        توسط سفارش دیگری برداشته یا رزرو شده باشد OrderPlacementError و کل تراکنش برگشت می‌خورد
+        """
+        if not lines:
+            return order
+
+        # 💰 محاسبه مبالغ فقط یک بار
+        order.payment_method = payment_method
+        order.total_amount = sum((line['total'] for line in lines), Decimal('0'))
+        order.calculate_final_amount()
+        cls.ensure_order_number(order)
+        order.add_audit_event(
+            f"Order placed with {len(lines)} items By {get_current_username()}",
+            field_name='order_items',
+            new_value=len(lines),
+        )
+        order.save()
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=line['product'],
+                quantity=line['quantity'],
+                unit_price=line['product'].price,
+                total_price=line['total'],
+                payment_method=payment_method,
+            )
+            for line in lines
+        ])
+
+        # 🔒 فقط محصولاتی که هنوز موجودند و رزرو سفارش دیگری نیستند فروخته می‌شوند
+        product_ids = [line['product'].pk for line in lines]
+        sold = ReservationService.sell(product_ids, order=hold_order or order)
+        if sold != len(product_ids):
+            raise OrderPlacementError('❌ برخی از محصولات انتخاب شده دیگر موجود نیستند. لطفاً سبد خود را بررسی کنید.')
+        for line in lines:
+            line['product'].status = 'Sold'
+        return order
+
+
+class ExpirySweepService:
+    """
+    ⏰ سرویس لغو دسته‌ای سفارشات منقضی شده
+
+    🎯 به جای ذخیره تک‌تک سفارشات و محصولات، همه تغییرات با چند دستور مجموعه‌ای
+    داخل یک تراکنش انجام می‌شوند و رویدادها/لاگ‌ها با bulk_create ثبت می‌شوند
+
+    🔧 استفاده:
+        cancelled = ExpirySweepService.cancel_expired_orders()
+    """
+
+    @staticmethod
+    def get_batch_size():
+        return getattr(settings, 'EXPIRY_SWEEP_BATCH_SIZE', 500)
+
+    @staticmethod
+    def claim(queryset, batch_size=None, **changes):
+        """
+        🔒 تغییر وضعیت اتمیک ردیف‌های منطبق با queryset و برگرداندن شناسه ردیف‌هایی که همین فراخوانی تغییر داده است
+
+        ⚖️ شرط‌های queryset دوباره در WHERE دستور UPDATE تکرار می‌شوند (compare-and-set)،
+        پس اگر sweeper دیگری هم‌زمان همان ردیف را تغییر داده باشد، اینجا شمرده نمی‌شود
+        🏷️ updated_at مشترک این اجرا به عنوان نشانه ردیف‌های تغییر یافته استفاده می‌شود
+        ⚠️ باید داخل transaction.atomic فراخوانی شود
+        """
+        candidates = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not candidates:
+            return []
+        changes.setdefault('updated_at', timezone.now())
+        queryset.filter(pk__in=candidates).update(**changes)
+        return list(queryset.model.objects.filter(pk__in=candidates, **changes).order_by().values_list('pk', flat=True))
+
+    @classmethod
+    def cancel_expired_orders(cls, timeout_minutes=None, now=None):
+        """
+        🚫 لغو سفارشات Processing منقضی شده و آزادسازی محصولات آن‌ها
+
+        📊 خروجی: تعداد سفارشات لغو شده
+        """
+        from .middleware import get_current_username
+
+        now = now or timezone.now()
+        if timeout_minutes is None:
+            timeout_minutes = getattr(settings, 'ORDER_CANCELLATION_TIMEOUT', 5)
+        expiration_time = now - timedelta(minutes=timeout_minutes)
+        expired = Order.objects.filter(status='Processing', updated_at__lt=expiration_time)
+        username = get_current_username()
+        notes = f"لغو خودکار پس از {timeout_minutes} دقیقه عدم پردازش - {timezone.localtime(now).strftime('%Y-%m-%d %H:%M:%S')}"
+
+        cancelled_total = 0
+        batch_size = cls.get_batch_size()
+        while True:
+            with transaction.atomic():
+                claimed = cls.claim(expired, batch_size=batch_size, status='Cancelled', notes=notes, updated_at=now)
+                if not claimed:
+                    break
+                orders = list(Order.objects.filter(pk__in=claimed).only('id', 'order_number', 'created_at'))
+                order_numbers = {order.pk: order.order_number for order in orders}
+
+                # 📦 آزاد کردن محصولات Pre-order این سفارشات (یک UPDATE)
+                released = list(
+                    OrderItem.objects.filter(order_id__in=claimed, product__status='Pre-order')
+                    .values_list('order_id', 'product_id', 'product__reel_number')
+                )
+                if released:
+                    Product.objects.filter(
+                        id__in=[product_id for _, product_id, _ in released], status='Pre-order'
+                    ).update(status='In-stock', updated_at=now)
+                    schedule_catalogue_bump()
+
+                # 🔓 آزادسازی رزروها
+                ReservationService.release_orders(claimed)
+
+                # 🧾 رویدادهای تغییرات با یک bulk_create
+                status_display = dict(Order.ORDER_STATUS_CHOICES)
+                AuditEvent.record_bulk(Order, {
+                    order_id: [
+                        AuditEvent.entry(f"Order Updated By {username}", timestamp=now),
+                        AuditEvent.entry(
+                            f"Status changed from {status_display['Processing']} to {status_display['Cancelled']} By {username}",
+                            field_name='status', old_value='Processing', new_value='Cancelled', timestamp=now,
+                        ),
+                    ]
+                    for order_id in claimed
+                }, actor=username)
+
+                # 📜 لاگ‌های فعالیت با bulk_create
+                activities = [
+                    ActivityLog.build_activity(
+                        None, 'UPDATE',
+                        f'محصول {reel_number} آزاد شد پس از لغو خودکار سفارش {order_numbers[order_id]}',
+                        content_object=Product(pk=product_id), severity='MEDIUM',
+                        extra_data={
+                            'order_number': order_numbers[order_id],
+                            'cancellation_reason': 'timeout',
+                            'timeout_minutes': timeout_minutes,
+                            'automated': True
+                        }
+                    )
+                    for order_id, product_id, reel_number in released
+                ]
+                activities.extend(
+                    ActivityLog.build_activity(
+                        None, 'CANCEL',
+                        f'سفارش {order.order_number} به صورت خودکار لغو شد پس از {timeout_minutes} دقیقه',
+                        content_object=order, severity='HIGH',
+                        extra_data={
+                            'old_status': 'Processing',
+                            'new_status': 'Cancelled',
+                            'cancellation_reason': 'timeout',
+                            'timeout_minutes': timeout_minutes,
+                            'expiration_time': expiration_time.isoformat(),
+                            'automated': True
+                        }
+                    )
+                    for order in orders
+                )
+                ActivityLog.objects.bulk_create(activities)
+
+                DailyFinanceRollup.schedule_refresh(*(order.created_at for order in orders))
+                schedule_log_export('orders')
+
+            cancelled_total += len(claimed)
+            logger.info(f"🔄 {len(claimed)} سفارش Processing منقضی شده پس از {timeout_minutes} دقیقه لغو شد")
+            if len(claimed) < batch_size:
+                break
+
+        return cancelled_total
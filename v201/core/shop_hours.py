@@ -0,0 +1,170 @@
+"""
+🏪 کش وضعیت باز/بسته بودن فروشگاه - HomayOMS
+🧠 ردیف فعال WorkingHours یک بار در هر پردازه بارگذاری می‌شود و تا تغییر بعدی نگه داشته می‌شود
+⏭️ زمان تغییر وضعیت بعدی (باز شدن/بسته شدن) از قبل محاسبه می‌شود؛ مسیر داغ هیچ کوئری‌ای اجرا نمی‌کند
+🔢 با ذخیره WorkingHours، نسخه مشترک در cache مشترک (SHOP_HOURS_CACHE_ALIAS) افزایش می‌یابد تا سایر workerها هم بارگذاری مجدد کنند
+"""
+
+import threading
+import time as monotonic_time
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+VERSION_KEY = 'homayoms:working_hours:version'
+TEHRAN_TZ = pytz.timezone('Asia/Tehran')
+
+# 🔍 تعداد روزهایی که برای یافتن تغییر وضعیت بعدی بررسی می‌شود (یک هفته کامل + یک روز)
+TRANSITION_LOOKAHEAD_DAYS = 8
+
+
+def is_open_at(hours, local_now):
+    """
+    🕐 وضعیت باز بودن فروشگاه برای یک ردیف WorkingHours در یک لحظه (وقت تهران)
+    📋 همان قواعد WorkingHours.is_shop_open: تعطیلی، پنج‌شنبه و بازه ساعات کاری
+    """
+    if hours is None or not hours.is_active or hours.is_holiday:
+        return False
+
+    # 🟢 بررسی پنج‌شنبه
+    if local_now.weekday() == 3 and not hours.is_thursday_open:
+        return False
+
+    current_time = local_now.time()
+    if hours.start_time <= hours.end_time:
+        return hours.start_time <= current_time <= hours.end_time
+    # ساعات کاری از نیمه‌شب رد می‌شود
+    return current_time >= hours.start_time or current_time <= hours.end_time
+
+
+def next_transition(hours, local_now):
+    """
+    ⏭️ اولین لحظه بعد از local_now که وضعیت باز/بسته تغییر می‌کند (None یعنی هرگز)
+    """
+    is_open = is_open_at(hours, local_now)
+    if hours is None or not hours.is_active or hours.is_holiday:
+        return None
+
+    # ⏱️ وضعیت فقط در نیمه‌شب، زمان شروع و لحظه بعد از زمان پایان می‌تواند تغییر کند
+    after_end = (datetime.combine(local_now.date(), hours.end_time) + timedelta(microseconds=1)).time()
+    candidates = []
+    for offset in range(TRANSITION_LOOKAHEAD_DAYS):
+        day = local_now.date() + timedelta(days=offset)
+        for boundary in (time.min, hours.start_time, after_end):
+            moment = TEHRAN_TZ.localize(datetime.combine(day, boundary))
+            if moment > local_now:
+                candidates.append(moment)
+
+    for moment in sorted(candidates):
+        if is_open_at(hours, moment) != is_open:
+            return moment
+    return None
+
+
+class ShopHoursCache:
+    """
+    🧠 کش درون‌پردازه‌ای ساعات کاری فعال و وضعیت باز/بسته فروشگاه
+
+    🔧 استفاده:
+        shop_hours = get_shop_hours_cache()
+        shop_hours.is_open()
+        shop_hours.get_working_hours()
+    """
+
+    def __init__(self, ttl=None, alias=None):
+        # ⏳ حداکثر عمر کش؛ پشتیبان برای cache backendهای غیرمشترک (مثل LocMemCache)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'WORKING_HOURS_CACHE_TTL', 60)
+        # 🗂️ نسخه مشترک باید در cache مشترک بین workerها باشد (فایل/پایگاه داده)
+        self.alias = alias or getattr(settings, 'SHOP_HOURS_CACHE_ALIAS', 'default')
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = None
+        self._expires_at = 0
+        self._hours = None
+        self._open = False
+        self._evaluated_at = None
+        self._next_transition = None
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def get_working_hours(self):
+        """
+        🕐 ردیف فعال WorkingHours (نمونه مشترک - فقط خواندنی)
+        """
+        self._refresh(timezone.now())
+        return self._hours
+
+    def is_open(self, now=None):
+        """
+        🏪 آیا فروشگاه در این لحظه باز است؟
+        """
+        now = now or timezone.now()
+        self._refresh(now)
+        with self._lock:
+            passed_transition = self._next_transition is not None and now >= self._next_transition
+            if passed_transition or now < self._evaluated_at:
+                self._evaluate(now)
+            return self._open
+
+    def time_until_change(self, now=None):
+        """
+        ⏰ زمان باقی‌مانده تا تغییر وضعیت بعدی (باز شدن یا بسته شدن)
+        """
+        now = now or timezone.now()
+        self.is_open(now)
+        transition = self._next_transition
+        return transition - now if transition is not None else None
+
+    def invalidate(self):
+        """
+        🔄 باطل کردن کش این پردازه و افزایش نسخه مشترک برای سایر workerها
+        """
+        backend = self.backend
+        backend.add(VERSION_KEY, 0, timeout=None)
+        try:
+            backend.incr(VERSION_KEY)
+        except ValueError:
+            backend.set(VERSION_KEY, 1, timeout=None)
+        with self._lock:
+            self._loaded = False
+
+    def _refresh(self, now):
+        version = self.backend.get(VERSION_KEY)
+        if self._loaded and version == self._version and monotonic_time.monotonic() < self._expires_at:
+            return
+
+        from core.models import WorkingHours
+
+        hours = WorkingHours.objects.select_related('set_by').filter(is_active=True).first()
+        with self._lock:
+            self._hours = hours
+            self._version = version
+            self._expires_at = monotonic_time.monotonic() + self.ttl
+            self._loaded = True
+            self._evaluate(now)
+
+    def _evaluate(self, now):
+        local_now = now.astimezone(TEHRAN_TZ)
+        self._open = is_open_at(self._hours, local_now)
+        self._evaluated_at = now
+        self._next_transition = next_transition(self._hours, local_now)
+
+
+_shop_hours = None
+_shop_hours_lock = threading.Lock()
+
+
+def get_shop_hours_cache():
+    """
+    🏪 دریافت کش سراسری ساعات کاری (یکی برای هر پردازه)
+    """
+    global _shop_hours
+    with _shop_hours_lock:
+        if _shop_hours is None:
+            _shop_hours = ShopHoursCache()
+        return _shop_hours
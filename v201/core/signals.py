@@ -5,15 +5,22 @@
 🤖 سیستم کاملاً خودکار بدون نیاز به cron jobs
 """
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
-from datetime import timedelta
 import logging
+import os
+import tempfile
 import threading
 import time
-from .models import Order, ActivityLog
+from django.db import close_old_connections, transaction
+from HomayOMS.locks import FileLock
+from .models import Order, ActivityLog, DailyFinanceRollup, Product, WorkingHours
+from payments.models import Payment
+from .services import ExpirySweepService, ReservationService
+from .shop_hours import get_shop_hours_cache
+from .catalogue_cache import schedule_catalogue_bump
 
 # 📝 تنظیم لاگر
 logger = logging.getLogger(__name__)
@@ -22,6 +29,7 @@ logger = logging.getLogger(__name__)
 _automation_thread = None
 _automation_running = False
 _automation_interval = 60  # بررسی هر 60 ثانیه
+_sweeper_lock = None  # 🗳️ قفل انتخاب sweeper بین workerها
 
 
 def start_automated_cancellation():
@@ -52,11 +60,15 @@ def start_automated_cancellation():
         
         while _automation_running:
             try:
-                # 🔍 بررسی سفارشات منقضی شده
-                cancelled_count = cancel_expired_processing_orders()
-                
-                if cancelled_count > 0:
-                    logger.info(f"🤖 {cancelled_count} سفارش به صورت خودکار لغو شد")
+                # 🗳️ فقط worker منتخب بررسی را انجام می‌دهد
+                if is_elected_sweeper():
+                    close_old_connections()
+                    cancelled_count, expired_payments = run_expiry_sweep()
+                    
+                    if cancelled_count > 0:
+                        logger.info(f"🤖 {cancelled_count} سفارش به صورت خودکار لغو شد")
+                    if expired_payments > 0:
+                        logger.info(f"🤖 {expired_payments} پرداخت منقضی شد")
                 
                 # ⏰ انتظار تا بررسی بعدی
                 time.sleep(_automation_interval)
@@ -64,6 +76,8 @@ def start_automated_cancellation():
             except Exception as e:
                 logger.error(f"❌ خطا در سیستم خودکار: {str(e)}")
                 time.sleep(_automation_interval)
+        
+        release_sweeper_election()
     
     # 🧵 ایجاد thread جدید
     _automation_thread = threading.Thread(target=automation_worker, daemon=True)
@@ -135,90 +149,23 @@ def cancel_expired_processing_orders():
     🚫 لغو خودکار سفارشات Processing که بیش از زمان تعیین شده در حالت Processing مانده‌اند
     
     🎯 این تابع:
-    - سفارشات با وضعیت 'Processing' را پیدا می‌کند
-    - آن‌هایی که بیش از ORDER_CANCELLATION_TIMEOUT دقیقه در این وضعیت مانده‌اند را لغو می‌کند
-    - محصولات مربوطه را آزاد می‌کند
-    - لاگ فعالیت ایجاد می‌کند
+    - سفارشات منقضی شده را با یک UPDATE شرطی لغو می‌کند (set-based، داخل یک تراکنش)
+    - محصولات Pre-order و رزروهای آن‌ها را با یک UPDATE آزاد می‌کند
+    - رویدادهای تغییرات و لاگ‌های فعالیت را با bulk_create ثبت می‌کند
     
     🔧 استفاده:
         cancel_expired_processing_orders()
     
     📊 خروجی:
         - تعداد سفارشات لغو شده
-        - لاگ‌های فعالیت برای هر سفارش لغو شده
     """
     try:
-        # ⏰ محاسبه زمان انقضا
-        timeout_minutes = getattr(settings, 'ORDER_CANCELLATION_TIMEOUT', 5)
-        expiration_time = timezone.now() - timedelta(minutes=timeout_minutes)
-        
-        # 🔍 پیدا کردن سفارشات Processing منقضی شده
-        expired_orders = Order.objects.filter(
-            status='Processing',
-            updated_at__lt=expiration_time
-        )
-        
-        cancelled_count = 0
-        
-        for order in expired_orders:
-            try:
-                # 📝 لاگ قبل از لغو
-                logger.info(f"🔄 لغو خودکار سفارش {order.order_number} - منقضی شده پس از {timeout_minutes} دقیقه")
-                
-                # 🚫 تغییر وضعیت به لغو شده
-                old_status = order.status
-                order.status = 'Cancelled'
-                order.notes = f"لغو خودکار پس از {timeout_minutes} دقیقه عدم پردازش - {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                order.save()
-                
-                # 📦 آزاد کردن محصولات
-                for order_item in order.order_items.all():
-                    product = order_item.product
-                    if product.status == 'Pre-order':
-                        product.status = 'In-stock'
-                        product.save()
-                        
-                        # 📝 لاگ آزادسازی محصول
-                        ActivityLog.log_activity(
-                            user=None,  # سیستم
-                            action='UPDATE',
-                            description=f'محصول {product.reel_number} آزاد شد پس از لغو خودکار سفارش {order.order_number}',
-                            content_object=product,
-                            severity='MEDIUM',
-                            extra_data={
-                                'order_number': order.order_number,
-                                'cancellation_reason': 'timeout',
-                                'timeout_minutes': timeout_minutes,
-                                'automated': True
-                            }
-                        )
-                
-                # 📝 لاگ لغو سفارش
-                ActivityLog.log_activity(
-                    user=None,  # سیستم
-                    action='CANCEL',
-                    description=f'سفارش {order.order_number} به صورت خودکار لغو شد پس از {timeout_minutes} دقیقه',
-                    content_object=order,
-                    severity='HIGH',
-                    extra_data={
-                        'old_status': old_status,
-                        'new_status': 'Cancelled',
-                        'cancellation_reason': 'timeout',
-                        'timeout_minutes': timeout_minutes,
-                        'expiration_time': expiration_time.isoformat(),
-                        'automated': True
-                    }
-                )
-                
-                cancelled_count += 1
-                
-            except Exception as e:
-                logger.error(f"❌ خطا در لغو سفارش {order.order_number}: {str(e)}")
-                continue
+        # 🔓 آزادسازی دسته‌ای رزروهای منقضی شده محصولات
+        ReservationService.release_expired()
         
+        cancelled_count = ExpirySweepService.cancel_expired_orders()
         if cancelled_count > 0:
             logger.info(f"✅ {cancelled_count} سفارش Processing به صورت خودکار لغو شد")
-        
         return cancelled_count
         
     except Exception as e:
@@ -226,6 +173,56 @@ def cancel_expired_processing_orders():
         return 0
 
 
+def is_elected_sweeper():
+    """
+    🗳️ بررسی اینکه آیا این پردازه sweeper منتخب است
+    
+    🎯 از بین تمام workerهای گانیکورن فقط پردازه‌ای که قفل فایلی را در اختیار دارد
+    سفارشات و پرداخت‌های منقضی را پردازش می‌کند؛ قفل تا پایان عمر پردازه نگه داشته می‌شود
+    و با خروج پردازه، worker دیگری در دور بعدی آن را می‌گیرد
+    """
+    global _sweeper_lock
+    
+    if _sweeper_lock is None:
+        _sweeper_lock = FileLock(get_sweeper_lock_path(), blocking=False)
+    if not _sweeper_lock.acquired:
+        _sweeper_lock.acquire()
+    return _sweeper_lock.acquired
+
+
+def release_sweeper_election():
+    """
+    🔓 رها کردن نقش sweeper منتخب
+    """
+    if _sweeper_lock is not None:
+        _sweeper_lock.release()
+
+
+def get_sweeper_lock_path():
+    return str(getattr(
+        settings, 'EXPIRY_SWEEP_LOCK_PATH',
+        os.path.join(tempfile.gettempdir(), 'homayoms-expiry-sweeper.lock')
+    ))
+
+
+def run_expiry_sweep():
+    """
+    ⏰ یک دور کامل بررسی انقضا: سفارشات Processing و پرداخت‌های نیمه‌کاره
+    
+    📊 خروجی:
+        - (تعداد سفارشات لغو شده, تعداد پرداخت‌های منقضی شده)
+    """
+    from payments.services import PaymentService
+    
+    cancelled_count = cancel_expired_processing_orders()
+    try:
+        expired_payments = PaymentService.check_expired_payments()
+    except Exception as e:
+        logger.error(f"❌ خطا در بررسی پرداخت‌های منقضی شده: {str(e)}")
+        expired_payments = 0
+    return cancelled_count, expired_payments
+
+
 @receiver(post_save, sender=Order)
 def handle_order_status_change(sender, instance, created, **kwargs):
     """
@@ -272,6 +269,41 @@ def handle_order_status_change(sender, instance, created, **kwargs):
             logger.error(f"❌ خطا در سیگنال تغییر وضعیت سفارش: {str(e)}")
 
 
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Payment)
+def handle_finance_record_delete(sender, instance, **kwargs):
+    """
+    🔔 سیگنال حذف سفارش/پرداخت
+
+    📈 خلاصه مالی روز رکورد حذف شده پس از commit بازمحاسبه می‌شود
+    """
+    DailyFinanceRollup.schedule_refresh(instance.created_at)
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+def handle_working_hours_change(sender, instance, **kwargs):
+    """
+    🔔 سیگنال تغییر ساعات کاری
+
+    🧠 کش این پردازه فوراً و نسخه مشترک (برای سایر workerها) پس از commit باطل می‌شود
+    """
+    shop_hours = get_shop_hours_cache()
+    shop_hours.invalidate()
+    transaction.on_commit(shop_hours.invalidate)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def handle_product_change(sender, instance, **kwargs):
+    """
+    🔔 سیگنال تغییر محصول
+
+    🗂️ نسخه کاتالوگ افزایش می‌یابد تا قطعه‌های کش شده صفحات فروشگاه بازسازی شوند
+    """
+    schedule_catalogue_bump()
+
+
 def schedule_order_cancellation_check():
     """
     ⏰ برنامه‌ریزی بررسی لغو خودکار سفارشات
@@ -323,5 +355,6 @@ def initialize_automation():
         logger.error(f"❌ خطا در راه‌اندازی سیستم خودکار: {str(e)}")
 
 
-# 🚀 راه‌اندازی خودکار
-initialize_automation() 
\ No newline at end of file
+# 🚀 راه‌اندازی خودکار (در اجرای تست‌ها پایگاه داده تست هنوز ساخته نشده است)
+if not getattr(settings, 'TESTING', False):
+    initialize_automation() 
\ No newline at end of file
@@ -1,3 +1,644 @@
-from django.test import TestCase
+import csv
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Value
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+from core.activity_buffer import ActivityLogBuffer
+from core.catalogue_cache import CatalogueCache, get_catalogue_cache
+from core.log_export import LogExporter, parse_legacy_log_line
+from core.models import (
+    ActivityLog, AuditEvent, Customer, DailyFinanceRollup, Order, OrderItem, Product, WorkingHours,
+    product_weight_expression,
+)
+from core.services import (
+    CatalogueService, ExpirySweepService, FinanceStatsService, OrderBuilderService, OrderPlacementError, ReservationService, WarehouseStatsService
+)
+from core.shop_hours import TEHRAN_TZ, VERSION_KEY, ShopHoursCache
+from payments.models import Payment
+
+
+class IncrementalLogExportTest(TestCase):
+    """Test append-only CSV export of customer/order logs"""
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+        self.exporter = LogExporter(export_dir=self.export_dir, settle_seconds=0)
+        self.customer = Customer.objects.create(customer_name='Export Customer', phone='09120000001')
+
+    def read_rows(self, filename):
+        with open(os.path.join(self.export_dir, filename), newline='', encoding='utf-8') as f:
+            return list(csv.reader(f))
+
+    def test_incremental_export_appends_only_new_lines(self):
+        first = self.exporter.export('customers')
+        rows = self.read_rows('customers_logs.csv')
+        self.assertEqual(rows[0], ['customer_id', 'customer_name', 'log_line'])
+        self.assertEqual(first['lines'], len(rows) - 1)
+
+        # بدون تغییر، خط جدیدی نوشته نمی‌شود
+        self.assertEqual(self.exporter.export('customers')['lines'], 0)
+
+        self.customer.status = 'Inactive'
+        self.customer.save()
+        second = self.exporter.export('customers')
+        self.assertGreater(second['lines'], 0)
+
+        rows = self.read_rows('customers_logs.csv')
+        log_lines = [row[2] for row in rows[1:]]
+        self.assertEqual(len(log_lines), len(set(log_lines)))
+        self.assertEqual(len(log_lines), first['lines'] + second['lines'])
+        self.assertTrue(any('Status changed' in line for line in log_lines))
+
+    def test_late_commit_below_high_water_mark_is_exported(self):
+        self.exporter.export('customers')
+        self.customer.comments = 'first'
+        self.customer.save()
+        self.customer.comments = 'second'
+        self.customer.save()
+        # 🕳️ رویداد میانی را تراکنشی فرض کن که هنوز commit نشده است
+        late = AuditEvent.objects.filter(object_id=self.customer.pk).order_by('-id')[1]
+        late_line = late.as_log_line()
+        late_fields = {field.attname: getattr(late, field.attname) for field in AuditEvent._meta.concrete_fields}
+        late.delete()
+
+        result = self.exporter.export('customers')
+        self.assertTrue(result['deferred'])
+        self.assertIn(str(late_fields['id']), self.exporter.get_state('customers')['open_ids'])
+
+        AuditEvent.objects.create(**late_fields)
+        self.assertEqual(self.exporter.export('customers')['lines'], 1)
+        self.assertEqual(self.read_rows('customers_logs.csv')[-1][2], late_line)
+        self.assertEqual(self.exporter.get_state('customers')['open_ids'], {})
+
+    def test_old_gaps_are_treated_as_rolled_back(self):
+        self.customer.comments = 'first'
+        self.customer.save()
+        self.customer.comments = 'second'
+        self.customer.save()
+        AuditEvent.objects.filter(object_id=self.customer.pk).order_by('-id')[1].delete()
+
+        exporter = LogExporter(export_dir=self.export_dir, settle_seconds=0, gap_seconds=0)
+        with mock.patch('core.log_export.timezone.now', return_value=timezone.now() + timedelta(seconds=1)):
+            result = exporter.export('customers')
+        self.assertFalse(result['deferred'])
+        self.assertEqual(exporter.get_state('customers')['open_ids'], {})
+
+    def test_full_rebuild_matches_incremental_output(self):
+        Order.objects.create(customer=self.customer, order_number='ORD-EXPORT-1', payment_method='Cash')
+        self.exporter.export('orders')
+        incremental_rows = self.read_rows('orders_logs.csv')
+
+        result = self.exporter.export('orders', full=True)
+        self.assertEqual(self.read_rows('orders_logs.csv'), incremental_rows)
+        self.assertEqual(result['lines'], len(incremental_rows) - 1)
+        self.assertEqual(self.exporter.export('orders')['lines'], 0)
+
+    def test_rotation_by_size(self):
+        exporter = LogExporter(export_dir=self.export_dir, settle_seconds=0, rotate_bytes=1)
+        exporter.export('customers')
+        self.customer.comments = 'rotated'
+        self.customer.save()
+        exporter.export('customers')
+
+        archives = [name for name in os.listdir(self.export_dir) if name.startswith('customers_logs.') and name != 'customers_logs.csv']
+        self.assertEqual(len(archives), 1)
+        rows = self.read_rows('customers_logs.csv')
+        self.assertEqual(rows[0], ['customer_id', 'customer_name', 'log_line'])
+        self.assertTrue(all('Customer Created' not in row[2] for row in rows[1:]))
+
+    @override_settings(LOG_EXPORT_ENABLED=True, LOG_EXPORT_ASYNC=False)
+    def test_save_schedules_export_on_commit(self):
+        with override_settings(LOG_EXPORT_DIR=self.export_dir):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.customer.comments = 'on commit'
+                self.customer.save()
+        self.assertTrue(os.path.exists(os.path.join(self.export_dir, 'customers_logs.csv')))
+
+
+class AuditEventTest(TestCase):
+    """Test structured change events replacing the comma-joined logs field"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(customer_name='Audit Customer', phone='09120000002')
+
+    def test_create_and_field_diff_events(self):
+        self.customer.status = 'Inactive'
+        self.customer.save()
+
+        events = AuditEvent.objects.filter(object_id=self.customer.pk, field_name='status', action='UPDATE')
+        self.assertEqual(events.count(), 1)
+        self.assertEqual(events[0].old_value, 'Active')
+        self.assertEqual(events[0].new_value, 'Inactive')
+        self.assertIn('Customer Created By system', str(self.customer.logs))
+
+    def test_logs_projection_is_paginated(self):
+        page = self.customer.logs.page(1, per_page=2)
+        self.assertEqual(len(page.object_list), 2)
+        self.assertEqual(page.paginator.count, len(self.customer.logs))
+        self.assertTrue(all(isinstance(line, str) for line in page.object_list))
+
+    def test_parse_legacy_log_line(self):
+        parsed = parse_legacy_log_line("2025-01-02 11:00:00 Total amount changed from 1,000 to 2,000 Toman By admin")
+        self.assertEqual(parsed['field_name'], 'total_amount')
+        self.assertEqual(parsed['old_value'], '1,000')
+        self.assertEqual(parsed['new_value'], '2,000')
+        self.assertEqual(parsed['actor'], 'admin')
+        self.assertEqual(parsed['timestamp'].hour, 11)
+
+
+class ActivityLogBufferTest(TestCase):
+    """Test batched ActivityLog writes and their backpressure policies"""
+
+    def make_entry(self, action='VIEW', severity='LOW'):
+        return ActivityLog(action=action, description=f'{action} {severity}', severity=severity)
+
+    def test_events_are_written_in_one_batch_on_flush(self):
+        buffer = ActivityLogBuffer(batch_size=10, start_worker=False)
+        for _ in range(3):
+            self.assertEqual(buffer.submit(self.make_entry()), 'queued')
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_high_severity_is_written_synchronously(self):
+        buffer = ActivityLogBuffer(start_worker=False)
+        self.assertEqual(buffer.submit(self.make_entry('DELETE', 'CRITICAL')), 'sync')
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(ActivityLog.objects.filter(severity='CRITICAL').count(), 1)
+
+    def test_full_queue_drops_low_views_and_falls_back_for_others(self):
+        buffer = ActivityLogBuffer(queue_size=1, enqueue_timeout_ms=0, start_worker=False)
+        self.assertEqual(buffer.submit(self.make_entry()), 'queued')
+        self.assertEqual(buffer.submit(self.make_entry()), 'dropped')
+        self.assertEqual(buffer.submit(self.make_entry('UPDATE', 'MEDIUM')), 'sync')
+        self.assertEqual(ActivityLog.objects.filter(action='UPDATE').count(), 1)
+
+    def test_low_views_are_sampled(self):
+        buffer = ActivityLogBuffer(view_sample_rate=0, start_worker=False)
+        self.assertEqual(buffer.submit(self.make_entry()), 'sampled')
+        self.assertEqual(buffer.submit(self.make_entry('UPDATE')), 'queued')
+
+    @override_settings(ACTIVITY_LOG_BUFFERED=True)
+    def test_log_activity_inside_transaction_is_synchronous(self):
+        entry = ActivityLog.log_activity(user=None, action='VIEW', description='in atomic block')
+        self.assertIsNotNone(entry.pk)
+
+
+class WarehouseStatsServiceTest(TestCase):
+    """Test single-pass inventory statistics"""
+
+    def setUp(self):
+        layout = [
+            ('Anbar_Akhal', 'In-stock', 0),
+            ('Anbar_Akhal', 'In-stock', 1000),
+            ('Anbar_Akhal', 'Sold', 1000),
+            ('Anbar_Akhal', 'Pre-order', 1000),
+            ('Anbar_Akhal', 'In-stock', 1000),
+            ('Anbar_Sangin', 'Sold', 1000),
+        ]
+        for index, (location, status, price) in enumerate(layout):
+            Product.objects.create(
+                reel_number=f'STATS-{index}', location=location, status=status, price=price,
+                width=1000, gsm=80, length=100, grade='A'
+            )
+
+    def test_inventory_stats_use_two_queries(self):
+        with self.assertNumQueries(2):
+            stats = WarehouseStatsService.get_inventory_stats(recent_per_location=4)
+
+        self.assertEqual(stats['total_products'], 6)
+        self.assertEqual(stats['in_stock_count'], 3)
+        self.assertEqual(stats['sold_count'], 2)
+        self.assertEqual(stats['pre_order_count'], 1)
+        self.assertEqual(stats['unpriced_in_stock_count'], 1)
+        self.assertEqual(stats['in_stock_weight'], Decimal('24'))
+        self.assertEqual(list(stats['location_stats']), ['Anbar_Akhal', 'Anbar_Sangin'])
+
+        akhal = stats['location_stats']['Anbar_Akhal']
+        self.assertEqual((akhal['total'], akhal['in_stock'], akhal['capacity_percentage']), (5, 3, 60))
+        self.assertEqual(len(akhal['products']), 4)
+        self.assertNotIn('STATS-0', [product.reel_number for product in akhal['products']])
+
+    def test_recent_products_are_ranked_per_location(self):
+        recent = WarehouseStatsService.get_recent_products_by_location(per_location=1)
+        self.assertEqual(recent['Anbar_Akhal'][0].reel_number, 'STATS-4')
+        self.assertEqual(recent['Anbar_Sangin'][0].reel_number, 'STATS-5')
+
+
+class CatalogueServiceTest(TestCase):
+    """Test cursor pagination of the storefront catalogue"""
+
+    def setUp(self):
+        for index in range(7):
+            Product.objects.create(
+                reel_number=f'CAT-{index}', location='Anbar_Akhal', status='In-stock', price=1000 + index,
+                width=1000, gsm=80, length=100, grade='A'
+            )
+        Product.objects.create(reel_number='CAT-UNPRICED', location='Anbar_Akhal', status='In-stock', price=0,
+                               width=1000, gsm=80, length=100, grade='A')
+        # زمان ایجاد یکسان برای چند محصول تا ترتیب بر اساس id تست شود
+        Product.objects.filter(reel_number__in=['CAT-2', 'CAT-3', 'CAT-4']).update(created_at=timezone.now())
+
+    def test_pages_cover_every_product_once(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = CatalogueService.get_page(CatalogueService.priced_products(), cursor, limit=3)
+            seen.extend(product.reel_number for product in page)
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), [f'CAT-{index}' for index in range(7)])
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            CatalogueService.get_page(Product.objects.all(), 'not-a-cursor')
+
+    def test_catalogue_api_returns_html_fragment(self):
+        from accounts.models import User
+
+        admin = User.objects.create_user(username='catalogue-admin', password='x', phone='09120000401', role=User.UserRole.ADMIN)
+        self.client.force_login(admin)
+        first_page, cursor = CatalogueService.get_page(CatalogueService.priced_products(), limit=5)
+
+        response = self.client.get('/core/api/catalogue/', {'layout': 'row', 'section': 'credit', 'cursor': cursor})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['count'], 2)
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['html'].count('data-type="credit"'), 2)
+        self.assertNotIn(f'data-product-id="{first_page[0].pk}"', data['html'])
+
+        response = self.client.get('/core/api/catalogue/', {'layout': 'card', 'cursor': 'broken'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CatalogueCacheTest(TestCase):
+    """Test version-keyed caching of catalogue fragments"""
+
+    def setUp(self):
+        self.catalogue_cache = CatalogueCache(alias='default')
+        self.catalogue_cache.bump()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {'html': f'build-{self.builds}'}
+
+    def test_local_then_shared_hits_until_bump(self):
+        self.assertEqual(self.catalogue_cache.get_or_set(('index',), self.build)['html'], 'build-1')
+        self.assertEqual(self.catalogue_cache.get_or_set(('index',), self.build)['html'], 'build-1')
+
+        # پردازه دیگر (همان cache مشترک) قطعه را از لایه مشترک می‌خواند
+        other_worker = CatalogueCache(alias='default')
+        self.assertEqual(other_worker.get_or_set(('index',), self.build)['html'], 'build-1')
+        self.assertEqual(other_worker.get_stats()['shared_hits'], 1)
+
+        other_worker.bump()
+        self.assertEqual(self.catalogue_cache.get_or_set(('index',), self.build)['html'], 'build-2')
+        stats = self.catalogue_cache.get_stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 2))
+
+    def test_product_changes_bump_version(self):
+        version = self.catalogue_cache.get_version()
+        product = Product.objects.create(reel_number='CACHE-1', location='Anbar_Akhal', status='In-stock', price=500,
+                                         width=1000, gsm=80, length=100, grade='A')
+        self.assertGreater(self.catalogue_cache.get_version(), version)
+
+        version = self.catalogue_cache.get_version()
+        ReservationService.sell([product.pk])
+        self.assertGreater(self.catalogue_cache.get_version(), version)
+
+    def test_index_page_reflects_price_update(self):
+        from accounts.models import User
+
+        admin = User.objects.create_user(username='cache-admin', password='x', phone='09120000501', role=User.UserRole.ADMIN)
+        self.client.force_login(admin)
+        product = Product.objects.create(reel_number='CACHE-2', location='Anbar_Akhal', status='In-stock', price=777,
+                                         width=1000, gsm=80, length=100, grade='A')
+        self.assertContains(self.client.get('/'), '<td>777</td>')
+        self.assertContains(self.client.get('/'), '<td>777</td>')
+        self.assertGreaterEqual(get_catalogue_cache().get_stats()['local_hits'], 1)
+
+        product.price = 888
+        product.save()
+        self.assertContains(self.client.get('/'), '<td>888</td>')
+
+
+class ProductMetricsTest(TestCase):
+    """Test SQL-side product area/weight annotations and totals"""
+
+    def setUp(self):
+        self.products = [
+            Product.objects.create(reel_number='METRIC-1', location='Anbar_Akhal', width=1250, gsm=90, length=3333, grade='A'),
+            Product.objects.create(reel_number='METRIC-2', location='Anbar_Akhal', width=700, gsm=125, length=4100, grade='B'),
+        ]
+
+    def test_totals_match_python_formulas(self):
+        with self.assertNumQueries(1):
+            totals = Product.objects.totals()
+        self.assertEqual(totals['count'], 2)
+        self.assertEqual(totals['total_area'], sum(p.get_total_area() for p in self.products))
+        self.assertEqual(totals['total_weight'], sum(p.get_total_weight() for p in self.products))
+        self.assertEqual(Product.objects.filter(reel_number='missing').totals()['total_weight'], Decimal('0'))
+
+    def test_with_metrics_annotates_rows(self):
+        product = Product.objects.with_metrics().get(reel_number='METRIC-2')
+        self.assertEqual(product.total_area, self.products[1].get_total_area())
+        self.assertEqual(product.total_weight, self.products[1].get_total_weight())
+
+    def test_large_reel_weight_is_computed_in_numeric(self):
+        large = Product.objects.create(reel_number='METRIC-3', location='Anbar_Akhal', width=2500, gsm=300,
+                                       length=20000, grade='A')
+        self.assertEqual(Product.objects.with_metrics().get(pk=large.pk).total_weight, Decimal('15000'))
+        # 🔢 SQLite سرریز int4 ندارد: ضریب Decimal باید اولین عملوند باشد تا PostgreSQL در numeric ضرب کند
+        expression = product_weight_expression().expression
+        while hasattr(expression, 'lhs'):
+            expression = expression.lhs
+        self.assertIsInstance(expression, Value)
+
+    def test_order_weight_is_one_query(self):
+        customer = Customer.objects.create(customer_name='Metric Customer', phone='09120000301')
+        order = Order.objects.create(customer=customer, order_number='METRIC-ORDER')
+        for product in self.products:
+            OrderItem.objects.create(order=order, product=product, quantity=2, unit_price=1, payment_method='Cash')
+        expected = sum(p.get_total_weight() * 2 for p in self.products)
+
+        order = Order.objects.get(pk=order.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(order.get_total_weight(), expected)
+        order = Order.objects.prefetch_related('order_items__product').get(pk=order.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.get_total_weight(), expected)
+
+
+class DailyFinanceRollupTest(TestCase):
+    """Test incrementally maintained daily finance rollups"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(customer_name='Finance Customer', phone='09120000003')
+        self.today = timezone.localdate()
+
+    def create_order(self, number, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(
+                customer=self.customer, order_number=number, payment_method='Cash',
+                total_amount=amount, final_amount=amount
+            )
+
+    def test_status_transition_updates_rollup(self):
+        order = self.create_order('ORD-FIN-1', Decimal('5000'))
+        rollup = DailyFinanceRollup.objects.get(date=self.today)
+        self.assertEqual((rollup.orders_count, rollup.pending_orders_count, rollup.revenue), (1, 1, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'Confirmed'
+            order.save()
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.pending_orders_count, rollup.revenue_orders_count), (0, 1))
+        self.assertEqual(rollup.revenue, Decimal('5000'))
+
+    def test_failed_payment_and_backfill_match(self):
+        order = self.create_order('ORD-FIN-2', Decimal('7000'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(order=order, amount=70000, gateway='zarinpal', status='FAILED')
+        incremental = list(DailyFinanceRollup.objects.values(*DailyFinanceRollup.ROLLUP_FIELDS))
+        self.assertEqual(incremental[0]['failed_payments_count'], 1)
+
+        DailyFinanceRollup.objects.all().delete()
+        call_command('backfill_finance_rollups', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(DailyFinanceRollup.objects.values(*DailyFinanceRollup.ROLLUP_FIELDS)), incremental)
+
+    def test_period_stats_and_latest_payment_queries(self):
+        order = self.create_order('ORD-FIN-3', Decimal('1000'))
+        Payment.objects.create(order=order, amount=10000, gateway='zarinpal')
+        latest = Payment.objects.create(order=order, amount=10000, gateway='zarinpal')
+
+        with self.assertNumQueries(1):
+            stats = FinanceStatsService.get_period_stats(self.today, self.today, self.today, self.today)
+        self.assertEqual((stats['total_orders'], stats['pending_orders']), (1, 1))
+
+        # یک کوئری سفارشات + یک کوئری پرداخت‌ها
+        with self.assertNumQueries(2):
+            orders = FinanceStatsService.attach_latest_payments(Order.objects.filter(pk=order.pk))
+        self.assertEqual(orders[0].latest_payment, latest)
+
+
+class OrderBuilderServiceTest(TestCase):
+    """Test bulk order placement"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(customer_name='Builder Customer', phone='09120000004')
+        self.products = [
+            Product.objects.create(
+                reel_number=f'BUILD-{index}', location='Anbar_Akhal', price=Decimal('1000'),
+                width=1000, gsm=80, length=100, grade='A'
+            )
+            for index in range(20)
+        ]
+
+    def place(self, products):
+        order = Order(customer=self.customer, status='Pending')
+        found = OrderBuilderService.get_in_stock_products([product.pk for product in products])
+        lines = [OrderBuilderService.build_line(found[product.pk], 1) for product in products]
+        with transaction.atomic():
+            return OrderBuilderService.fill_order(order, lines, 'Terms')
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.place(self.products[:2])
+        with self.assertNumQueries(len(small.captured_queries)):
+            order = self.place(self.products[2:])
+
+        order.refresh_from_db()
+        self.assertEqual(order.order_items.count(), 18)
+        self.assertEqual(order.total_amount, Decimal('18000'))
+        self.assertTrue(order.order_number)
+        self.assertEqual(Product.objects.filter(status='Sold').count(), 20)
+        self.assertEqual(order.audit_events.filter(field_name='order_items').count(), 1)
+
+    def test_unavailable_product_rolls_back(self):
+        found = OrderBuilderService.get_in_stock_products([self.products[0].pk])
+        Product.objects.filter(pk=self.products[0].pk).update(status='Sold')
+        order = Order(customer=self.customer, status='Pending')
+        with self.assertRaises(OrderPlacementError):
+            with transaction.atomic():
+                OrderBuilderService.fill_order(order, [OrderBuilderService.build_line(found[self.products[0].pk], 1)], 'Cash')
+        self.assertFalse(Order.objects.filter(customer=self.customer).exists())
+
+        with self.assertRaises(OrderPlacementError):
+            OrderBuilderService.get_in_stock_products([self.products[0].pk])
+
+
+class ReservationServiceTest(TestCase):
+    """Test compare-and-set product holds"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(customer_name='Hold Customer', phone='09120000005')
+        self.first = Order.objects.create(customer=self.customer, order_number='ORD-HOLD-1', status='Processing')
+        self.second = Order.objects.create(customer=self.customer, order_number='ORD-HOLD-2', status='Processing')
+        self.products = [
+            Product.objects.create(
+                reel_number=f'HOLD-{index}', location='Anbar_Akhal', price=Decimal('1000'),
+                width=1000, gsm=80, length=100, grade='A'
+            )
+            for index in range(3)
+        ]
+        self.ids = [product.pk for product in self.products]
+
+    def test_hold_blocks_other_orders(self):
+        self.assertEqual(ReservationService.reserve(self.first.pk, self.ids[:2]), set(self.ids[:2]))
+        self.assertEqual(ReservationService.reserve(self.second, self.ids), {self.ids[2]})
+
+        self.assertEqual(ReservationService.sell(self.ids[:2], order=self.second), 0)
+        self.assertEqual(ReservationService.sell(self.ids[:2], order=self.first), 2)
+        self.assertEqual(Product.objects.filter(status='Sold', reserved_for__isnull=True).count(), 2)
+        # یک محصول فروخته شده دوباره فروخته نمی‌شود
+        self.assertEqual(ReservationService.sell(self.ids[:1]), 0)
+
+    def test_expired_holds_are_claimable_and_reclaimed_in_bulk(self):
+        ReservationService.reserve(self.first, self.ids, minutes=-1)
+        self.assertEqual(ReservationService.reserve(self.second, self.ids[:1]), {self.ids[0]})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(ReservationService.release_expired(), 2)
+        self.assertEqual(Product.objects.filter(reserved_for=self.second).count(), 1)
+        self.assertEqual(ReservationService.release_orders([self.second.pk]), 1)
+        self.assertFalse(Product.objects.filter(reserved_for__isnull=False).exists())
+
+    def test_builder_respects_holds(self):
+        ReservationService.reserve(self.first, self.ids[:1])
+        products = OrderBuilderService.get_in_stock_products(self.ids[:1])
+        line = OrderBuilderService.build_line(products[self.ids[0]], 1)
+        with self.assertRaises(OrderPlacementError):
+            with transaction.atomic():
+                OrderBuilderService.fill_order(self.second, [line], 'Cash')
+        with transaction.atomic():
+            OrderBuilderService.fill_order(Order(customer=self.customer), [line], 'Terms', hold_order=self.first)
+        self.assertEqual(Product.objects.get(pk=self.ids[0]).status, 'Sold')
+
+
+class ExpirySweepTest(TestCase):
+    """Test set-based cancellation of expired Processing orders and payments"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(customer_name='Sweep Customer', phone='09120000006')
+
+    def create_expired_orders(self, count, prefix):
+        orders = []
+        for index in range(count):
+            order = Order.objects.create(customer=self.customer, order_number=f'{prefix}-{index}', status='Processing')
+            product = Product.objects.create(
+                reel_number=f'{prefix}-{index}', location='Anbar_Akhal', status='Pre-order',
+                width=1000, gsm=80, length=100, grade='A'
+            )
+            order.order_items.create(product=product, quantity=1, unit_price=0, total_price=0)
+            orders.append(order)
+        Order.objects.filter(order_number__startswith=prefix).update(
+            status='Processing', updated_at=timezone.now() - timedelta(hours=1)
+        )
+        return orders
+
+    def test_cancel_expired_orders_in_bulk(self):
+        ContentType.objects.get_for_models(Order, Product)
+        self.create_expired_orders(2, 'SWEEP-A')
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(ExpirySweepService.cancel_expired_orders(timeout_minutes=5), 2)
+
+        orders = self.create_expired_orders(10, 'SWEEP-B')
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.assertEqual(ExpirySweepService.cancel_expired_orders(timeout_minutes=5), 10)
+
+        self.assertFalse(Order.objects.filter(status='Processing').exists())
+        self.assertFalse(Product.objects.filter(status='Pre-order').exists())
+        self.assertEqual(
+            AuditEvent.objects.filter(object_id=orders[0].pk, field_name='status', new_value='Cancelled').count(), 1
+        )
+        self.assertEqual(ActivityLog.objects.filter(action='CANCEL').count(), 12)
+        # اجرای دوباره چیزی را لغو نمی‌کند
+        self.assertEqual(ExpirySweepService.cancel_expired_orders(timeout_minutes=5), 0)
+
+    def test_recent_orders_are_kept(self):
+        Order.objects.create(customer=self.customer, order_number='SWEEP-FRESH', status='Processing')
+        self.assertEqual(ExpirySweepService.cancel_expired_orders(timeout_minutes=5), 0)
+
+    def test_expired_payments_time_out_in_bulk(self):
+        from payments.services import PaymentService
+
+        order = Order.objects.create(customer=self.customer, order_number='SWEEP-PAY', status='Pending')
+        payments = [Payment.objects.create(order=order, amount=1000, gateway='zarinpal', status=status)
+                    for status in ('INITIATED', 'PENDING', 'SUCCESS')]
+        Payment.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(PaymentService.check_expired_payments(), 2)
+        self.assertEqual(Payment.objects.filter(status='TIMEOUT').count(), 2)
+        self.assertEqual(Payment.objects.get(pk=payments[2].pk).status, 'SUCCESS')
+        event = AuditEvent.objects.get(object_id=payments[1].pk, field_name='status', new_value='TIMEOUT')
+        self.assertEqual(event.old_value, 'PENDING')
+
+
+class ShopHoursCacheTest(TestCase):
+    """Test the in-process shop-open cache"""
+
+    def setUp(self):
+        self.hours = WorkingHours.objects.create(start_time='09:00', end_time='18:00', is_active=True)
+        self.shop_hours = ShopHoursCache(ttl=3600)
+
+    def at(self, day, hour, minute=0):
+        # 2026-10-19 دوشنبه است
+        return TEHRAN_TZ.localize(datetime(2026, 10, day, hour, minute))
+
+    def test_hot_path_runs_no_queries(self):
+        self.assertTrue(self.shop_hours.is_open(self.at(19, 10)))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.shop_hours.is_open(self.at(19, 17, 59)))
+            self.assertFalse(self.shop_hours.is_open(self.at(19, 18, 1)))
+            self.assertTrue(self.shop_hours.is_open(self.at(20, 9)))
+
+    def test_next_transition_skips_closed_thursday(self):
+        self.assertFalse(self.shop_hours.is_open(self.at(21, 19)))
+        self.assertEqual(self.shop_hours.time_until_change(self.at(21, 19)), timedelta(hours=38))
+
+    def test_holiday_never_reopens(self):
+        self.hours.is_holiday = True
+        self.hours.save()
+        self.assertFalse(self.shop_hours.is_open(self.at(19, 10)))
+        self.assertIsNone(self.shop_hours.time_until_change(self.at(19, 10)))
+
+    def test_save_invalidates_cache(self):
+        self.assertTrue(self.shop_hours.is_open(self.at(19, 10)))
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkingHours.objects.create(start_time='12:00', end_time='18:00', is_active=True)
+        self.assertFalse(self.shop_hours.is_open(self.at(19, 10)))
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+    })
+    def test_version_bump_reloads_other_instance(self):
+        worker_a = ShopHoursCache(ttl=3600, alias='shared')
+        worker_b = ShopHoursCache(ttl=3600, alias='shared')
+        self.assertTrue(worker_a.is_open(self.at(19, 10)))
+        self.assertTrue(worker_b.is_open(self.at(19, 10)))
+
+        # 🔄 تغییر بدون سیگنال؛ فقط نسخه مشترک به worker دوم خبر می‌دهد
+        WorkingHours.objects.filter(pk=self.hours.pk).update(start_time='12:00')
+        worker_a.invalidate()
+
+        self.assertIsNotNone(caches['shared'].get(VERSION_KEY))
+        self.assertIsNone(caches['default'].get(VERSION_KEY))
+        self.assertFalse(worker_b.is_open(self.at(19, 10)))
@@ -65,6 +65,7 @@ urlpatterns = [
     path('api/update-price/', views.update_price_api, name='update_price_api'),
     path('api/delete-product/', views.product_delete_api, name='product_delete_api'),
     path('api/bulk-delete-products/', views.bulk_delete_products_api, name='bulk_delete_products_api'),
+    path('api/catalogue/', views.catalogue_api_view, name='catalogue_api'),
     
     # ⏰ مدیریت ساعات کاری - فقط Super Admin
     path('working-hours/', views.working_hours_management_view, name='working_hours_management'),
@@ -8,10 +8,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
 from django.http import JsonResponse, HttpResponse, Http404
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from accounts.permissions import check_user_permission, super_admin_permission_required
-from .models import Customer, Product, ActivityLog, Order, OrderItem, WorkingHours
+from .models import Customer, Product, ActivityLog, Order, OrderItem, WorkingHours, DailyFinanceRollup
+from .services import (
+    CatalogueService, WarehouseStatsService, FinanceStatsService, OrderBuilderService, OrderPlacementError,
+    ReservationService
+)
+from .shop_hours import get_shop_hours_cache
+from .catalogue_cache import get_catalogue_cache
 from payments.models import Payment
 from accounts.models import User
 from django.contrib import messages
@@ -31,6 +37,7 @@ from django.forms import ModelForm
 from django.utils.decorators import method_decorator
 import logging
 from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseForbidden
 from django.core.exceptions import ValidationError
@@ -97,6 +104,42 @@ def get_client_ip(request):
     return ip
 
 
+def _catalogue_filters(params):
+    """🔍 فیلترهای کاتالوگ از پارامترهای درخواست (برای فیلتر کوئری و کلید کش)"""
+    return {key: params.get(key, '') for key in ('search', 'location', 'min_price', 'max_price')}
+
+
+def _render_catalogue_cards(products, is_authenticated):
+    """🗂️ رندر کارت‌های محصول - فقط به وضعیت ورود کاربر وابسته است تا قابل کش باشد"""
+    return render_to_string('core/partials/catalogue_cards.html', {
+        'products': products,
+        'user': {'is_authenticated': is_authenticated},
+    })
+
+
+def _build_index_catalogue():
+    """🏠 صفحه اول جدول‌های نقدی/نسیه و price_data صفحه اصلی"""
+    priced_products = CatalogueService.priced_products()
+    products, next_cursor = CatalogueService.get_page(priced_products)
+    products_total = CatalogueService.count_with_first_page(priced_products, products, next_cursor)
+    
+    # 💰 جدیدترین قیمت و موجودی (جدول نقدی و نسیه از یک مجموعه محصولات تغذیه می‌شوند)
+    latest_price = products[0].price if products else 0
+    return {
+        'price_data': {
+            'cash': {'price': latest_price, 'stock': products_total},
+            'credit': {'price': latest_price, 'stock': products_total},
+        },
+        'has_products': bool(products),
+        'products_total': products_total,
+        'next_cursor': next_cursor,
+        'rows': {
+            section: render_to_string('core/partials/catalogue_rows.html', {'products': products, 'section': section})
+            for section in ('cash', 'credit')
+        },
+    }
+
+
 @login_required
 def admin_dashboard_view(request):
     """📊 داشبورد مدیریت"""
@@ -118,22 +161,20 @@ def admin_dashboard_view(request):
         severity='LOW'
     )
     
-    # 📊 آمار کلی
+    # 📊 آمار کلی (شمارش محصولات در یک کوئری)
+    product_totals = WarehouseStatsService.get_status_totals()
     stats = {
         'total_customers': Customer.objects.count(),
-        'total_products': Product.objects.count(),
-        'available_products': Product.objects.filter(status='In-stock').count(),
-        'sold_products': Product.objects.filter(status='Sold').count(),
+        'total_products': product_totals['total'],
+        'available_products': product_totals['in_stock'],
+        'sold_products': product_totals['sold'],
         'recent_activities': ActivityLog.objects.select_related('user')[:10]
     }
     
     # 🚨 Check for un-priced products (for super admin alarm)
     un_priced_products_count = 0
     if request.user.is_super_admin():
-        un_priced_products_count = Product.objects.filter(
-            status='In-stock',
-            price=0
-        ).count()
+        un_priced_products_count = product_totals['unpriced_in_stock']
     
     # 💰 Super Admin هیچ محدودیتی ندارد
     products_for_price_management = None
@@ -198,51 +239,8 @@ def inventory_list_view(request):
         severity='LOW'
     )
     
-    # 📊 محاسبه آمار کلی موجودی
-    total_products = Product.objects.count()
-    in_stock_count = Product.objects.filter(status='In-stock').count()
-    sold_count = Product.objects.filter(status='Sold').count()
-    pre_order_count = Product.objects.filter(status='Pre-order').count()
-    
-    # محاسبه درصد ظرفیت انبار (بر اساس محصولات موجود)
-    warehouse_capacity_percentage = round((in_stock_count / max(total_products, 1)) * 100)
-    
-    # تعداد انبارها
-    warehouses_count = len(Product.LOCATION_CHOICES)
-    
-    # آمار بر اساس مکان انبار
-    location_stats = {}
-    for location_code, location_name in Product.LOCATION_CHOICES:
-        location_products = Product.objects.filter(location=location_code)
-        location_in_stock = location_products.filter(status='In-stock').count()
-        location_total = location_products.count()
-        location_sold = location_products.filter(status='Sold').count()
-        location_pre_order = location_products.filter(status='Pre-order').count()
-        
-        # فقط انبارهایی که حداقل یک محصول دارند را نمایش بده
-        if location_total > 0:
-            location_stats[location_code] = {
-                'name': location_name,
-                'total': location_total,
-                'in_stock': location_in_stock,
-                'sold': location_sold,
-                'pre_order': location_pre_order,
-                'capacity_percentage': round((location_in_stock / max(location_total, 1)) * 100),
-                'products': location_products.order_by('-created_at')[:4]  # آخرین 4 محصول برای نمایش
-            }
-    
-    # آمار کلی
-    inventory_stats = {
-        'total_products': total_products,
-        'in_stock_count': in_stock_count,
-        'sold_count': sold_count,
-        'pre_order_count': pre_order_count,
-        'warehouse_capacity_percentage': warehouse_capacity_percentage,
-        'warehouses_count': warehouses_count,
-        'low_stock_count': 0,  # می‌توانید منطق کم موجودی را اضافه کنید
-        'out_of_stock_count': 0,  # می‌توانید منطق ناموجودی را اضافه کنید
-        'location_stats': location_stats,
-    }
+    # 📊 آمار کلی و آمار هر انبار (یک کوئری گروه‌بندی شده + یک کوئری window)
+    inventory_stats = WarehouseStatsService.get_inventory_stats(recent_per_location=4)
     
     context = {
         'title': '📦 مدیریت موجودی',
@@ -700,38 +698,7 @@ def finance_overview_view(request):
         start_date = today.replace(day=1)  # پیش‌فرض: این ماه
         end_date = today
     
-    # 📊 محاسبه آمار مالی واقعی
-    # درآمد کل (سفارشات تایید شده و تحویل داده شده)
-    revenue_query = Order.objects.filter(
-        status__in=['Confirmed', 'Delivered']
-    )
-    
-    expenses_query = OrderItem.objects.filter(
-        order__status__in=['Confirmed', 'Delivered']
-    )
-    
-    orders_query = Order.objects.all()
-    
-    # Apply date filtering based on filter type
-    if filter_by == 'recently_changed':
-        # For recently changed, use updated_at field
-        revenue_query = revenue_query.filter(updated_at__date__gte=start_date, updated_at__date__lte=end_date)
-        expenses_query = expenses_query.filter(order__updated_at__date__gte=start_date, order__updated_at__date__lte=end_date)
-        orders_query = orders_query.filter(updated_at__date__gte=start_date, updated_at__date__lte=end_date)
-    else:
-        # For other filters, use created_at field
-        revenue_query = revenue_query.filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
-        expenses_query = expenses_query.filter(order__created_at__date__gte=start_date, order__created_at__date__lte=end_date)
-        orders_query = orders_query.filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
-    
-    total_revenue = revenue_query.aggregate(total=Sum('final_amount'))['total'] or 0
-    total_expenses = expenses_query.aggregate(total=Sum('total_price'))['total'] or 0
-    total_orders = orders_query.count()
-    
-    # سود خالص (درآمد - هزینه)
-    net_profit = total_revenue - total_expenses
-    
-    # محاسبه درصد تغییر نسبت به دوره قبل
+    # محاسبه بازه دوره قبل برای درصد تغییر
     if filter_by == 'today':
         previous_start_date = start_date - timedelta(days=1)
         previous_end_date = start_date - timedelta(days=1)
@@ -749,45 +716,43 @@ def finance_overview_view(request):
         previous_start_date = start_date - timedelta(days=30)
         previous_end_date = start_date - timedelta(days=1)
     
-    # آمار دوره قبل
+    # 📊 آمار مالی از جدول خلاصه روزانه (درآمد = سفارشات تایید شده و تحویل داده شده)
     if filter_by == 'recently_changed':
-        prev_revenue = Order.objects.filter(
-            status__in=['Confirmed', 'Delivered'],
-            updated_at__date__gte=previous_start_date,
-            updated_at__date__lte=previous_end_date
-        ).aggregate(total=Sum('final_amount'))['total'] or 0
-        
-        prev_orders = Order.objects.filter(
-            updated_at__date__gte=previous_start_date,
-            updated_at__date__lte=previous_end_date
-        ).count()
+        # For recently changed, use updated_at field
+        finance_stats = FinanceStatsService.get_recently_changed_stats(
+            start_date, end_date, previous_start_date, previous_end_date
+        )
     else:
-        prev_revenue = Order.objects.filter(
-            status__in=['Confirmed', 'Delivered'],
-            created_at__date__gte=previous_start_date,
-            created_at__date__lte=previous_end_date
-        ).aggregate(total=Sum('final_amount'))['total'] or 0
-        
-        prev_orders = Order.objects.filter(
-            created_at__date__gte=previous_start_date,
-            created_at__date__lte=previous_end_date
-        ).count()
+        # For other filters, use created_at field (rollups)
+        finance_stats = FinanceStatsService.get_period_stats(
+            start_date, end_date, previous_start_date, previous_end_date
+        )
+    
+    total_revenue = finance_stats['total_revenue']
+    total_expenses = finance_stats['total_expenses']
+    total_orders = finance_stats['total_orders']
+    prev_revenue = finance_stats['prev_revenue']
+    prev_orders = finance_stats['prev_orders']
+    
+    # سود خالص (درآمد - هزینه)
+    net_profit = total_revenue - total_expenses
     
     # محاسبه درصد تغییر
     revenue_change = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
     orders_change = ((total_orders - prev_orders) / prev_orders * 100) if prev_orders > 0 else 0
     
     # 🧾 آخرین تراکنش‌ها (سفارشات اخیر)
+    period_start, period_end = DailyFinanceRollup.day_bounds(start_date, end_date)
     if filter_by == 'recently_changed':
         recent_transactions = Order.objects.select_related('customer').filter(
-            updated_at__date__gte=start_date,
-            updated_at__date__lte=end_date
-        ).order_by('-updated_at')[:10]
+            updated_at__gte=period_start,
+            updated_at__lt=period_end
+        ).order_by('-updated_at')
     else:
         recent_transactions = Order.objects.select_related('customer').filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).order_by('-created_at')[:10]
+            created_at__gte=period_start,
+            created_at__lt=period_end
+        ).order_by('-created_at')
     
     # Apply search filter if provided
     if search_term:
@@ -797,11 +762,8 @@ def finance_overview_view(request):
             Q(status__icontains=search_term)
         )
     
-    # اضافه کردن اطلاعات پرداخت به تراکنش‌ها
-    for transaction in recent_transactions:
-        transaction.latest_payment = Payment.objects.filter(
-            order=transaction
-        ).order_by('-created_at').first()
+    # اضافه کردن اطلاعات پرداخت به تراکنش‌ها (یک کوئری برای همه)
+    recent_transactions = FinanceStatsService.attach_latest_payments(recent_transactions[:10])
     
     # 📋 خلاصه عملکرد مالی
     performance_summary = {
@@ -818,11 +780,11 @@ def finance_overview_view(request):
         performance_summary['positive_points'].append(f'✅ سود خالص: {net_profit:,.0f} تومان')
     
     # نکات قابل توجه
-    pending_orders = Order.objects.filter(status='Pending').count()
+    pending_orders = finance_stats['pending_orders']
     if pending_orders > 0:
         performance_summary['attention_points'].append(f'⚠️ {pending_orders} سفارش در انتظار تایید')
     
-    failed_payments = Payment.objects.filter(status='FAILED').count()
+    failed_payments = finance_stats['failed_payments']
     if failed_payments > 0:
         performance_summary['attention_points'].append(f'⚠️ {failed_payments} پرداخت ناموفق')
     
@@ -894,11 +856,12 @@ def products_list_view(request):
     if status_filter:
         products = products.filter(status=status_filter)
     
-    # 📊 آمار محصولات
+    # 📊 آمار محصولات (مساحت و وزن در پایگاه داده - یک کوئری)
+    totals = products.totals()
     products_stats = {
-        'total_count': products.count(),
-        'total_area': sum(p.get_total_area() for p in products),
-        'total_weight': sum(p.get_total_weight() for p in products),
+        'total_count': totals['count'],
+        'total_area': totals['total_area'],
+        'total_weight': totals['total_weight'],
         'location_stats': products.values('location').annotate(count=Count('id')),
         'status_stats': products.values('status').annotate(count=Count('id')),
     }
@@ -1095,23 +1058,23 @@ def dashboard_stats_api(request):
     )
     
     # 📊 محاسبه آمار
+    product_totals = WarehouseStatsService.get_status_totals()
     stats = {
         'customers': {
             'total': Customer.objects.count(),
             'active': Customer.objects.filter(status='Active').count(),
         },
         'products': {
-            'total': Product.objects.count(),
-            'in_stock': Product.objects.filter(status='In-stock').count(),
-            'sold': Product.objects.filter(status='Sold').count(),
-            'pre_order': Product.objects.filter(status='Pre-order').count(),
+            key: product_totals[key]
+            for key in ('total', 'in_stock', 'sold', 'pre_order')
         },
         'activities': {
             'today': ActivityLog.objects.filter(
                 created_at__date=timezone.now().date()
             ).count(),
             'total': ActivityLog.objects.count(),
-        }
+        },
+        'catalogue_cache': get_catalogue_cache().get_stats(),
     }
     
     # اگر درخواست برای مدیریت قیمت باشد، اطلاعات محصولات را اضافه کن
@@ -1454,13 +1417,14 @@ def check_working_hours_middleware(view_func):
         if request.user.is_authenticated and (request.user.is_super_admin() or request.user.is_admin()):
             return view_func(request, *args, **kwargs)
         
-        # 🕐 بررسی ساعات کاری برای سایر کاربران
-        if not WorkingHours.is_shop_open():
-            current_hours = WorkingHours.get_current_working_hours()
+        # 🕐 بررسی ساعات کاری برای سایر کاربران (از کش - بدون کوئری)
+        shop_hours = get_shop_hours_cache()
+        if not shop_hours.is_open():
+            current_hours = shop_hours.get_working_hours()
             context = {
                 'title': '🔒 فروشگاه بسته است',
                 'current_working_hours': current_hours,
-                'time_until_open': current_hours.time_until_open() if current_hours else None,
+                'time_until_open': (shop_hours.time_until_change() or current_hours.time_until_open()) if current_hours else None,
                 'holiday_help_text': current_hours.holiday_help_text if current_hours and current_hours.is_holiday else '',
             }
             return render(request, 'core/shop_closed.html', context)
@@ -1486,27 +1450,8 @@ def index_view(request):
             severity='LOW'
         )
     
-    # دریافت محصولات واقعی از مدل Product
-    all_products = Product.objects.filter(status='In-stock').order_by('-created_at')
-    
-    # جداسازی محصولات با قیمت و بدون قیمت
-    products = all_products.filter(price__gt=0).order_by('-created_at')
-    un_priced_products = all_products.filter(price=0).order_by('-created_at')
-    credit_products = all_products.filter(price__gt=0).order_by('-created_at')
-    
-    # اگر نوع پرداخت در مدل دارید، می‌توانید فیلتر کنید (مثلاً payment_type='credit')
-    # credit_products = Product.objects.filter(status='In-stock', payment_type='credit').order_by('-created_at')
-
-    price_data = {
-        'cash': {
-            'price': products.first().price if products.exists() else 0,
-            'stock': products.count()
-        },
-        'credit': {
-            'price': credit_products.first().price if credit_products.exists() else 0,
-            'stock': credit_products.count()
-        }
-    }
+    # 📄 فقط صفحه اول محصولات قیمت‌گذاری شده (از کش نسخه‌دار کاتالوگ)؛ بقیه با اسکرول بارگذاری می‌شوند
+    catalogue = get_catalogue_cache().get_or_set(('index',), _build_index_catalogue)
     
     # 🔄 Check for unfinished payment orders (new policy)
     unfinished_payment_orders = []
@@ -1554,10 +1499,12 @@ def index_view(request):
     
     context = {
         'title': 'کارخانه کاغذ و مقوای همایون',
-        'price_data': price_data,
-        'products': products,  # فقط محصولات با قیمت
-        'un_priced_products': un_priced_products,
-        'credit_products': credit_products,
+        'price_data': catalogue['price_data'],
+        'has_products': catalogue['has_products'],
+        'cash_rows_html': mark_safe(catalogue['rows']['cash']),
+        'credit_rows_html': mark_safe(catalogue['rows']['credit']),
+        'products_total': catalogue['products_total'],
+        'next_cursor': catalogue['next_cursor'],
         'user': request.user,
         'unfinished_payment_orders': unfinished_payment_orders,
     }
@@ -1568,57 +1515,45 @@ def index_view(request):
 def products_landing_view(request):
     """🛍️ صفحه اصلی محصولات"""
     
-    # فقط محصولات موجود در انبار
-    available_products = Product.objects.filter(status='In-stock').order_by('-created_at')
-    
     # فیلترهای جستجو
-    search_query = request.GET.get('search', '')
-    location_filter = request.GET.get('location', '')
-    min_price = request.GET.get('min_price', '')
-    max_price = request.GET.get('max_price', '')
-    
-    # اعمال فیلترها
-    if search_query:
-        available_products = available_products.filter(
-            Q(reel_number__icontains=search_query) |
-            Q(grade__icontains=search_query)
-        )
-    
-    if location_filter:
-        available_products = available_products.filter(location=location_filter)
-    
-    if min_price:
-        try:
-            available_products = available_products.filter(price__gte=float(min_price))
-        except ValueError:
-            pass
-    
-    if max_price:
-        try:
-            available_products = available_products.filter(price__lte=float(max_price))
-        except ValueError:
-            pass
+    filters = _catalogue_filters(request.GET)
+    search_query = filters['search']
+    location_filter = filters['location']
+    min_price = filters['min_price']
+    max_price = filters['max_price']
+    is_authenticated = request.user.is_authenticated
+    
+    def build_landing_catalogue():
+        # فقط محصولات موجود در انبار + اعمال فیلترها
+        available_products = CatalogueService.filter_products(search_query, location_filter, min_price, max_price)
+        # آمار کلی (یک کوئری) + فقط صفحه اول؛ بقیه با اسکرول بارگذاری می‌شوند
+        products, next_cursor = CatalogueService.get_page(available_products)
+        return {
+            'stats': CatalogueService.get_stats(available_products),
+            'has_products': bool(products),
+            'cards': _render_catalogue_cards(products, is_authenticated),
+            'next_cursor': next_cursor,
+        }
     
-    # آمار کلی
-    stats = {
-        'total_products': available_products.count(),
-        'in_stock_count': available_products.count(),
-        'avg_price': available_products.aggregate(Avg('price'))['price__avg'] or 0,
+    catalogue = get_catalogue_cache().get_or_set(('landing', filters, is_authenticated), build_landing_catalogue)
+    stats = dict(catalogue['stats'])
+    stats.update({
+        'in_stock_count': stats['total_products'],
         'warehouses_count': len(Product.LOCATION_CHOICES),
         'locations': Product.LOCATION_CHOICES,
-    }
+    })
     
     # ثبت لاگ بازدید
     if request.user.is_authenticated:
         ActivityLog.log_activity(
             user=request.user,
             action='VIEW',
-            description=f'مشاهده صفحه محصولات - {available_products.count()} محصول',
+            description=f'مشاهده صفحه محصولات - {stats["total_products"]} محصول',
             severity='LOW',
             ip_address=get_client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT'),
             page='products_landing',
-            products_count=available_products.count(),
+            products_count=stats['total_products'],
             filters_applied={
                 'search': search_query,
                 'location': location_filter,
@@ -1627,7 +1562,9 @@ def products_landing_view(request):
         )
     
     context = {
-        'products': available_products,
+        'has_products': catalogue['has_products'],
+        'cards_html': mark_safe(catalogue['cards']),
+        'next_cursor': catalogue['next_cursor'],
         'stats': stats,
         'search_query': search_query,
         'location_filter': location_filter,
@@ -1638,6 +1575,44 @@ def products_landing_view(request):
     return render(request, 'core/products_landing.html', context)
 
 
+@check_working_hours_middleware
+@require_http_methods(["GET"])
+def catalogue_api_view(request):
+    """
+    📄 API صفحه‌بندی cursor کاتالوگ فروشگاه
+    
+    🎯 صفحات بعدی جدول‌های صفحه اصلی (layout=row) و کارت‌های صفحه محصولات (layout=card)
+    📦 خروجی: قطعه HTML رندر شده + cursor صفحه بعد
+    """
+    layout = request.GET.get('layout', 'card')
+    section = request.GET.get('section', 'cash') if layout == 'row' else None
+    cursor = request.GET.get('cursor') or None
+    filters = _catalogue_filters(request.GET) if layout == 'card' else {}
+    is_authenticated = request.user.is_authenticated
+    
+    if layout not in ('row', 'card'):
+        return JsonResponse({'success': False, 'error': '❌ نوع نمایش نامعتبر است'}, status=400)
+    if layout == 'row' and section not in ('cash', 'credit'):
+        return JsonResponse({'success': False, 'error': '❌ بخش نامعتبر است'}, status=400)
+    
+    def build_page():
+        if layout == 'row':
+            page, next_cursor = CatalogueService.get_page(CatalogueService.priced_products(), cursor)
+            html = render_to_string('core/partials/catalogue_rows.html', {'products': page, 'section': section})
+        else:
+            page, next_cursor = CatalogueService.get_page(CatalogueService.filter_products(**filters), cursor)
+            html = _render_catalogue_cards(page, is_authenticated)
+        return {'success': True, 'html': html, 'count': len(page), 'next_cursor': next_cursor}
+    
+    key = ('page', layout, section, cursor, filters, is_authenticated and layout == 'card')
+    try:
+        payload = get_catalogue_cache().get_or_set(key, build_page)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': '❌ cursor نامعتبر است'}, status=400)
+    
+    return JsonResponse(payload)
+
+
 @check_working_hours_middleware
 @require_http_methods(["POST"])
 def add_to_cart_view(request):
@@ -1744,10 +1719,7 @@ def cart_view(request):
     request.session['cart'] = cart
     
     # بررسی وجود پروفایل مشتری
-    try:
-        customer = Customer.objects.get(customer_name=request.user.get_full_name())
-    except Customer.DoesNotExist:
-        customer = None
+    customer = request.user.customer
     
     context = {
         'cart_items': cart_items,
@@ -1793,6 +1765,11 @@ def checkout_view(request):
         for cart_key, item in cart.items():
             try:
                 product = Product.objects.get(id=item['product_id'], status='In-stock')
+                
+                # تغییر وضعیت محصول به فروخته شده (compare-and-set - جلوگیری از فروش هم‌زمان)
+                if not ReservationService.sell([product.id]):
+                    continue
+                
                 OrderItem.objects.create(
                     order=order,
                     product=product,
@@ -1801,10 +1778,6 @@ def checkout_view(request):
                     payment_method=item.get('payment_method', 'Cash')  # استفاده از payment_method آیتم
                 )
                 
-                # تغییر وضعیت محصول به فروخته شده
-                product.status = 'Sold'
-                product.save()
-                
             except Product.DoesNotExist:
                 continue
         
@@ -2356,9 +2329,9 @@ def create_order_for_customer_view(request, customer_id):
                 order.calculate_final_amount()
                 order.save()
                 
-                # تغییر وضعیت محصول به فروخته شده
-                product.status = 'Sold'
-                product.save()
+                # تغییر وضعیت محصول به فروخته شده (compare-and-set - جلوگیری از فروش هم‌زمان)
+                if not ReservationService.sell([product.id]):
+                    raise OrderPlacementError(f'محصول {product.reel_number} دیگر موجود نیست یا توسط مشتری دیگری رزرو شده است')
                 
                 # ثبت لاگ
                 ActivityLog.log_activity(
@@ -2574,13 +2547,23 @@ def selected_products_view(request):
             else:
                 # Use existing processing order
                 request.session['processing_order_id'] = existing_order.id
+            
+            # 🔒 رزرو (یا تمدید رزرو) محصولات انتخاب شده برای سفارش در حال پردازش
+            held_ids = ReservationService.reserve(request.session['processing_order_id'], [p.id for p in products])
     except Exception as e:
         messages.error(request, f'❌ خطا در ایجاد سفارش: {str(e)}')
         return redirect('core:products_landing')
+    
+    reserved_elsewhere = [p for p in products if p.id not in held_ids]
+    if reserved_elsewhere:
+        messages.warning(request, f'⚠️ {len(reserved_elsewhere)} محصول انتخاب شده در حال حاضر توسط مشتری دیگری رزرو شده است')
+        products = [p for p in products if p.id in held_ids]
+        if not products:
+            return redirect('core:products_landing')
 
     # Get working hours configuration for dynamic limit
     try:
-        working_hours = WorkingHours.objects.first()
+        working_hours = WorkingHours.get_cached_working_hours()
         max_selection_limit = working_hours.max_selection_limit if working_hours else 6
     except:
         max_selection_limit = 6
@@ -2637,13 +2620,8 @@ def process_order_view(request):
                 'error': '❌ سفارش در حال پردازش یافت نشد. لطفاً مجدداً تلاش کنید.'
             })
         
-        # Process form data
-        cash_items = []
-        terms_items = []
-        total_cash = 0
-        total_terms = 0
-        
         # Extract product data from form
+        requested = {}
         for key, value in request.POST.items():
             if key.startswith('product_id_'):
                 product_id = key.replace('product_id_', '')
@@ -2658,30 +2636,27 @@ def process_order_view(request):
                 payment_method = request.POST.get(f'payment_method_{product_id}', 'Cash')
                 
                 if quantity > 0:
-                    try:
-                        product = Product.objects.get(id=product_id, status='In-stock')
-                        item_total = product.price * quantity
-                        
-                        if payment_method == 'Cash':
-                            cash_items.append({
-                                'product': product,
-                                'quantity': quantity,
-                                'total': item_total
-                            })
-                            total_cash += item_total
-                        else:  # Terms
-                            terms_items.append({
-                                'product': product,
-                                'quantity': quantity,
-                                'total': item_total
-                            })
-                            total_terms += item_total
-                            
-                    except Product.DoesNotExist:
-                        return JsonResponse({
-                            'success': False,
-                            'error': f'محصول با شماره {product_id} یافت نشد یا موجود نیست.'
-                        })
+                    requested[product_id] = (quantity, payment_method)
+        
+        # 📦 دریافت همه محصولات با یک کوئری
+        try:
+            products = OrderBuilderService.get_in_stock_products(requested)
+        except OrderPlacementError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+        
+        cash_items = []
+        terms_items = []
+        for product_id, (quantity, payment_method) in requested.items():
+            line = OrderBuilderService.build_line(products[int(product_id)], quantity)
+            if payment_method == 'Cash':
+                cash_items.append(line)
+            else:  # Terms
+                terms_items.append(line)
+        total_cash = sum(item['total'] for item in cash_items)
+        total_terms = sum(item['total'] for item in terms_items)
         
         # Check if any items selected
         if not cash_items and not terms_items:
@@ -2691,101 +2666,66 @@ def process_order_view(request):
             })
         
         # Update the processing order based on payment types
-        from django.db import transaction
-        with transaction.atomic():
-            orders_created = []
-            
-            # Handle cash items - update processing order to Pending for payment
-            if cash_items:
-                # Update the processing order for cash payment
-                processing_order.payment_method = 'Cash'
-                processing_order.status = 'Pending'  # Ready for payment
-                processing_order.notes = f'سفارش نقدی - مجموع: {total_cash:,.0f} تومان - آماده برای پرداخت'
-                processing_order.total_amount = total_cash
-                processing_order.calculate_final_amount()
-                processing_order.save()
+        try:
+            with transaction.atomic():
+                orders_created = []
                 
-                # Add cash items to the order
-                for item in cash_items:
-                    OrderItem.objects.create(
-                        order=processing_order,
-                        product=item['product'],
-                        quantity=item['quantity'],
-                        unit_price=item['product'].price,
-                        total_price=item['total'],
-                        payment_method='Cash'
+                # Handle cash items - update processing order to Pending for payment
+                if cash_items:
+                    processing_order.status = 'Pending'  # Ready for payment
+                    processing_order.notes = f'سفارش نقدی - مجموع: {total_cash:,.0f} تومان - آماده برای پرداخت'
+                    OrderBuilderService.fill_order(processing_order, cash_items, 'Cash', hold_order=processing_order)
+                    orders_created.append(processing_order)
+                    
+                    # Log activity for cash order
+                    ActivityLog.log_activity(
+                        user=request.user,
+                        action='ORDER',
+                        description=f'سفارش نقدی {processing_order.order_number} آماده پرداخت شد - مبلغ: {processing_order.final_amount:,.0f} تومان',
+                        content_object=processing_order,
+                        ip_address=get_client_ip(request),
+                        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                        severity='MEDIUM',
+                        extra_data={
+                            'order_number': processing_order.order_number,
+                            'payment_type': 'cash',
+                            'amount': str(processing_order.final_amount),
+                            'items_count': len(cash_items)
+                        }
                     )
                 
-                # Update product status to sold
-                for item in cash_items:
-                    item['product'].status = 'Sold'
-                    item['product'].save()
-                
-                orders_created.append(processing_order)
-                
-                # Log activity for cash order
-                ActivityLog.log_activity(
-                    user=request.user,
-                    action='ORDER',
-                    description=f'سفارش نقدی {processing_order.order_number} آماده پرداخت شد - مبلغ: {processing_order.final_amount:,.0f} تومان',
-                    content_object=processing_order,
-                    ip_address=get_client_ip(request),
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    severity='MEDIUM',
-                    extra_data={
-                        'order_number': processing_order.order_number,
-                        'payment_type': 'cash',
-                        'amount': str(processing_order.final_amount),
-                        'items_count': len(cash_items)
-                    }
-                )
-            
-            # Handle terms items - create separate order with Pending status
-            if terms_items:
-                terms_order = Order.objects.create(
-                    customer=customer,
-                    payment_method='Terms',
-                    status='Pending',  # Waiting for admin approval
-                    notes=f'سفارش قسطی - مجموع: {total_terms:,.0f} تومان - در انتظار تایید ادمین',
-                    created_by=request.user,
-                    total_amount=total_terms
-                )
-                terms_order.calculate_final_amount()
-                terms_order.save()
-                
-                for item in terms_items:
-                    OrderItem.objects.create(
-                        order=terms_order,
-                        product=item['product'],
-                        quantity=item['quantity'],
-                        unit_price=item['product'].price,
-                        total_price=item['total'],
-                        payment_method='Terms'
+                # Handle terms items - create separate order with Pending status
+                if terms_items:
+                    terms_order = Order(
+                        customer=customer,
+                        status='Pending',  # Waiting for admin approval
+                        notes=f'سفارش قسطی - مجموع: {total_terms:,.0f} تومان - در انتظار تایید ادمین',
+                        created_by=request.user,
                     )
-                
-                # Update product status to sold
-                for item in terms_items:
-                    item['product'].status = 'Sold'
-                    item['product'].save()
-                
-                orders_created.append(terms_order)
-                
-                # Log activity for terms order
-                ActivityLog.log_activity(
-                    user=request.user,
-                    action='ORDER',
-                    description=f'سفارش قسطی {terms_order.order_number} ایجاد شد - مبلغ: {terms_order.final_amount:,.0f} تومان - در انتظار تایید',
-                    content_object=terms_order,
-                    ip_address=get_client_ip(request),
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    severity='MEDIUM',
-                    extra_data={
-                        'order_number': terms_order.order_number,
-                        'payment_type': 'terms',
-                        'amount': str(terms_order.final_amount),
-                        'items_count': len(terms_items)
-                    }
-                )
+                    OrderBuilderService.fill_order(terms_order, terms_items, 'Terms', hold_order=processing_order)
+                    orders_created.append(terms_order)
+                    
+                    # Log activity for terms order
+                    ActivityLog.log_activity(
+                        user=request.user,
+                        action='ORDER',
+                        description=f'سفارش قسطی {terms_order.order_number} ایجاد شد - مبلغ: {terms_order.final_amount:,.0f} تومان - در انتظار تایید',
+                        content_object=terms_order,
+                        ip_address=get_client_ip(request),
+                        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                        severity='MEDIUM',
+                        extra_data={
+                            'order_number': terms_order.order_number,
+                            'payment_type': 'terms',
+                            'amount': str(terms_order.final_amount),
+                            'items_count': len(terms_items)
+                        }
+                    )
+        except OrderPlacementError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
         
         # Clear selected products and processing order from session
         if 'selected_products' in request.session:
@@ -2850,7 +2790,7 @@ def customer_orders_view(request):
     # Try to find a direct customer link (if exists)
     direct_customer_orders = Order.objects.none()
     customer_obj = None
-    if hasattr(request.user, 'customer') and request.user.customer:
+    if request.user.customer:
         customer_obj = request.user.customer
         direct_customer_orders = orders.filter(customer=customer_obj)
         print(f"[DEBUG] Found direct customer: id={customer_obj.id}, name={customer_obj.customer_name}, phone={customer_obj.phone}")
@@ -3060,7 +3000,8 @@ def get_working_hours_config_api(request):
     """
     
     try:
-        current_hours = WorkingHours.get_current_working_hours()
+        shop_hours = get_shop_hours_cache()
+        current_hours = shop_hours.get_working_hours()
         
         if not current_hours:
             return JsonResponse({
@@ -3071,7 +3012,7 @@ def get_working_hours_config_api(request):
         config = {
             'success': True,
             'max_selection_limit': current_hours.max_selection_limit,
-            'is_shop_open': WorkingHours.is_shop_open(),
+            'is_shop_open': shop_hours.is_open(),
             'is_thursday_open': current_hours.is_thursday_open,
             'is_holiday': current_hours.is_holiday,
             'holiday_help_text': current_hours.holiday_help_text,
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import SyncConfig, SyncLog, ProductMapping, FieldMapping
+from .models import SyncConfig, SyncLog, ProductMapping, FieldMapping, SyncJob
+from .services import SyncJobService
 
 
 @admin.register(SyncConfig)
@@ -10,14 +11,14 @@ class SyncConfigAdmin(admin.ModelAdmin):
     list_display = ['id', 'is_auto_sync_enabled', 'auto_sync_interval_minutes', 'last_auto_sync', 'created_at']
     list_display_links = ['id']
     list_editable = ['is_auto_sync_enabled', 'auto_sync_interval_minutes']
-    readonly_fields = ['created_at', 'updated_at', 'last_auto_sync']
+    readonly_fields = ['created_at', 'updated_at', 'last_auto_sync', 'last_export_high_water']
     
     fieldsets = (
         ('Auto Sync Settings', {
             'fields': ('is_auto_sync_enabled', 'auto_sync_interval_minutes')
         }),
         ('Timestamps', {
-            'fields': ('last_auto_sync', 'created_at', 'updated_at'),
+            'fields': ('last_auto_sync', 'last_export_high_water', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -39,7 +40,7 @@ class SyncLogAdmin(admin.ModelAdmin):
     readonly_fields = [
         'sync_type', 'operation', 'products_processed', 'products_imported',
         'products_updated', 'products_exported', 'errors', 'executed_by',
-        'executed_at', 'duration_seconds'
+        'executed_at', 'duration_seconds', 'delta_since', 'delta_until'
     ]
     ordering = ['-executed_at']
     
@@ -54,7 +55,7 @@ class SyncLogAdmin(admin.ModelAdmin):
 class ProductMappingAdmin(admin.ModelAdmin):
     list_display = [
         'reel_number', 'external_id', 'django_product_link', 'sync_status', 
-        'last_synced'
+        'exported_status', 'last_synced'
     ]
     list_filter = ['sync_status', 'last_synced']
     search_fields = ['reel_number', 'notes']
@@ -101,3 +102,33 @@ class FieldMappingAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(SyncJob)
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'job_type', 'status', 'progress_done', 'progress_total',
+        'requested_by', 'worker_id', 'created_at', 'finished_at'
+    ]
+    list_filter = ['job_type', 'status', 'created_at']
+    readonly_fields = [
+        'job_type', 'status', 'payload', 'progress_total', 'progress_done',
+        'chunks_completed', 'results', 'error', 'cancel_requested', 'requested_by',
+        'worker_id', 'started_at', 'heartbeat_at', 'finished_at', 'created_at', 'updated_at'
+    ]
+    ordering = ['-created_at']
+    actions = ['cancel_jobs', 'resume_jobs']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(SyncJobService.cancel(job) for job in queryset)
+        self.message_user(request, f'{cancelled} job(s) cancelled or asked to stop.')
+    cancel_jobs.short_description = "Cancel selected jobs"
+    
+    def resume_jobs(self, request, queryset):
+        resumed = sum(SyncJobService.resume(job) for job in queryset)
+        self.message_user(request, f'{resumed} job(s) re-queued.')
+    resume_jobs.short_description = "Resume selected failed/cancelled jobs"
+
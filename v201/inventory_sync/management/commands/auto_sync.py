@@ -1,11 +1,9 @@
 from django.core.management.base import BaseCommand, CommandError
-from django.utils import timezone
-from inventory_sync.services import InventorySyncService
-from inventory_sync.models import SyncConfig
+from inventory_sync.services import InventorySyncService, SyncJobService
 
 
 class Command(BaseCommand):
-    help = 'Run automatic inventory synchronization based on configuration'
+    help = 'Queue an automatic inventory synchronization job when one is due (run by cron)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -33,50 +31,17 @@ class Command(BaseCommand):
                 )
             return
         
-        if options['verbose']:
-            self.stdout.write(
-                self.style.SUCCESS('Starting automatic inventory synchronization...')
-            )
-        
         try:
-            # Perform auto-sync
-            results = sync_service.run_auto_sync()
+            # The run_sync_worker command executes the job
+            job = SyncJobService.enqueue('full_sync', payload={'auto': True})
             
-            if options['verbose']:
-                self._display_results(results)
-            
-            if results.get('errors'):
-                self.stdout.write(
-                    self.style.WARNING(
-                        f'Auto-sync completed with {len(results["errors"])} errors'
-                    )
-                )
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS('Automatic synchronization completed successfully!')
-                )
+            self.stdout.write(
+                self.style.SUCCESS(f'Automatic synchronization job #{job.pk} is {job.status}')
+            )
                 
         except Exception as e:
-            error_msg = f'Automatic synchronization failed: {str(e)}'
+            error_msg = f'Could not queue automatic synchronization: {str(e)}'
             if options['verbose']:
                 raise CommandError(error_msg)
             else:
                 self.stdout.write(self.style.ERROR(error_msg))
-    
-    def _display_results(self, results):
-        """Display synchronization results"""
-        self.stdout.write(f'\nAuto-Sync Results:')
-        self.stdout.write(f'  Products exported: {results.get("exported", 0)}')
-        self.stdout.write(f'  Products available for import: {results.get("importable_count", 0)}')
-        
-        if results.get('errors'):
-            self.stdout.write(
-                self.style.ERROR(f'  Errors: {len(results["errors"])}')
-            )
-            for error in results['errors'][:3]:  # Show first 3 errors
-                self.stdout.write(f'    - {error}')
-            if len(results['errors']) > 3:
-                self.stdout.write(f'    ... and {len(results["errors"]) - 3} more errors')
-        
-        if results.get('duration_seconds'):
-            self.stdout.write(f'  Duration: {results["duration_seconds"]:.2f} seconds') 
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory_sync.services import SyncJobService
+
+
+class Command(BaseCommand):
+    help = 'Run queued inventory sync jobs (imports and full syncs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(self.style.SUCCESS(f'Sync worker {worker_id} started'))
+
+        try:
+            while True:
+                job = SyncJobService.claim_next(worker_id)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                resumed = f' (resuming after chunk {job.chunks_completed})' if job.chunks_completed else ''
+                self.stdout.write(f'Running {job}{resumed}...')
+                job = SyncJobService.run(job)
+
+                style = self.style.SUCCESS if job.status == 'completed' else self.style.WARNING
+                self.stdout.write(style(f'{job}: {job.progress_done}/{job.progress_total}'))
+                if job.error:
+                    self.stdout.write(self.style.ERROR(f'  Error: {job.error}'))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Sync worker stopped'))
@@ -18,6 +18,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Only export sales, skip import',
         )
+        parser.add_argument(
+            '--full-export',
+            action='store_true',
+            help='Re-examine every sold product instead of only changes since the last export',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -37,9 +42,11 @@ class Command(BaseCommand):
             )
             
             # Show what would be imported
-            importable_products = sync_service.get_importable_products()
+            importable_products = list(sync_service.iter_importable_products(include_data=False))
+            reimport_count = sum(1 for p in importable_products if p['action'] == 'reimport')
             self.stdout.write(
-                f'Found {len(importable_products)} products available for import:'
+                f'Found {len(importable_products)} products available for import '
+                f'({len(importable_products) - reimport_count} new, {reimport_count} re-import):'
             )
             for product in importable_products[:10]:  # Show first 10
                 self.stdout.write(f'  - {product["reel_number"]} ({product["external_data"]["grade"]})')
@@ -51,9 +58,8 @@ class Command(BaseCommand):
         try:
             if options['import_only']:
                 self.stdout.write('Performing import-only synchronization...')
-                importable_products = sync_service.get_importable_products()
-                if importable_products:
-                    reel_numbers = [p['reel_number'] for p in importable_products]
+                reel_numbers = [p['reel_number'] for p in sync_service.iter_importable_products(include_data=False)]
+                if reel_numbers:
                     results = sync_service.import_selected_products(reel_numbers)
                     self._display_results(results, 'Import')
                 else:
@@ -63,7 +69,7 @@ class Command(BaseCommand):
             
             elif options['export_only']:
                 self.stdout.write('Performing export-only synchronization...')
-                results = sync_service.sync_sales_to_sqlite()
+                results = sync_service.sync_sales_to_sqlite(full=options['full_export'])
                 self._display_results(results, 'Export')
             
             else:
@@ -85,6 +91,8 @@ class Command(BaseCommand):
         self.stdout.write(f'  Products imported: {results.get("imported", 0)}')
         self.stdout.write(f'  Products updated: {results.get("updated", 0)}')
         self.stdout.write(f'  Products exported: {results.get("exported", 0)}')
+        for batch in results.get('batches', []):
+            self.stdout.write(f'    Batch {batch["batch"]}: {batch["rows_updated"]}/{batch["requested"]} rows updated')
         
         if results.get('errors'):
             self.stdout.write(
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_sync', '0002_alter_fieldmapping_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmapping',
+            name='exported_status',
+            field=models.CharField(blank=True, help_text='Product status last pushed to the external SQLite database', max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='syncconfig',
+            name='last_export_high_water',
+            field=models.DateTimeField(blank=True, help_text='Latest product updated_at covered by a successful sales export', null=True),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='delta_since',
+            field=models.DateTimeField(blank=True, help_text='Start of the change window exported by this run (empty for a full export)', null=True),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='delta_until',
+            field=models.DateTimeField(blank=True, help_text='High-water mark reached by this run', null=True),
+        ),
+    ]
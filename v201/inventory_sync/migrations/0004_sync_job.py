@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_sync', '0003_incremental_export'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='تاریخ و زمان ایجاد رکورد به صورت خودکار ثبت می\u200cشود', verbose_name='📅 تاریخ ایجاد')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='تاریخ و زمان آخرین به\u200cروزرسانی رکورد به صورت خودکار ثبت می\u200cشود', verbose_name='🔄 تاریخ به\u200cروزرسانی')),
+                ('job_type', models.CharField(choices=[('import', 'Product Import'), ('full_sync', 'Full Sync')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Job arguments (e.g. selected reel numbers)')),
+                ('progress_total', models.IntegerField(default=0)),
+                ('progress_done', models.IntegerField(default=0)),
+                ('chunks_completed', models.IntegerField(default=0, help_text='Chunks finished so far; a resumed job starts after them')),
+                ('results', models.JSONField(blank=True, default=dict, help_text='Accumulated counters and errors')),
+                ('error', models.TextField(blank=True, null=True)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('worker_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, help_text='User who queued the job (empty for scheduled jobs)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sync Job',
+                'verbose_name_plural': 'Sync Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='inventory_s_status_635bc1_idx')],
+            },
+        ),
+    ]
@@ -23,6 +23,11 @@ class SyncConfig(BaseModel):
         default=True,
         help_text="Whether automatic synchronization is enabled"
     )
+    last_export_high_water = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Latest product updated_at covered by a successful sales export"
+    )
 
     class Meta:
         verbose_name = "Sync Configuration"
@@ -59,6 +64,16 @@ class SyncLog(BaseModel):
     )
     executed_at = models.DateTimeField(auto_now_add=True)
     duration_seconds = models.FloatField(default=0.0)
+    delta_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Start of the change window exported by this run (empty for a full export)"
+    )
+    delta_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="High-water mark reached by this run"
+    )
 
     class Meta:
         ordering = ['-executed_at']
@@ -91,6 +106,12 @@ class ProductMapping(BaseModel):
         ],
         default='imported'
     )
+    exported_status = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        help_text="Product status last pushed to the external SQLite database"
+    )
     notes = models.TextField(blank=True, null=True)
 
     class Meta:
@@ -131,3 +152,81 @@ class FieldMapping(BaseModel):
 
     def __str__(self):
         return f"{self.external_field} → {self.django_field}"
+
+
+class SyncJob(BaseModel):
+    """
+    Queued inventory sync job, executed by the run_sync_worker command
+
+    Progress is written after every chunk so the UI can poll it, and
+    chunks_completed lets an interrupted or cancelled job resume where it
+    stopped.
+    """
+    JOB_TYPES = [
+        ('import', 'Product Import'),
+        ('full_sync', 'Full Sync'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    ACTIVE_STATUSES = ['queued', 'running']
+
+    job_type = models.CharField(max_length=20, choices=JOB_TYPES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict, blank=True, help_text="Job arguments (e.g. selected reel numbers)")
+    progress_total = models.IntegerField(default=0)
+    progress_done = models.IntegerField(default=0)
+    chunks_completed = models.IntegerField(default=0, help_text="Chunks finished so far; a resumed job starts after them")
+    results = models.JSONField(default=dict, blank=True, help_text="Accumulated counters and errors")
+    error = models.TextField(blank=True, null=True)
+    cancel_requested = models.BooleanField(default=False)
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='sync_jobs',
+        help_text="User who queued the job (empty for scheduled jobs)"
+    )
+    worker_id = models.CharField(max_length=100, blank=True, null=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        verbose_name = "Sync Job"
+        verbose_name_plural = "Sync Jobs"
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} #{self.pk} ({self.status})"
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return 100 if self.status == 'completed' else 0
+        return round(100 * self.progress_done / self.progress_total)
+
+    def to_dict(self):
+        """Status payload polled by the UI"""
+        return {
+            'id': self.pk,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress_total': self.progress_total,
+            'progress_done': self.progress_done,
+            'progress_percent': self.progress_percent,
+            'cancel_requested': self.cancel_requested,
+            'results': self.results,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -1,20 +1,30 @@
 import sqlite3
 import os
 import json
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
-from .models import SyncConfig, SyncLog, ProductMapping, FieldMapping
+from core.catalogue_cache import schedule_catalogue_bump
+from .models import SyncConfig, SyncLog, ProductMapping, FieldMapping, SyncJob
 
 
 class SQLiteInventoryService:
     """
     Service for handling SQLite inventory database operations
+
+    A connection can be held open for a whole operation with ``session()``;
+    every method reuses that connection instead of opening and closing one
+    per call. Bulk reads and status updates work in ``IN (...)`` chunks.
     """
-    
+
+    # Stay well under SQLite's host-parameter limit (999 on older builds)
+    CHUNK_SIZE = 500
+
     def __init__(self, db_path: str = None):
         """
         Initialize with SQLite database path
@@ -27,12 +37,16 @@ class SQLiteInventoryService:
             )
         self.db_path = db_path
         self.connection = None
+        self.chunk_size = getattr(settings, 'INVENTORY_SQLITE_CHUNK_SIZE', self.CHUNK_SIZE)
+        self._session_depth = 0
     
     def connect(self):
         """Establish connection to SQLite database"""
+        if self.connection is not None:
+            return True
+
         try:
             # Check if database file exists
-            import os
             if not os.path.exists(self.db_path):
                 print(f"SQLite database file not found: {self.db_path}")
                 return False
@@ -42,26 +56,72 @@ class SQLiteInventoryService:
                 print(f"SQLite database file not readable: {self.db_path}")
                 return False
             
-            self.connection = sqlite3.connect(self.db_path)
+            self.connection = sqlite3.connect(self.db_path, timeout=30)
             self.connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+            self._configure_connection()
             return True
         except Exception as e:
             print(f"Error connecting to SQLite database: {e}")
             return False
+
+    def _configure_connection(self):
+        """Use WAL so readers of the inventory app are not blocked by our writes"""
+        try:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.DatabaseError as e:
+            # Read-only copies cannot switch journal mode; reads still work
+            print(f"Could not enable WAL on SQLite database: {e}")
+        self.connection.execute("PRAGMA busy_timeout=30000")
     
     def disconnect(self):
-        """Close SQLite connection"""
+        """Close SQLite connection (kept open while a session is active)"""
+        if self._session_depth:
+            return
         if self.connection:
             self.connection.close()
             self.connection = None
+
+    @contextmanager
+    def session(self):
+        """
+        Keep one connection open for the duration of the block
+
+        Usage:
+            with sqlite_service.session():
+                products = sqlite_service.get_products_by_reel_numbers(reels)
+                sqlite_service.update_product_statuses(updates)
+
+        Sessions nest; the connection is closed when the outermost one exits.
+        Raises ConnectionError if the database cannot be opened.
+        """
+        if not self.connect():
+            raise ConnectionError(f"Failed to connect to SQLite database: {self.db_path}")
+
+        self._session_depth += 1
+        try:
+            yield self.connection
+        finally:
+            self._session_depth -= 1
+            self.disconnect()
+
+    def _chunks(self, items: List) -> List[List]:
+        """Split items into chunks of at most chunk_size"""
+        return [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
     
     def get_available_products(self, status_filter: str = 'In-stock') -> List[Dict]:
         """
         Get all available products from SQLite database
         Only returns products with specified status (default: In-stock)
         """
+        return list(self.iter_available_products(status_filter))
+
+    def iter_available_products(self, status_filter: str = 'In-stock') -> Iterator[Dict]:
+        """
+        Stream products with the given status, fetching chunk_size rows at a time
+        """
         if not self.connect():
-            return []
+            return
         
         try:
             cursor = self.connection.cursor()
@@ -71,28 +131,44 @@ class SQLiteInventoryService:
                 ORDER BY date DESC
             """
             cursor.execute(query, (status_filter,))
-            products = [dict(row) for row in cursor.fetchall()]
-            return products
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
         except Exception as e:
             print(f"Error fetching products from SQLite: {e}")
-            return []
         finally:
             self.disconnect()
     
     def get_product_by_reel_number(self, reel_number: str) -> Optional[Dict]:
         """Get a specific product by reel number"""
-        if not self.connect():
-            return None
-        
+        return self.get_products_by_reel_numbers([reel_number]).get(reel_number)
+
+    def get_products_by_reel_numbers(self, reel_numbers: List[str]) -> Dict[str, Dict]:
+        """
+        Get many products by reel number, keyed by reel number
+
+        Reads in ``reel_number IN (...)`` chunks over a single connection.
+        Reel numbers missing from SQLite are simply absent from the result.
+        """
+        reel_numbers = list(dict.fromkeys(r for r in reel_numbers if r))
+        if not reel_numbers or not self.connect():
+            return {}
+
+        products = {}
         try:
             cursor = self.connection.cursor()
-            query = "SELECT * FROM Products WHERE reel_number = ?"
-            cursor.execute(query, (reel_number,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+            for chunk in self._chunks(reel_numbers):
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"SELECT * FROM Products WHERE reel_number IN ({placeholders})", chunk)
+                for row in cursor.fetchall():
+                    products.setdefault(row['reel_number'], dict(row))
+            return products
         except Exception as e:
-            print(f"Error fetching product by reel number: {e}")
-            return None
+            print(f"Error fetching products by reel number: {e}")
+            return products
         finally:
             self.disconnect()
     
@@ -101,45 +177,66 @@ class SQLiteInventoryService:
         Update product status in SQLite database
         Used for syncing sales/cancellations back to SQLite
         """
+        result = self.update_product_statuses([(reel_number, new_status)])
+        return reel_number in result['updated']
+
+    def update_product_statuses(self, updates: List[Tuple[str, str]]) -> Dict:
+        """
+        Update the status of many products in one transaction
+
+        ``updates`` is a list of ``(reel_number, new_status)`` pairs.
+        Each chunk looks up which reels exist, then runs one ``executemany``
+        UPDATE. Returns the updated and missing reel numbers plus a row count
+        per batch; on error the whole transaction is rolled back.
+        """
+        result = {
+            'updated': [],
+            'missing': [],
+            'batches': [],
+            'error': None,
+        }
+        updates = list(dict(updates).items())
+        if not updates:
+            return result
+
         if not self.connect():
-            print(f"Failed to connect to SQLite database for product {reel_number}")
-            return False
-        
+            result['error'] = f"Failed to connect to SQLite database: {self.db_path}"
+            print(result['error'])
+            return result
+
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         try:
-            cursor = self.connection.cursor()
-            
-            # First check if product exists
-            check_query = "SELECT COUNT(*) FROM Products WHERE reel_number = ?"
-            cursor.execute(check_query, (reel_number,))
-            product_exists = cursor.fetchone()[0] > 0
-            
-            if not product_exists:
-                print(f"Product {reel_number} not found in SQLite database")
-                return False
-            
-            # Update the product status
-            update_query = """
-                UPDATE Products 
-                SET status = ?, last_date = ? 
-                WHERE reel_number = ?
-            """
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute(update_query, (new_status, current_time, reel_number))
-            self.connection.commit()
-            
-            rows_updated = cursor.rowcount
-            if rows_updated > 0:
-                print(f"Successfully updated product {reel_number} status to {new_status}")
-                return True
-            else:
-                print(f"No rows updated for product {reel_number}")
-                return False
-                
+            with self.connection:
+                cursor = self.connection.cursor()
+                for batch_number, chunk in enumerate(self._chunks(updates), start=1):
+                    reels = [reel_number for reel_number, _ in chunk]
+                    placeholders = ','.join('?' * len(reels))
+                    cursor.execute(f"SELECT reel_number FROM Products WHERE reel_number IN ({placeholders})", reels)
+                    existing = {row[0] for row in cursor.fetchall()}
+
+                    rows = [(status, current_time, reel) for reel, status in chunk if reel in existing]
+                    cursor.executemany(
+                        "UPDATE Products SET status = ?, last_date = ? WHERE reel_number = ?",
+                        rows
+                    )
+                    rows_updated = cursor.rowcount if rows else 0
+
+                    result['updated'].extend(reel for reel in reels if reel in existing)
+                    result['missing'].extend(reel for reel in reels if reel not in existing)
+                    result['batches'].append({
+                        'batch': batch_number,
+                        'requested': len(chunk),
+                        'rows_updated': rows_updated,
+                    })
         except Exception as e:
-            print(f"Error updating product {reel_number} status in SQLite: {e}")
-            return False
+            result['error'] = f"Error updating product statuses in SQLite: {e}"
+            result['updated'] = []
+            result['missing'] = []
+            print(result['error'])
         finally:
             self.disconnect()
+
+        return result
     
     def test_connection(self) -> Dict:
         """
@@ -153,7 +250,6 @@ class SQLiteInventoryService:
         
         try:
             # Test file existence
-            import os
             if not os.path.exists(self.db_path):
                 result['message'] = f"Database file not found: {self.db_path}"
                 return result
@@ -202,9 +298,27 @@ class InventorySyncService:
     Main service for handling inventory synchronization
     """
     
+    # Statuses that are pushed back to the external inventory
+    EXPORT_STATUSES = ['Sold', 'Delivered']
+
     def __init__(self):
         self.sqlite_service = SQLiteInventoryService()
         self.field_mappings = self._load_field_mappings()
+
+    @contextmanager
+    def sqlite_session(self):
+        """
+        Hold one SQLite connection for a multi-step operation
+
+        If the database cannot be opened the block still runs; each step then
+        reports the connection error in its own results, as it does outside a
+        session.
+        """
+        if not self.sqlite_service.connect():
+            yield
+            return
+        with self.sqlite_service.session():
+            yield
     
     def _load_field_mappings(self) -> Dict[str, str]:
         """Load field mappings from database"""
@@ -256,57 +370,71 @@ class InventorySyncService:
         
         return mappings
     
+    # Default values for required fields
+    MAPPING_DEFAULTS = {
+        'width': 0,
+        'gsm': 0,
+        'length': 0,
+        'breaks': 0,
+        'grade': 'Unknown',
+        'location': 'Anbar_Akhal',
+        'status': 'In-stock',
+    }
+    NUMERIC_FIELDS = {'width', 'gsm', 'length', 'breaks'}
+
+    def _get_mapping_plan(self) -> Tuple[List[Tuple[str, str]], Dict]:
+        """
+        Resolve the field mappings against the Product model once per service
+
+        Returns the (external_field, django_field) pairs that exist on Product
+        and the defaults that apply to them.
+        """
+        if getattr(self, '_mapping_plan', None) is None:
+            # Get Django Product model fields to filter out non-existent fields
+            try:
+                from core.models import Product
+                django_fields = {field.name for field in Product._meta.get_fields()}
+            except Exception as e:
+                django_fields = {'reel_number', 'width', 'gsm', 'length', 'grade', 'breaks', 'qr_code', 'location', 'status', 'price'}
+
+            pairs = [
+                (external_field, django_field)
+                for external_field, django_field in self.field_mappings.items()
+                if django_field in django_fields
+            ]
+            defaults = {
+                field: value for field, value in self.MAPPING_DEFAULTS.items()
+                if field in django_fields
+            }
+            self._mapping_plan = (pairs, defaults)
+        return self._mapping_plan
+
     def _map_external_to_django(self, external_data: Dict) -> Dict:
         """Map external SQLite data to Django model fields"""
+        pairs, defaults = self._get_mapping_plan()
         django_data = {}
         
-        # Default values for required fields
-        defaults = {
-            'width': 0,
-            'gsm': 0,
-            'length': 0,
-            'breaks': 0,
-            'grade': 'Unknown',
-            'location': 'Anbar_Akhal',
-            'status': 'In-stock',
-        }
-        
-        # Get Django Product model fields to filter out non-existent fields
-        try:
-            from core.models import Product
-            django_fields = [field.name for field in Product._meta.get_fields()]
-        except Exception as e:
-            django_fields = ['reel_number', 'width', 'gsm', 'length', 'grade', 'breaks', 'qr_code', 'location', 'status', 'price']
-        
-        for external_field, value in external_data.items():
-            if external_field in self.field_mappings:
-                django_field = self.field_mappings[external_field]
-                
-                # Skip fields that don't exist in Django model
-                if django_field not in django_fields:
-                    continue
-                
-                # Handle NULL values and provide defaults for required fields
-                if value is None or value == '':
-                    if django_field in defaults:
-                        django_data[django_field] = defaults[django_field]
-                    else:
-                        # Skip NULL values for optional fields
-                        continue
-                else:
-                    # Convert numeric fields to proper types
-                    if django_field in ['width', 'gsm', 'length', 'breaks']:
-                        try:
-                            django_data[django_field] = int(float(value))
-                        except (ValueError, TypeError):
-                            django_data[django_field] = defaults[django_field]
-                    else:
-                        django_data[django_field] = value
+        for external_field, django_field in pairs:
+            if external_field not in external_data:
+                continue
+            value = external_data[external_field]
+            
+            # Handle NULL values and provide defaults for required fields
+            if value is None or value == '':
+                if django_field in defaults:
+                    django_data[django_field] = defaults[django_field]
+            # Convert numeric fields to proper types
+            elif django_field in self.NUMERIC_FIELDS:
+                try:
+                    django_data[django_field] = int(float(value))
+                except (ValueError, TypeError):
+                    django_data[django_field] = self.MAPPING_DEFAULTS[django_field]
+            else:
+                django_data[django_field] = value
         
         # Ensure all required fields have values
         for field, default_value in defaults.items():
-            if field not in django_data and field in django_fields:
-                django_data[field] = default_value
+            django_data.setdefault(field, default_value)
         
         return django_data
     
@@ -324,52 +452,82 @@ class InventorySyncService:
         
         return True
     
-    def get_importable_products(self) -> List[Dict]:
+    # Existing Django products in these statuses may be imported again
+    REIMPORT_STATUSES = ('Sold', 'Delivered')
+
+    def _get_existing_statuses(self) -> Dict[str, str]:
         """
-        Get list of products that can be imported from SQLite
+        Status of every Django product keyed by reel number, in one query
+
+        When a reel number appears more than once the newest product wins,
+        matching the default Product ordering.
+        """
+        from core.models import Product
+
+        return dict(
+            Product.objects.exclude(reel_number__isnull=True)
+            .order_by('created_at', 'id')
+            .values_list('reel_number', 'status')
+        )
+
+    def iter_importable_products(self, include_data: bool = True) -> Iterator[Dict]:
+        """
+        Stream the products that can be imported from SQLite
+
+        Existing Django statuses are loaded once and every SQLite row is
+        classified with dict lookups: ``new`` (unknown reel), ``reimport``
+        (existing reel that was sold/delivered) or skipped (still in stock).
+        ``include_data=False`` skips field mapping when only counts are needed.
         """
-        external_products = self.sqlite_service.get_available_products('In-stock')
-        importable_products = []
-        
-        # Get all existing reel numbers in Django for efficient filtering
         try:
-            from core.models import Product
-            existing_reel_numbers = set(Product.objects.values_list('reel_number', flat=True))
+            existing_statuses = self._get_existing_statuses()
         except Exception as e:
             print(f"Error getting existing reel numbers: {e}")
-            existing_reel_numbers = set()
-        
-        for product in external_products:
+            existing_statuses = {}
+
+        for product in self.sqlite_service.iter_available_products('In-stock'):
             reel_number = product.get('reel_number')
             if not reel_number:
                 continue
-                
+
             # Skip if product already exists in Django (unless it was sold/delivered)
-            if reel_number in existing_reel_numbers:
-                try:
-                    existing_product = Product.objects.filter(reel_number=reel_number).first()
-                    if existing_product and existing_product.status not in ['Sold', 'Delivered']:
-                        continue  # Skip already imported products that are still in stock
-                except Exception as e:
-                    print(f"Error checking product status: {e}")
-                    continue
-            
+            existing_status = existing_statuses.get(reel_number)
+            if existing_status is not None and existing_status not in self.REIMPORT_STATUSES:
+                continue
+
             # Check other import criteria
-            if self._should_import_product(product):
-                # Add mapped data
-                mapped_data = self._map_external_to_django(product)
-                importable_products.append({
-                    'external_data': product,
-                    'django_data': mapped_data,
-                    'reel_number': reel_number,
-                    'external_id': product.get('id'),
-                })
-        
-        return importable_products
+            if not self._should_import_product(product):
+                continue
+
+            yield {
+                'external_data': product,
+                'django_data': self._map_external_to_django(product) if include_data else None,
+                'reel_number': reel_number,
+                'external_id': product.get('id'),
+                'action': 'new' if existing_status is None else 'reimport',
+            }
+
+    def get_importable_products(self) -> List[Dict]:
+        """
+        Get list of products that can be imported from SQLite
+        """
+        return list(self.iter_importable_products())
+
+    def count_importable_products(self) -> int:
+        """
+        Number of importable products, without mapping their fields
+        """
+        return sum(1 for _ in self.iter_importable_products(include_data=False))
     
-    def import_selected_products(self, selected_reel_numbers: List[str], user=None) -> Dict:
+    def import_selected_products(self, selected_reel_numbers: List[str], user=None, log: bool = True) -> Dict:
         """
         Import selected products from SQLite to Django database
+
+        Products and their mappings are upserted with bulk_create in chunks of
+        INVENTORY_IMPORT_CHUNK_SIZE. Each chunk runs in its own savepoint; if a
+        chunk fails it is retried reel by reel so only the bad reels are
+        reported in ``results['errors']``. ``log=False`` skips the SyncLog row
+        (used by SyncJobService, which logs the whole job once).
         """
         start_time = timezone.now()
         results = {
@@ -380,157 +538,240 @@ class InventorySyncService:
         }
         
         try:
-            from core.models import Product
-            
+            # Read all selected products from SQLite in chunks over one connection
+            external_products = self.sqlite_service.get_products_by_reel_numbers(selected_reel_numbers)
+
+            rows = []
+            for reel_number in dict.fromkeys(selected_reel_numbers):
+                external_product = external_products.get(reel_number)
+                if not external_product:
+                    results['errors'].append(f"Product {reel_number} not found in SQLite")
+                    continue
+                
+                # Map data
+                django_data = self._map_external_to_django(external_product)
+                
+                # Validate required fields
+                required_fields = ['reel_number', 'width', 'gsm', 'length', 'grade']
+                missing_fields = [field for field in required_fields if not django_data.get(field)]
+                
+                if missing_fields:
+                    results['errors'].append(f"Product {reel_number} missing required fields: {', '.join(missing_fields)}")
+                    continue
+
+                rows.append((reel_number, external_product, django_data))
+
+            chunk_size = getattr(settings, 'INVENTORY_IMPORT_CHUNK_SIZE', 500)
             with transaction.atomic():
-                for reel_number in selected_reel_numbers:
+                for offset in range(0, len(rows), chunk_size):
+                    chunk = rows[offset:offset + chunk_size]
                     try:
-                        # Get product from SQLite
-                        external_product = self.sqlite_service.get_product_by_reel_number(reel_number)
-                        if not external_product:
-                            results['errors'].append(f"Product {reel_number} not found in SQLite")
-                            continue
-                        
-                        # Map data
-                        django_data = self._map_external_to_django(external_product)
-                        
-                        # Validate required fields
-                        required_fields = ['reel_number', 'width', 'gsm', 'length', 'grade']
-                        missing_fields = [field for field in required_fields if not django_data.get(field)]
-                        
-                        if missing_fields:
-                            results['errors'].append(f"Product {reel_number} missing required fields: {', '.join(missing_fields)}")
-                            continue
-                        
-                        # Check if product exists
-                        existing_product = Product.objects.filter(reel_number=reel_number).first()
-                        
-                        if existing_product:
-                            # Update existing product
-                            for field, value in django_data.items():
-                                if hasattr(existing_product, field):
-                                    setattr(existing_product, field, value)
-                            existing_product.save()
-                            results['updated'] += 1
-                        else:
-                            # Create new product
+                        with transaction.atomic():
+                            counts = self._upsert_import_chunk(chunk)
+                    except Exception as chunk_error:
+                        print(f"Import chunk failed, retrying reel by reel: {chunk_error}")
+                        counts = {'imported': 0, 'updated': 0}
+                        for row in chunk:
                             try:
-                                new_product = Product.objects.create(**django_data)
-                                results['imported'] += 1
-                            except Exception as create_error:
-                                results['errors'].append(f"Error creating product {reel_number}: {str(create_error)}")
+                                with transaction.atomic():
+                                    row_counts = self._upsert_import_chunk([row])
+                            except Exception as e:
+                                error_msg = f"Error importing product {row[0]}: {str(e)}"
+                                results['errors'].append(error_msg)
+                                print(error_msg)
                                 continue
-                        
-                        # Create or update mapping
-                        try:
-                            mapping, created = ProductMapping.objects.get_or_create(
-                                reel_number=reel_number,
-                                defaults={
-                                    'external_id': external_product.get('id'),
-                                    'django_product_id': existing_product.id if existing_product else new_product.id,
-                                    'sync_status': 'imported'
-                                }
-                            )
-                            if not created:
-                                mapping.django_product_id = existing_product.id if existing_product else new_product.id
-                                mapping.sync_status = 'updated'
-                                mapping.save()
-                        except Exception as mapping_error:
-                            results['errors'].append(f"Error creating mapping for product {reel_number}: {str(mapping_error)}")
-                            continue
-                    
-                    except Exception as e:
-                        error_msg = f"Error importing product {reel_number}: {str(e)}"
-                        results['errors'].append(error_msg)
-                        print(error_msg)
+                            counts['imported'] += row_counts['imported']
+                            counts['updated'] += row_counts['updated']
+
+                    results['imported'] += counts['imported']
+                    results['updated'] += counts['updated']
+
+            if results['imported'] or results['updated']:
+                # bulk_create does not send post_save - invalidate the storefront explicitly
+                schedule_catalogue_bump()
         
         except Exception as e:
             error_msg = f"Transaction error during import: {str(e)}"
             results['errors'].append(error_msg)
             print(error_msg)
         
-        # Log the operation
-        duration = (timezone.now() - start_time).total_seconds()
-        SyncLog.objects.create(
-            sync_type='import',
-            operation=f"Import {len(selected_reel_numbers)} products",
-            products_processed=results['products_processed'],
-            products_imported=results['imported'],
-            products_updated=results['updated'],
-            errors='\n'.join(results['errors']) if results['errors'] else None,
-            executed_by=user,
-            duration_seconds=duration
-        )
+        if log:
+            # Log the operation
+            duration = (timezone.now() - start_time).total_seconds()
+            SyncLog.objects.create(
+                sync_type='import',
+                operation=f"Import {len(selected_reel_numbers)} products",
+                products_processed=results['products_processed'],
+                products_imported=results['imported'],
+                products_updated=results['updated'],
+                errors='\n'.join(results['errors']) if results['errors'] else None,
+                executed_by=user,
+                duration_seconds=duration
+            )
         
         return results
     
-    def sync_sales_to_sqlite(self, user=None) -> Dict:
+    @staticmethod
+    def _upsert(model, objs: List, update_fields: List[str]):
+        """bulk_create with ON CONFLICT (reel_number) DO UPDATE for the current backend"""
+        unique_fields = ['reel_number'] if connection.features.supports_update_conflicts_with_target else None
+        model.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+
+    def _upsert_import_chunk(self, rows: List[Tuple[str, Dict, Dict]]) -> Dict:
+        """
+        Upsert one chunk of (reel_number, external_product, django_data) rows
+
+        Rows are grouped by the set of mapped fields so an update never resets
+        a field that SQLite left empty, exactly like the old setattr loop.
+        """
+        from core.models import Product
+
+        reel_numbers = [reel_number for reel_number, _, _ in rows]
+        existing_products = set(
+            Product.objects.filter(reel_number__in=reel_numbers).values_list('reel_number', flat=True)
+        )
+        existing_mappings = set(
+            ProductMapping.objects.filter(reel_number__in=reel_numbers).values_list('reel_number', flat=True)
+        )
+
+        groups = {}
+        for reel_number, _, django_data in rows:
+            groups.setdefault(tuple(sorted(django_data)), []).append(Product(**django_data))
+        for fields, products in groups.items():
+            update_fields = sorted((set(fields) - {'reel_number', 'created_at'}) | {'updated_at'})
+            self._upsert(Product, products, update_fields)
+
+        product_ids = dict(
+            Product.objects.filter(reel_number__in=reel_numbers).values_list('reel_number', 'id')
+        )
+        self._upsert(ProductMapping, [
+            ProductMapping(
+                reel_number=reel_number,
+                external_id=external_product.get('id') or 0,
+                django_product_id=product_ids.get(reel_number),
+                sync_status='updated' if reel_number in existing_mappings else 'imported',
+            )
+            for reel_number, external_product, _ in rows
+        ], ['django_product_id', 'sync_status', 'last_synced', 'updated_at'])
+
+        return {
+            'imported': len(rows) - len(existing_products),
+            'updated': len(existing_products),
+        }
+
+    def _get_sync_config(self) -> SyncConfig:
+        """Return the single sync configuration, creating the default one if needed"""
+        config = SyncConfig.objects.first()
+        if not config:
+            config = SyncConfig.objects.create()
+        return config
+
+    def _get_mappings(self, reel_numbers: List[str]) -> Dict[str, ProductMapping]:
+        """Load product mappings for the given reels, keyed by reel number"""
+        mappings = {}
+        for chunk in self.sqlite_service._chunks(list(reel_numbers)):
+            for mapping in ProductMapping.objects.filter(reel_number__in=chunk):
+                mappings[mapping.reel_number] = mapping
+        return mappings
+
+    def get_pending_exports(self, since=None) -> Tuple[List, Dict[str, ProductMapping]]:
+        """
+        Products whose current status still has to be pushed to SQLite
+
+        Only products updated after ``since`` are examined (all of them when
+        ``since`` is None). A product is pending when it is sold/delivered, or
+        was exported before, and its status differs from the status recorded
+        in ``ProductMapping.exported_status``. Returns the pending products and
+        the mappings loaded for them.
+        """
+        from core.models import Product
+
+        exported_reels = ProductMapping.objects.filter(exported_status__isnull=False).values('reel_number')
+        changed = Product.objects.filter(
+            Q(status__in=self.EXPORT_STATUSES) | Q(reel_number__in=exported_reels),
+            reel_number__isnull=False,
+        ).exclude(reel_number='').only('id', 'reel_number', 'status', 'updated_at')
+        if since is not None:
+            changed = changed.filter(updated_at__gt=since)
+
+        changed = list(changed)
+        mappings = self._get_mappings(product.reel_number for product in changed)
+        return [
+            product for product in changed
+            if product.reel_number not in mappings
+            or mappings[product.reel_number].exported_status != product.status
+        ], mappings
+
+    def sync_sales_to_sqlite(self, user=None, full: bool = False) -> Dict:
         """
         Sync sales/cancellations from Django back to SQLite
+
+        Only reels whose status changed since the last successful export are
+        pushed. The high-water mark lives on ``SyncConfig.last_export_high_water``
+        and is re-read with a small overlap so rows committed late are not
+        missed; ``ProductMapping.exported_status`` keeps such overlaps from being
+        pushed twice. ``full=True`` re-examines every product.
         """
         start_time = timezone.now()
         results = {
             'exported': 0,
             'errors': [],
-            'products_processed': 0
+            'products_processed': 0,
+            'skipped': 0,
+            'batches': [],
+            'since': None,
+            'high_water': None,
         }
         
         try:
-            from core.models import Product
-            
-            # Get products that have been sold/delivered since last sync
-            sold_products = Product.objects.filter(
-                status__in=['Sold', 'Delivered'],
-                reel_number__isnull=False
-            ).exclude(reel_number='')
-            
-            results['products_processed'] = sold_products.count()
+            config = self._get_sync_config()
+            since = None if full else config.last_export_high_water
+            if since is not None:
+                since -= timedelta(seconds=getattr(settings, 'INVENTORY_SYNC_OVERLAP_SECONDS', 300))
+            results['since'] = since
+
+            # Everything updated before this moment is covered by this run
+            high_water = timezone.now()
+            pending, mappings = self.get_pending_exports(since)
+            products_by_reel = {product.reel_number: product for product in pending}
+            results['products_processed'] = len(products_by_reel)
             
             if results['products_processed'] == 0:
-                print("No sold products found to sync")
-                return results
-            
-            print(f"Found {results['products_processed']} sold products to sync")
-            
-            for product in sold_products:
-                try:
-                    print(f"Attempting to sync product {product.reel_number} with status {product.status}")
-                    
-                    # Update status in SQLite
-                    success = self.sqlite_service.update_product_status(
-                        product.reel_number, 
-                        product.status
-                    )
-                    
-                    if success:
-                        results['exported'] += 1
-                        print(f"Successfully synced product {product.reel_number}")
-                        
-                        # Update mapping
-                        try:
-                            mapping, created = ProductMapping.objects.get_or_create(
-                                reel_number=product.reel_number,
-                                defaults={
-                                    'external_id': 0,  # Will be updated when we know the external ID
-                                    'django_product_id': product.id,
-                                    'sync_status': 'exported'
-                                }
-                            )
-                            if not created:
-                                mapping.sync_status = 'exported'
-                                mapping.save()
-                        except Exception as mapping_error:
-                            print(f"Error updating mapping for {product.reel_number}: {mapping_error}")
-                            # Don't add to errors as the main sync was successful
-                    else:
-                        error_msg = f"Failed to update {product.reel_number} in SQLite - product may not exist in SQLite database"
-                        results['errors'].append(error_msg)
-                        print(error_msg)
-                
-                except Exception as e:
-                    error_msg = f"Error syncing product {product.reel_number}: {str(e)}"
+                print("No changed products found to sync")
+            else:
+                print(f"Found {results['products_processed']} changed products to sync")
+
+                # Update every status in SQLite in one transaction
+                update_result = self.sqlite_service.update_product_statuses(
+                    [(reel_number, product.status) for reel_number, product in products_by_reel.items()]
+                )
+                results['batches'] = update_result['batches']
+
+                if update_result['error']:
+                    results['errors'].append(update_result['error'])
+
+                for reel_number in update_result['missing']:
+                    error_msg = f"Failed to update {reel_number} in SQLite - product may not exist in SQLite database"
                     results['errors'].append(error_msg)
                     print(error_msg)
+
+                results['exported'] = len(update_result['updated'])
+                self._record_exports(products_by_reel, mappings, update_result)
+                print(f"Synced {results['exported']} of {results['products_processed']} changed products to SQLite")
+
+                if update_result['error']:
+                    # Keep the old mark so the next run retries this window
+                    high_water = None
+
+            if high_water is not None:
+                config.last_export_high_water = high_water
+                config.save(update_fields=['last_export_high_water', 'updated_at'])
+                results['high_water'] = high_water
         
         except Exception as e:
             error_msg = f"Error during sales sync: {str(e)}"
@@ -542,30 +783,83 @@ class InventorySyncService:
         try:
             SyncLog.objects.create(
                 sync_type='export',
-                operation=f"Export {results['exported']} sales to SQLite",
+                operation=f"Export {results['exported']} changed sales to SQLite",
                 products_processed=results['products_processed'],
                 products_exported=results['exported'],
                 errors='\n'.join(results['errors']) if results['errors'] else None,
                 executed_by=user,
-                duration_seconds=duration
+                duration_seconds=duration,
+                delta_since=results['since'],
+                delta_until=results['high_water'],
             )
         except Exception as log_error:
             print(f"Error creating sync log: {log_error}")
         
         return results
+
+    def _record_exports(self, products_by_reel: Dict, mappings: Dict[str, ProductMapping], update_result: Dict):
+        """Record pushed statuses on ProductMapping with bulk writes"""
+        now = timezone.now()
+        to_update = []
+        to_create = []
+
+        for reel_number in update_result['updated']:
+            product = products_by_reel[reel_number]
+            mapping = mappings.get(reel_number)
+            if mapping is None:
+                to_create.append(ProductMapping(
+                    reel_number=reel_number,
+                    external_id=0,  # Will be updated when we know the external ID
+                    django_product_id=product.id,
+                    sync_status='exported',
+                    exported_status=product.status,
+                ))
+                continue
+            mapping.django_product_id = product.id
+            mapping.sync_status = 'exported'
+            mapping.exported_status = product.status
+            mapping.last_synced = now
+            to_update.append(mapping)
+
+        for reel_number in update_result['missing']:
+            mapping = mappings.get(reel_number)
+            if mapping is not None:
+                mapping.sync_status = 'error'
+                mapping.notes = 'Not found in SQLite database during sales export'
+                mapping.last_synced = now
+                to_update.append(mapping)
+
+        try:
+            ProductMapping.objects.bulk_create(to_create, batch_size=500)
+            ProductMapping.objects.bulk_update(
+                to_update,
+                ['django_product_id', 'sync_status', 'exported_status', 'notes', 'last_synced'],
+                batch_size=500,
+            )
+        except Exception as mapping_error:
+            # Don't add to errors as the main sync was successful
+            print(f"Error updating product mappings: {mapping_error}")
     
-    def perform_full_sync(self, user=None) -> Dict:
+    def perform_full_sync(self, user=None, sync_type: str = 'manual') -> Dict:
         """
         Perform full synchronization (import + export)
         """
         start_time = timezone.now()
         
-        # First sync sales to SQLite
-        export_results = self.sync_sales_to_sqlite(user)
-        
-        # Then get importable products (this will exclude newly sold ones)
-        importable_products = self.get_importable_products()
+        with self.sqlite_session():
+            # First sync sales to SQLite
+            export_results = self.sync_sales_to_sqlite(user)
+            
+            # Then get importable products (this will exclude newly sold ones)
+            importable_count = self.count_importable_products()
         
+        return self.summarize_full_sync(export_results, importable_count, start_time, user, sync_type)
+
+    def summarize_full_sync(self, export_results: Dict, importable_count: int, start_time,
+                            user=None, sync_type: str = 'manual') -> Dict:
+        """
+        Build the full-sync result from the export step and log it
+        """
         # Determine if sync was successful
         sync_successful = export_results['exported'] > 0 or export_results['products_processed'] == 0
         
@@ -581,7 +875,7 @@ class InventorySyncService:
         
         results = {
             'exported': export_results['exported'],
-            'importable_count': len(importable_products),
+            'importable_count': importable_count,
             'errors': critical_errors,  # Only include critical errors
             'warnings': non_critical_errors,  # Non-critical issues as warnings
             'sync_successful': sync_successful,
@@ -591,7 +885,7 @@ class InventorySyncService:
         # Log the operation
         try:
             SyncLog.objects.create(
-                sync_type='manual',
+                sync_type=sync_type,
                 operation="Full inventory synchronization",
                 products_processed=export_results['products_processed'],
                 products_exported=export_results['exported'],
@@ -609,10 +903,7 @@ class InventorySyncService:
         Check if automatic sync should run based on configuration
         """
         try:
-            config = SyncConfig.objects.first()
-            if not config:
-                # Create default config
-                config = SyncConfig.objects.create()
+            config = self._get_sync_config()
             
             if not config.is_auto_sync_enabled:
                 return False
@@ -633,18 +924,215 @@ class InventorySyncService:
         Run automatic synchronization
         """
         try:
-            config = SyncConfig.objects.first()
-            if not config:
-                config = SyncConfig.objects.create()
+            config = self._get_sync_config()
             
             results = self.perform_full_sync()
             
-            # Update last auto sync time
+            # Update last auto sync time (without overwriting the export high-water mark)
             config.last_auto_sync = timezone.now()
-            config.save()
+            config.save(update_fields=['last_auto_sync', 'updated_at'])
             
             return results
             
         except Exception as e:
             print(f"Error in auto sync: {e}")
-            return {'errors': [str(e)]} 
\ No newline at end of file
+            return {'errors': [str(e)]} 
+
+
+class SyncJobCancelled(Exception):
+    """Raised inside a running job when cancellation was requested"""
+
+
+class SyncJobService:
+    """
+    DB-backed queue for long inventory syncs (no external broker)
+
+    Views and the auto_sync scheduler enqueue jobs; the run_sync_worker
+    command claims them with a compare-and-set UPDATE and runs them chunk by
+    chunk, writing progress to the SyncJob row after every chunk.
+
+    Usage:
+        job = SyncJobService.enqueue('import', user, {'reel_numbers': reels})
+        SyncJobService.cancel(job)
+    """
+
+    @staticmethod
+    def get_stale_seconds() -> int:
+        """Running jobs without a heartbeat for this long are considered abandoned"""
+        return getattr(settings, 'SYNC_JOB_STALE_SECONDS', 600)
+
+    @staticmethod
+    def enqueue(job_type: str, user=None, payload: Optional[Dict] = None) -> SyncJob:
+        """
+        Queue a job; a full sync is not queued twice while one is pending
+        """
+        with transaction.atomic():
+            if job_type == 'full_sync':
+                active = SyncJob.objects.filter(job_type='full_sync', status__in=SyncJob.ACTIVE_STATUSES).first()
+                if active:
+                    return active
+            return SyncJob.objects.create(job_type=job_type, requested_by=user, payload=payload or {})
+
+    @classmethod
+    def claim_next(cls, worker_id: str) -> Optional[SyncJob]:
+        """
+        Claim the oldest queued job, or a running job whose worker stopped heartbeating
+        """
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=cls.get_stale_seconds())
+        candidates = (
+            SyncJob.objects.filter(
+                Q(status='queued') | Q(status='running', heartbeat_at__lt=stale_before)
+            )
+            .order_by('created_at', 'id')
+            .values_list('id', 'status', 'heartbeat_at')[:10]
+        )
+        for job_id, status, heartbeat_at in candidates:
+            claimed = SyncJob.objects.filter(id=job_id, status=status, heartbeat_at=heartbeat_at).update(
+                status='running',
+                worker_id=worker_id,
+                started_at=now,
+                heartbeat_at=now,
+                updated_at=now,
+            )
+            if claimed:
+                return SyncJob.objects.get(id=job_id)
+        return None
+
+    @staticmethod
+    def cancel(job: SyncJob) -> bool:
+        """
+        Cancel a queued job immediately, or ask the worker to stop a running one
+        """
+        now = timezone.now()
+        if SyncJob.objects.filter(pk=job.pk, status='queued').update(
+            status='cancelled', finished_at=now, updated_at=now
+        ):
+            return True
+        return bool(SyncJob.objects.filter(pk=job.pk, status='running').update(
+            cancel_requested=True, updated_at=now
+        ))
+
+    @staticmethod
+    def resume(job: SyncJob) -> bool:
+        """
+        Re-queue a failed or cancelled job; it continues after its last completed chunk
+        """
+        return bool(SyncJob.objects.filter(pk=job.pk, status__in=['failed', 'cancelled']).update(
+            status='queued', cancel_requested=False, error=None, finished_at=None, updated_at=timezone.now()
+        ))
+
+    @classmethod
+    def run(cls, job: SyncJob, sync_service: Optional[InventorySyncService] = None) -> SyncJob:
+        """
+        Execute a claimed job, recording progress, and return it in its final state
+        """
+        sync_service = sync_service or InventorySyncService()
+        runner = {
+            'import': cls._run_import,
+            'full_sync': cls._run_full_sync,
+        }[job.job_type]
+
+        try:
+            # One SQLite connection for every chunk of the job
+            with sync_service.sqlite_session():
+                runner(job, sync_service)
+            cls._finish(job, 'completed')
+        except SyncJobCancelled:
+            cls._finish(job, 'cancelled')
+        except Exception as e:
+            print(f"Sync job {job.pk} failed: {e}")
+            cls._finish(job, 'failed', error=str(e))
+        return job
+
+    @staticmethod
+    def _checkpoint(job: SyncJob, **changes):
+        """
+        Save progress (and the worker heartbeat) after a chunk
+        """
+        now = timezone.now()
+        for field, value in changes.items():
+            setattr(job, field, value)
+        job.heartbeat_at = now
+        SyncJob.objects.filter(pk=job.pk).update(heartbeat_at=now, updated_at=now, **changes)
+
+    @staticmethod
+    def _raise_if_cancelled(job: SyncJob):
+        """Stop before the next chunk if cancellation was requested"""
+        if SyncJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+            raise SyncJobCancelled()
+
+    @staticmethod
+    def _finish(job: SyncJob, status: str, error: Optional[str] = None):
+        now = timezone.now()
+        job.status = status
+        job.error = error
+        job.finished_at = now
+        SyncJob.objects.filter(pk=job.pk).update(
+            status=status, error=error, finished_at=now, heartbeat_at=now, updated_at=now
+        )
+
+    @classmethod
+    def _run_import(cls, job: SyncJob, sync_service: InventorySyncService):
+        reel_numbers = list(dict.fromkeys(job.payload.get('reel_numbers', [])))
+        chunk_size = getattr(settings, 'INVENTORY_IMPORT_CHUNK_SIZE', 500)
+        chunks = [reel_numbers[i:i + chunk_size] for i in range(0, len(reel_numbers), chunk_size)]
+        results = {'imported': 0, 'updated': 0, 'errors': [], 'products_processed': len(reel_numbers)}
+        results.update(job.results or {})
+        start_time = timezone.now()
+
+        cls._checkpoint(job, progress_total=len(reel_numbers))
+        for index in range(job.chunks_completed, len(chunks)):
+            cls._raise_if_cancelled(job)
+            chunk_results = sync_service.import_selected_products(chunks[index], job.requested_by, log=False)
+            results['imported'] += chunk_results['imported']
+            results['updated'] += chunk_results['updated']
+            results['errors'].extend(chunk_results['errors'])
+            cls._checkpoint(
+                job,
+                chunks_completed=index + 1,
+                progress_done=min((index + 1) * chunk_size, len(reel_numbers)),
+                results=results,
+            )
+
+        SyncLog.objects.create(
+            sync_type='import',
+            operation=f"Import {len(reel_numbers)} products (job #{job.pk})",
+            products_processed=len(reel_numbers),
+            products_imported=results['imported'],
+            products_updated=results['updated'],
+            errors='\n'.join(results['errors']) if results['errors'] else None,
+            executed_by=job.requested_by,
+            duration_seconds=(timezone.now() - start_time).total_seconds(),
+        )
+
+    @classmethod
+    def _run_full_sync(cls, job: SyncJob, sync_service: InventorySyncService):
+        """Two resumable steps: export changed sales, then preview importable products"""
+        start_time = timezone.now()
+        results = dict(job.results or {})
+        cls._checkpoint(job, progress_total=2)
+
+        if job.chunks_completed < 1:
+            cls._raise_if_cancelled(job)
+            results['export'] = sync_service.sync_sales_to_sqlite(job.requested_by)
+            cls._checkpoint(job, chunks_completed=1, progress_done=1, results=_json_safe(results))
+
+        cls._raise_if_cancelled(job)
+        importable_count = sync_service.count_importable_products()
+        is_auto = job.payload.get('auto', False)
+        summary = sync_service.summarize_full_sync(
+            results['export'], importable_count, start_time, job.requested_by,
+            sync_type='auto' if is_auto else 'manual',
+        )
+        if is_auto:
+            config = sync_service._get_sync_config()
+            config.last_auto_sync = timezone.now()
+            config.save(update_fields=['last_auto_sync', 'updated_at'])
+        cls._checkpoint(job, chunks_completed=2, progress_done=2, results=_json_safe(summary))
+
+
+def _json_safe(value):
+    """Round-trip through JSON so datetimes in results can be stored on SyncJob"""
+    return json.loads(json.dumps(value, default=str))
+
@@ -1,3 +1,322 @@
-from django.test import TestCase
+import os
+import sqlite3
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from core.models import Product
+from django.core.management import call_command
+
+from inventory_sync.models import ProductMapping, SyncConfig, SyncJob, SyncLog
+from inventory_sync.services import InventorySyncService, SQLiteInventoryService, SyncJobService
+
+
+def create_inventory_db(reel_numbers):
+    """Create a throwaway SQLite inventory database with In-stock reels"""
+    handle, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE Products (id INTEGER PRIMARY KEY, reel_number TEXT, width INTEGER, gsm INTEGER, "
+        "length INTEGER, grade TEXT, breaks INTEGER, location TEXT, status TEXT, date TEXT, last_date TEXT)"
+    )
+    connection.executemany(
+        "INSERT INTO Products (reel_number, width, gsm, length, grade, breaks, location, status, date) "
+        "VALUES (?, 1000, 80, 100, 'A', 0, 'Anbar_Akhal', 'In-stock', '2024-01-01')",
+        [(reel_number,) for reel_number in reel_numbers]
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+class SQLiteInventoryServiceTest(TestCase):
+    """Test the session-scoped, chunked SQLite bridge"""
+
+    def setUp(self):
+        self.db_path = create_inventory_db([f'R{i}' for i in range(7)])
+        self.service = SQLiteInventoryService(self.db_path)
+        self.service.chunk_size = 3
+
+    def tearDown(self):
+        self.service.disconnect()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def read_statuses(self):
+        connection = sqlite3.connect(self.db_path)
+        statuses = dict(connection.execute("SELECT reel_number, status FROM Products"))
+        connection.close()
+        return statuses
+
+    def test_session_reuses_one_connection_in_wal_mode(self):
+        with self.service.session() as connection:
+            self.service.get_product_by_reel_number('R1')
+            self.service.get_products_by_reel_numbers(['R2', 'R3'])
+            self.assertIs(self.service.connection, connection)
+            self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertIsNone(self.service.connection)
+
+    def test_bulk_read_in_chunks(self):
+        products = self.service.get_products_by_reel_numbers(['R0', 'R3', 'R6', 'MISSING', 'R0'])
+        self.assertEqual(sorted(products), ['R0', 'R3', 'R6'])
+        self.assertEqual(products['R3']['grade'], 'A')
+
+    def test_bulk_status_update_reports_batches(self):
+        updates = [(f'R{i}', 'Sold') for i in range(5)] + [('MISSING', 'Sold')]
+        result = self.service.update_product_statuses(updates)
+
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['missing'], ['MISSING'])
+        self.assertEqual(len(result['updated']), 5)
+        self.assertEqual([batch['rows_updated'] for batch in result['batches']], [3, 2])
+        statuses = self.read_statuses()
+        self.assertEqual(statuses['R4'], 'Sold')
+        self.assertEqual(statuses['R5'], 'In-stock')
+        self.assertTrue(self.service.update_product_status('R6', 'Delivered'))
+        self.assertFalse(self.service.update_product_status('MISSING', 'Sold'))
+
+    def test_sync_sales_exports_in_one_pass(self):
+        for reel_number in ('R0', 'R1', 'GONE'):
+            Product.objects.create(reel_number=reel_number, location='Anbar_Akhal', status='Sold',
+                                   width=1000, gsm=80, length=100, grade='A')
+        sync_service = InventorySyncService()
+        sync_service.sqlite_service = self.service
+
+        results = sync_service.sync_sales_to_sqlite()
+
+        self.assertEqual(results['exported'], 2)
+        self.assertEqual(len(results['errors']), 1)
+        self.assertEqual(self.read_statuses()['R1'], 'Sold')
+
+
+class IncrementalExportTest(TestCase):
+    """Test that sales export only pushes reels changed since the last run"""
+
+    def setUp(self):
+        self.db_path = create_inventory_db([f'R{i}' for i in range(4)])
+        self.sync_service = InventorySyncService()
+        self.sync_service.sqlite_service = SQLiteInventoryService(self.db_path)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def create_product(self, reel_number, status):
+        return Product.objects.create(reel_number=reel_number, location='Anbar_Akhal', status=status,
+                                      width=1000, gsm=80, length=100, grade='A')
+
+    def test_second_run_exports_only_changes(self):
+        self.create_product('R0', 'Sold')
+        self.create_product('R1', 'Delivered')
+        pending = self.create_product('R2', 'In-stock')
+
+        first = self.sync_service.sync_sales_to_sqlite()
+        self.assertEqual(first['exported'], 2)
+        self.assertIsNotNone(SyncConfig.objects.get().last_export_high_water)
+        self.assertEqual(ProductMapping.objects.get(reel_number='R1').exported_status, 'Delivered')
+
+        # Nothing changed: the overlap window is re-read but nothing is pushed again
+        second = self.sync_service.sync_sales_to_sqlite()
+        self.assertEqual((second['products_processed'], second['exported']), (0, 0))
+
+        pending.status = 'Sold'
+        pending.save()
+        third = self.sync_service.sync_sales_to_sqlite()
+        self.assertEqual(third['exported'], 1)
+
+        log = SyncLog.objects.filter(sync_type='export').order_by('-id').first()
+        self.assertEqual(log.products_exported, 1)
+        self.assertIsNotNone(log.delta_since)
+        self.assertIsNotNone(log.delta_until)
+
+    def test_cancellation_of_exported_reel_is_pushed(self):
+        product = self.create_product('R3', 'Sold')
+        self.sync_service.sync_sales_to_sqlite()
+
+        product.status = 'In-stock'
+        product.save()
+        results = self.sync_service.sync_sales_to_sqlite()
+
+        self.assertEqual(results['exported'], 1)
+        self.assertEqual(ProductMapping.objects.get(reel_number='R3').exported_status, 'In-stock')
+
+
+class ImportPlannerTest(TestCase):
+    """Test the set-based import planner"""
+
+    def setUp(self):
+        self.db_path = create_inventory_db([f'R{i}' for i in range(5)])
+        self.sync_service = InventorySyncService()
+        self.sync_service.sqlite_service = SQLiteInventoryService(self.db_path)
+        self.sync_service.sqlite_service.chunk_size = 2
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_classifies_rows_with_one_product_query(self):
+        for reel_number, status in (('R0', 'In-stock'), ('R1', 'Sold'), ('R2', 'Delivered')):
+            Product.objects.create(reel_number=reel_number, location='Anbar_Akhal', status=status,
+                                   width=1000, gsm=80, length=100, grade='A')
+
+        with self.assertNumQueries(1):
+            plan = {product['reel_number']: product for product in self.sync_service.iter_importable_products()}
+
+        self.assertEqual(sorted(plan), ['R1', 'R2', 'R3', 'R4'])
+        self.assertEqual(plan['R1']['action'], 'reimport')
+        self.assertEqual(plan['R3']['action'], 'new')
+        self.assertEqual(plan['R3']['django_data']['width'], 1000)
+        self.assertEqual(self.sync_service.count_importable_products(), 4)
+
+
+@override_settings(INVENTORY_IMPORT_CHUNK_SIZE=2)
+class BulkImportTest(TestCase):
+    """Test the chunked bulk upsert import path"""
+
+    def setUp(self):
+        self.db_path = create_inventory_db(['R0', 'R1', 'R2', 'BAD', 'R4'])
+        self.sync_service = InventorySyncService()
+        self.sync_service.sqlite_service = SQLiteInventoryService(self.db_path)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_upserts_products_and_mappings(self):
+        sold = Product.objects.create(reel_number='R1', location='Anbar_Kharaj', status='Sold',
+                                      width=500, gsm=60, length=50, grade='B', qr_code='KEEP')
+        ProductMapping.objects.create(reel_number='R1', external_id=99, django_product_id=sold.id)
+
+        results = self.sync_service.import_selected_products(['R0', 'R1', 'R2', 'MISSING'])
+
+        self.assertEqual((results['imported'], results['updated']), (2, 1))
+        self.assertEqual(results['errors'], ['Product MISSING not found in SQLite'])
+        sold.refresh_from_db()
+        self.assertEqual((sold.status, sold.width, sold.qr_code), ('In-stock', 1000, 'KEEP'))
+        mapping = ProductMapping.objects.get(reel_number='R1')
+        self.assertEqual((mapping.sync_status, mapping.external_id), ('updated', 99))
+        self.assertEqual(ProductMapping.objects.get(reel_number='R0').sync_status, 'imported')
+
+    def test_bad_reel_only_fails_itself(self):
+        upsert = self.sync_service._upsert_import_chunk
+
+        def failing_upsert(rows):
+            if any(reel_number == 'BAD' for reel_number, _, _ in rows):
+                raise ValueError('broken reel')
+            return upsert(rows)
+
+        with mock.patch.object(self.sync_service, '_upsert_import_chunk', side_effect=failing_upsert):
+            results = self.sync_service.import_selected_products(['R0', 'R1', 'R2', 'BAD', 'R4'])
+
+        self.assertEqual(results['imported'], 4)
+        self.assertEqual(results['errors'], ['Error importing product BAD: broken reel'])
+        self.assertFalse(Product.objects.filter(reel_number='BAD').exists())
+        self.assertEqual(Product.objects.count(), 4)
+
+
+@override_settings(INVENTORY_IMPORT_CHUNK_SIZE=2)
+class SyncJobTest(TestCase):
+    """Test the DB-backed sync job queue"""
+
+    def setUp(self):
+        self.db_path = create_inventory_db([f'R{i}' for i in range(5)])
+        self.sync_service = InventorySyncService()
+        self.sync_service.sqlite_service = SQLiteInventoryService(self.db_path)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def enqueue_import(self):
+        return SyncJobService.enqueue('import', payload={'reel_numbers': [f'R{i}' for i in range(5)]})
+
+    def test_import_job_reports_progress(self):
+        self.enqueue_import()
+        job = SyncJobService.claim_next('worker-1')
+        self.assertIsNone(SyncJobService.claim_next('worker-2'))
+
+        job = SyncJobService.run(job, self.sync_service)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.progress_done, job.progress_total, job.chunks_completed), (5, 5, 3))
+        self.assertEqual(job.results['imported'], 5)
+        self.assertEqual(SyncLog.objects.filter(sync_type='import').count(), 1)
+
+    def test_job_chunks_share_one_sqlite_connection(self):
+        self.enqueue_import()
+        with mock.patch('inventory_sync.services.sqlite3.connect', wraps=sqlite3.connect) as connect:
+            job = SyncJobService.run(SyncJobService.claim_next('worker-1'), self.sync_service)
+
+        self.assertEqual(job.chunks_completed, 3)
+        self.assertEqual(connect.call_count, 1)
+        self.assertIsNone(self.sync_service.sqlite_service.connection)
+
+    def test_missing_database_still_reports_per_step(self):
+        self.sync_service.sqlite_service = SQLiteInventoryService(self.db_path + '.missing')
+        Product.objects.create(reel_number='R0', location='Anbar_Akhal', status='Sold',
+                               width=1000, gsm=80, length=100, grade='A')
+
+        results = self.sync_service.perform_full_sync()
+
+        self.assertIn('Failed to connect', ' '.join(results['errors']))
+
+    def test_job_resumes_after_last_completed_chunk(self):
+        job = self.enqueue_import()
+        SyncJob.objects.filter(pk=job.pk).update(status='failed', chunks_completed=2, results={'imported': 4})
+        self.assertTrue(SyncJobService.resume(job))
+
+        SyncJobService.run(SyncJobService.claim_next('worker-1'), self.sync_service)
+
+        self.assertEqual(list(Product.objects.values_list('reel_number', flat=True)), ['R4'])
+        self.assertEqual(SyncJob.objects.get(pk=job.pk).results['imported'], 5)
+
+    def test_cancel(self):
+        queued = self.enqueue_import()
+        self.assertTrue(SyncJobService.cancel(queued))
+        self.assertIsNone(SyncJobService.claim_next('worker-1'))
+
+        self.enqueue_import()
+        running = SyncJobService.claim_next('worker-1')
+        SyncJobService.cancel(running)
+        SyncJobService.run(running, self.sync_service)
+
+        running.refresh_from_db()
+        self.assertEqual((running.status, running.chunks_completed), ('cancelled', 0))
+        self.assertFalse(Product.objects.exists())
+
+    def test_auto_sync_enqueues_one_job(self):
+        call_command('auto_sync', '--force', stdout=open(os.devnull, 'w'))
+        call_command('auto_sync', '--force', stdout=open(os.devnull, 'w'))
+
+        job = SyncJob.objects.get()
+        self.assertEqual((job.job_type, job.payload), ('full_sync', {'auto': True}))
+
+        SyncJobService.run(SyncJobService.claim_next('worker-1'), self.sync_service)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.results['importable_count'], 5)
+        self.assertIsNotNone(SyncConfig.objects.get().last_auto_sync)
+
+    def test_import_view_queues_job(self):
+        from accounts.models import User
+
+        admin = User.objects.create_user(username='sync-admin', password='x', phone='09120000601',
+                                         role=User.UserRole.SUPER_ADMIN)
+        self.client.force_login(admin)
+
+        response = self.client.post('/inventory-sync/import/perform/', data='{"selected_reel_numbers": ["R0"]}',
+                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, 202)
+        job = SyncJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual((job.job_type, job.status, job.requested_by), ('import', 'queued', admin))
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertFalse(status['finished'])
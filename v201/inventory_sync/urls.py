@@ -14,6 +14,11 @@ urlpatterns = [
     # Full synchronization
     path('sync/full/', views.perform_full_sync, name='perform_full_sync'),
     
+    # Background jobs
+    path('jobs/<int:job_id>/', views.sync_job_status, name='sync_job_status'),
+    path('jobs/<int:job_id>/cancel/', views.cancel_sync_job, name='cancel_sync_job'),
+    path('jobs/<int:job_id>/resume/', views.resume_sync_job, name='resume_sync_job'),
+    
     # Logs and mappings
     path('logs/', views.sync_logs_view, name='sync_logs'),
     path('mappings/', views.product_mappings_view, name='product_mappings'),
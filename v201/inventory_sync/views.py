@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
@@ -10,8 +11,8 @@ from django.db.models import Q
 import json
 
 from accounts.permissions import super_admin_required
-from .models import SyncConfig, SyncLog, ProductMapping, FieldMapping
-from .services import InventorySyncService
+from .models import SyncConfig, SyncLog, ProductMapping, FieldMapping, SyncJob
+from .services import InventorySyncService, SyncJobService
 
 
 @login_required
@@ -29,7 +30,7 @@ def sync_dashboard(request):
     recent_logs = SyncLog.objects.all()[:10]
     
     # Get importable products count
-    importable_products = sync_service.get_importable_products()
+    importable_count = sync_service.count_importable_products()
     
     # Get sync statistics
     total_mappings = ProductMapping.objects.count()
@@ -39,7 +40,7 @@ def sync_dashboard(request):
     context = {
         'config': config,
         'recent_logs': recent_logs,
-        'importable_count': len(importable_products),
+        'importable_count': importable_count,
         'total_mappings': total_mappings,
         'imported_mappings': imported_mappings,
         'updated_mappings': updated_mappings,
@@ -57,25 +58,23 @@ def import_products_view(request):
     View for importing products from SQLite
     """
     sync_service = InventorySyncService()
-    importable_products = sync_service.get_importable_products()
+    importable_products = sync_service.iter_importable_products()
     
     # Filter by width if specified
     width_filter = request.GET.get('width')
     if width_filter:
         try:
             width_value = int(width_filter)
-            filtered_products = []
-            for product in importable_products:
-                # Check both external_data and django_data for width
-                external_width = product.get('external_data', {}).get('width')
-                django_width = product.get('django_data', {}).get('width')
-                
-                if external_width == width_value or django_width == width_value:
-                    filtered_products.append(product)
-            importable_products = filtered_products
+            # Check both external_data and django_data for width
+            importable_products = (
+                product for product in importable_products
+                if product['external_data'].get('width') == width_value
+                or product['django_data'].get('width') == width_value
+            )
         except (ValueError, TypeError):
             # If width filter is invalid, show all products
             pass
+    importable_products = list(importable_products)
     
     # Pagination
     paginator = Paginator(importable_products, 20)  # 20 products per page
@@ -98,6 +97,8 @@ def import_products_view(request):
 def perform_import(request):
     """
     AJAX endpoint for importing selected products
+
+    The import is queued as a SyncJob; poll sync_job_status for progress.
     """
     try:
         data = json.loads(request.body)
@@ -109,25 +110,8 @@ def perform_import(request):
                 'message': 'No products selected for import'
             })
         
-        sync_service = InventorySyncService()
-        results = sync_service.import_selected_products(selected_reel_numbers, request.user)
-        
-        if results['errors']:
-            error_details = '\n'.join(results['errors'][:5])  # Show first 5 errors
-            if len(results['errors']) > 5:
-                error_details += f"\n... and {len(results['errors']) - 5} more errors"
-            
-            return JsonResponse({
-                'success': False,
-                'message': f"Import completed with {len(results['errors'])} errors. Details: {error_details}",
-                'results': results
-            })
-        else:
-            return JsonResponse({
-                'success': True,
-                'message': f"Successfully imported {results['imported']} products and updated {results['updated']} products",
-                'results': results
-            })
+        job = SyncJobService.enqueue('import', request.user, {'reel_numbers': selected_reel_numbers})
+        return _job_accepted(job, f"Import of {len(selected_reel_numbers)} products queued")
     
     except Exception as e:
         return JsonResponse({
@@ -142,56 +126,12 @@ def perform_import(request):
 def perform_full_sync(request):
     """
     AJAX endpoint for performing full synchronization
+
+    The sync is queued as a SyncJob; poll sync_job_status for progress.
     """
     try:
-        sync_service = InventorySyncService()
-        results = sync_service.perform_full_sync(request.user)
-        
-        # Check if sync was successful
-        if results.get('sync_successful', False):
-            # Build success message
-            message_parts = []
-            
-            if results['exported'] > 0:
-                message_parts.append(f"بروزرسانی {results['exported']} محصول فروخته شده")
-            elif results['exported'] == 0 and results.get('warnings'):
-                message_parts.append("هیچ محصول فروخته شده‌ای برای بروزرسانی یافت نشد")
-            else:
-                message_parts.append("همگام‌سازی با موفقیت انجام شد")
-            
-            if results['importable_count'] > 0:
-                message_parts.append(f"{results['importable_count']} محصول قابل وارد کردن")
-            
-            # Add warnings if any
-            if results.get('warnings'):
-                warning_count = len(results['warnings'])
-                message_parts.append(f"({warning_count} هشدار - محصولات در فایل SQLite یافت نشدند)")
-            
-            success_message = ". ".join(message_parts)
-            
-            return JsonResponse({
-                'success': True,
-                'message': success_message,
-                'results': results
-            })
-        else:
-            # Handle critical errors
-            if results.get('errors'):
-                error_details = '\n'.join(results['errors'][:3])  # Show first 3 errors
-                if len(results['errors']) > 3:
-                    error_details += f"\n... and {len(results['errors']) - 3} more errors"
-                
-                return JsonResponse({
-                    'success': False,
-                    'message': f"خطا در همگام‌سازی: {error_details}",
-                    'results': results
-                })
-            else:
-                return JsonResponse({
-                    'success': False,
-                    'message': 'خطا در همگام‌سازی - جزئیات نامشخص',
-                    'results': results
-                })
+        job = SyncJobService.enqueue('full_sync', request.user)
+        return _job_accepted(job, 'همگام‌سازی کامل در صف اجرا قرار گرفت')
     
     except Exception as e:
         return JsonResponse({
@@ -200,6 +140,114 @@ def perform_full_sync(request):
         })
 
 
+def _job_accepted(job, message):
+    """202 response pointing the UI at the job status endpoint"""
+    return JsonResponse({
+        'success': True,
+        'message': message,
+        'job': job.to_dict(),
+        'status_url': reverse('inventory_sync:sync_job_status', args=[job.pk]),
+        'cancel_url': reverse('inventory_sync:cancel_sync_job', args=[job.pk]),
+    }, status=202)
+
+
+def _import_message(results):
+    """Describe a finished import job"""
+    if results.get('errors'):
+        error_details = '\n'.join(results['errors'][:5])  # Show first 5 errors
+        if len(results['errors']) > 5:
+            error_details += f"\n... and {len(results['errors']) - 5} more errors"
+        return False, f"Import completed with {len(results['errors'])} errors. Details: {error_details}"
+    return True, f"Successfully imported {results.get('imported', 0)} products and updated {results.get('updated', 0)} products"
+
+
+def _full_sync_message(results):
+    """Describe a finished full sync job"""
+    if results.get('sync_successful', False):
+        # Build success message
+        message_parts = []
+        
+        if results['exported'] > 0:
+            message_parts.append(f"بروزرسانی {results['exported']} محصول فروخته شده")
+        elif results['exported'] == 0 and results.get('warnings'):
+            message_parts.append("هیچ محصول فروخته شده‌ای برای بروزرسانی یافت نشد")
+        else:
+            message_parts.append("همگام‌سازی با موفقیت انجام شد")
+        
+        if results['importable_count'] > 0:
+            message_parts.append(f"{results['importable_count']} محصول قابل وارد کردن")
+        
+        # Add warnings if any
+        if results.get('warnings'):
+            warning_count = len(results['warnings'])
+            message_parts.append(f"({warning_count} هشدار - محصولات در فایل SQLite یافت نشدند)")
+        
+        return True, ". ".join(message_parts)
+
+    # Handle critical errors
+    if results.get('errors'):
+        error_details = '\n'.join(results['errors'][:3])  # Show first 3 errors
+        if len(results['errors']) > 3:
+            error_details += f"\n... and {len(results['errors']) - 3} more errors"
+        return False, f"خطا در همگام‌سازی: {error_details}"
+    return False, 'خطا در همگام‌سازی - جزئیات نامشخص'
+
+
+@login_required
+@super_admin_required
+def sync_job_status(request, job_id):
+    """
+    AJAX endpoint polled by the UI for job progress
+    """
+    job = get_object_or_404(SyncJob, pk=job_id)
+    payload = {'success': True, 'job': job.to_dict(), 'finished': job.status not in SyncJob.ACTIVE_STATUSES}
+
+    if job.status == 'completed':
+        describe = _import_message if job.job_type == 'import' else _full_sync_message
+        payload['success'], payload['message'] = describe(job.results)
+    elif job.status == 'failed':
+        payload['success'] = False
+        payload['message'] = f'Job failed: {job.error}'
+    elif job.status == 'cancelled':
+        payload['message'] = f'Job cancelled after {job.progress_done} of {job.progress_total} items'
+    else:
+        payload['message'] = f'{job.get_status_display()} ({job.progress_percent}%)'
+
+    return JsonResponse(payload)
+
+
+@login_required
+@super_admin_required
+@require_http_methods(["POST"])
+def cancel_sync_job(request, job_id):
+    """
+    AJAX endpoint for cancelling a queued or running job
+    """
+    job = get_object_or_404(SyncJob, pk=job_id)
+    cancelled = SyncJobService.cancel(job)
+    return JsonResponse({
+        'success': cancelled,
+        'message': 'Cancellation requested' if cancelled else f'Job is already {job.status}',
+    })
+
+
+@login_required
+@super_admin_required
+@require_http_methods(["POST"])
+def resume_sync_job(request, job_id):
+    """
+    AJAX endpoint for re-queuing a failed or cancelled job from its last completed chunk
+    """
+    job = get_object_or_404(SyncJob, pk=job_id)
+    resumed = SyncJobService.resume(job)
+    job.refresh_from_db()
+    return JsonResponse({
+        'success': resumed,
+        'message': f'Job resumed after chunk {job.chunks_completed}' if resumed else f'Job is {job.status}',
+        'job': job.to_dict(),
+    })
+
+
 @login_required
 @super_admin_required
 def sync_logs_view(request):
@@ -341,7 +389,7 @@ def sync_config_view(request):
             
             config.auto_sync_interval_minutes = data.get('auto_sync_interval_minutes', 1440)
             config.is_auto_sync_enabled = data.get('is_auto_sync_enabled', True)
-            config.save()
+            config.save(update_fields=['auto_sync_interval_minutes', 'is_auto_sync_enabled', 'updated_at'])
             
             return JsonResponse({
                 'success': True,
@@ -375,7 +423,7 @@ def get_sync_status(request):
             config = SyncConfig.objects.create()
         
         try:
-            importable_products = sync_service.get_importable_products()
+            importable_count = sync_service.count_importable_products()
             should_auto_sync = sync_service.should_run_auto_sync()
         except Exception as sync_error:
             return JsonResponse({
@@ -384,7 +432,7 @@ def get_sync_status(request):
             })
         
         status = {
-            'importable_count': len(importable_products),
+            'importable_count': importable_count,
             'auto_sync_enabled': config.is_auto_sync_enabled,
             'auto_sync_interval': config.auto_sync_interval_minutes,
             'last_auto_sync': config.last_auto_sync.isoformat() if config.last_auto_sync else None,
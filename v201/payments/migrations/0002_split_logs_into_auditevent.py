@@ -0,0 +1,123 @@
+"""
+🧾 انتقال رشته‌های logs پرداخت به جدول AuditEvent
+"""
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+# 🧊 نسخه ثابت پارسر لاگ‌های قدیمی (کپی core.log_export در زمان نوشتن این migration)
+# ⚠️ تغییرات بعدی core.log_export نباید رفتار migration تاریخی را عوض کند
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+ACTOR_PATTERN = re.compile(r' By (?P<actor>.*)$')
+CHANGE_PATTERN = re.compile(r"^(?P<label>[A-Za-z ]+?) changed from (?P<old>.*) to (?P<new>.*?)(?: Toman)? By .*$")
+LEGACY_FIELD_NAMES = {
+    'name': 'customer_name',
+    'discount': 'discount_percentage',
+    'payment method': 'payment_method',
+    'total amount': 'total_amount',
+    'final amount': 'final_amount',
+}
+
+
+def split_log_lines(logs):
+    if not logs:
+        return []
+    return [line.strip() for line in logs.split(',') if line.strip()]
+
+
+def parse_legacy_log_line(line):
+    candidate = line.lstrip('[')[:19]
+    try:
+        timestamp = datetime.strptime(candidate, TIMESTAMP_FORMAT).replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        timestamp = None
+    message = line.lstrip('[')[19:].lstrip(']').strip() if timestamp else line.strip()
+    parsed = {
+        'timestamp': timestamp,
+        'message': message,
+        'action': 'INFO',
+        'field_name': '',
+        'old_value': '',
+        'new_value': '',
+        'actor': '',
+    }
+
+    actor = ACTOR_PATTERN.search(message)
+    if actor:
+        parsed['actor'] = actor.group('actor')[:150]
+
+    change = CHANGE_PATTERN.match(message)
+    if change:
+        label = change.group('label').strip().lower()
+        parsed.update({
+            'action': 'UPDATE',
+            'field_name': LEGACY_FIELD_NAMES.get(label, label.replace(' ', '_'))[:50],
+            'old_value': change.group('old').strip("'%"),
+            'new_value': change.group('new').strip("'%"),
+        })
+    elif ' Created By ' in message:
+        parsed['action'] = 'CREATE'
+    elif ' Updated By ' in message:
+        parsed['action'] = 'UPDATE'
+    return parsed
+
+
+def forwards(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    AuditEvent = apps.get_model('core', 'AuditEvent')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    content_type, _ = ContentType.objects.get_or_create(app_label='payments', model='payment')
+
+    batch = []
+    for payment in Payment.objects.exclude(logs='').only('id', 'logs', 'created_at').iterator(chunk_size=500):
+        for line in split_log_lines(payment.logs):
+            parsed = parse_legacy_log_line(line)
+            batch.append(AuditEvent(
+                content_type=content_type,
+                object_id=payment.id,
+                timestamp=parsed['timestamp'] or payment.created_at,
+                action=parsed['action'],
+                field_name=parsed['field_name'],
+                old_value=parsed['old_value'],
+                new_value=parsed['new_value'],
+                message=parsed['message'],
+                actor=parsed['actor'],
+            ))
+            if len(batch) >= 1000:
+                AuditEvent.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        AuditEvent.objects.bulk_create(batch)
+
+
+def backwards(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    AuditEvent = apps.get_model('core', 'AuditEvent')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    content_type = ContentType.objects.filter(app_label='payments', model='payment').first()
+    if content_type is None:
+        return
+
+    lines_by_payment = {}
+    events = AuditEvent.objects.filter(content_type=content_type).order_by('timestamp', 'id')
+    for event in events.iterator(chunk_size=1000):
+        line = f"{event.timestamp.strftime('%Y-%m-%d %H:%M:%S')} {event.message}"
+        lines_by_payment.setdefault(event.object_id, []).append(line)
+    for payment_id, lines in lines_by_payment.items():
+        Payment.objects.filter(pk=payment_id).update(logs=', '.join(lines) + ',')
+    events.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0018_auditevent'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_split_logs_into_auditevent'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='payment',
+            name='logs',
+        ),
+    ]
@@ -4,10 +4,11 @@ from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
-from django.core.management import call_command
 import json
 
 from HomayOMS.baseModel import BaseModel
+from core.log_export import schedule_log_export
+from core.models import AuditEvent, AuditLogMixin, DailyFinanceRollup
 
 
 def get_current_user():
@@ -19,7 +20,7 @@ def get_current_user():
         return None
 
 
-class Payment(BaseModel):
+class Payment(AuditLogMixin, BaseModel):
     """
     💳 مدل پرداخت - مدیریت پرداخت‌های آنلاین
     
@@ -252,12 +253,8 @@ class Payment(BaseModel):
         help_text="توضیحات اضافی درباره پرداخت"
     )
     
-    # 📝 لاگ‌های تحلیلی (مشابه Customer و Order)
-    logs = models.TextField(
-        blank=True,
-        verbose_name="📝 لاگ‌های پرداخت",
-        help_text="لاگ‌های کامل فرآیند پرداخت"
-    )
+    # 📋 فیلدهای تحت نظر برای ثبت تغییرات
+    audit_fields = ('status', 'gateway', 'amount', 'display_amount', 'gateway_transaction_id', 'error_message')
     
     class Meta:
         verbose_name = "💳 پرداخت"
@@ -295,7 +292,6 @@ class Payment(BaseModel):
         💾 ذخیره پرداخت با تولید کد پیگیری
         """
         from django.utils import timezone
-        from django.core.management import call_command
         
         # تولید کد پیگیری در صورت عدم وجود
         if not self.tracking_code:
@@ -309,59 +305,46 @@ class Payment(BaseModel):
         if not self.expires_at:
             self.expires_at = timezone.now() + timezone.timedelta(minutes=30)
         
-        # ثبت لاگ تغییرات با فرمت مشابه Customer و Order
-        current_user = None
-        username = 'system'
-        try:
-            from core.middleware import get_current_user
-            current_user = get_current_user()
-            if current_user and hasattr(current_user, 'get_full_name'):
-                username = current_user.get_full_name() or current_user.username
-            elif current_user and hasattr(current_user, 'username'):
-                username = current_user.username
-        except Exception:
-            pass
-        
+        # ثبت رویدادهای تغییرات با فرمت مشابه Customer و Order
+        from core.middleware import get_current_username
+        username = get_current_username()
         is_new = not self.pk
-        now_str = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entries = []
-        if self.logs:
-            log_entries = [entry.strip() for entry in self.logs.split(',') if entry.strip()]
+        now = timezone.now()
+        entry = lambda message, **kwargs: AuditEvent.entry(message, timestamp=now, **kwargs)
+        status_display = dict(self.STATUS_CHOICES)
+        gateway_display = dict(self.GATEWAY_CHOICES)
+        events = []
         
         if is_new:
-            log_entries.append(f"{now_str} Payment Created By {username}")
-            log_entries.append(f"{now_str} Tracking Code: {self.tracking_code} By {username}")
-            log_entries.append(f"{now_str} Order: {self.order.order_number if self.order else 'N/A'} By {username}")
-            log_entries.append(f"{now_str} Customer: {self.order.customer.customer_name if self.order and self.order.customer else 'N/A'} By {username}")
-            log_entries.append(f"{now_str} Gateway: {self.get_gateway_display_persian()} By {username}")
-            log_entries.append(f"{now_str} Amount: {self.display_amount:,.0f} Toman By {username}")
-            log_entries.append(f"{now_str} Status: {self.get_status_display_persian()} By {username}")
+            events.append(entry(f"Payment Created By {username}", action='CREATE'))
+            events.append(entry(f"Tracking Code: {self.tracking_code} By {username}", action='CREATE', field_name='tracking_code', new_value=self.tracking_code))
+            events.append(entry(f"Order: {self.order.order_number if self.order else 'N/A'} By {username}", action='CREATE', field_name='order', new_value=self.order_id))
+            events.append(entry(f"Customer: {self.order.customer.customer_name if self.order and self.order.customer else 'N/A'} By {username}", action='CREATE'))
+            events.append(entry(f"Gateway: {self.get_gateway_display_persian()} By {username}", action='CREATE', field_name='gateway', new_value=self.gateway))
+            events.append(entry(f"Amount: {self.display_amount:,.0f} Toman By {username}", action='CREATE', field_name='amount', new_value=self.amount))
+            events.append(entry(f"Status: {self.get_status_display_persian()} By {username}", action='CREATE', field_name='status', new_value=self.status))
         else:
-            try:
-                old = Payment.objects.get(pk=self.pk)
-            except Payment.DoesNotExist:
-                old = None
-            log_entries.append(f"{now_str} Payment Updated By {username}")
+            old = self.get_audit_snapshot()
+            events.append(entry(f"Payment Updated By {username}"))
             if old:
-                if old.status != self.status:
-                    log_entries.append(f"{now_str} Status changed from {old.get_status_display_persian()} to {self.get_status_display_persian()} By {username}")
-                if old.gateway != self.gateway:
-                    log_entries.append(f"{now_str} Gateway changed from {old.get_gateway_display_persian()} to {self.get_gateway_display_persian()} By {username}")
-                if old.amount != self.amount:
-                    log_entries.append(f"{now_str} Amount changed from {old.display_amount:,.0f} to {self.display_amount:,.0f} Toman By {username}")
-                if old.gateway_transaction_id != self.gateway_transaction_id and self.gateway_transaction_id:
-                    log_entries.append(f"{now_str} Transaction ID: {self.gateway_transaction_id} By {username}")
-                if self.error_message and old.error_message != self.error_message:
-                    log_entries.append(f"{now_str} Error: {self.error_message[:100]} By {username}")
-        
-        log_entries = sorted(log_entries, key=lambda x: x[:19])  # Sort by timestamp
-        self.logs = ', '.join(log_entries) + (',' if log_entries else '')
+                if old['status'] != self.status:
+                    events.append(entry(f"Status changed from {status_display.get(old['status'], old['status'])} to {self.get_status_display_persian()} By {username}", field_name='status', old_value=old['status'], new_value=self.status))
+                if old['gateway'] != self.gateway:
+                    events.append(entry(f"Gateway changed from {gateway_display.get(old['gateway'], old['gateway'])} to {self.get_gateway_display_persian()} By {username}", field_name='gateway', old_value=old['gateway'], new_value=self.gateway))
+                if old['amount'] != self.amount:
+                    events.append(entry(f"Amount changed from {old['display_amount']:,.0f} to {self.display_amount:,.0f} Toman By {username}", field_name='amount', old_value=old['amount'], new_value=self.amount))
+                if old['gateway_transaction_id'] != self.gateway_transaction_id and self.gateway_transaction_id:
+                    events.append(entry(f"Transaction ID: {self.gateway_transaction_id} By {username}", field_name='gateway_transaction_id', old_value=old['gateway_transaction_id'], new_value=self.gateway_transaction_id))
+                if self.error_message and old['error_message'] != self.error_message:
+                    events.append(entry(f"Error: {self.error_message[:100]} By {username}", field_name='error_message', old_value=old['error_message'], new_value=self.error_message))
         
         super().save(*args, **kwargs)
-        try:
-            call_command('export_payments_logs_to_csv')
-        except Exception:
-            pass
+        self.flush_audit_events(events, actor=username)
+        schedule_log_export('payments')
+        
+        # 📈 بازمحاسبه خلاصه مالی روز پرداخت در صورت تغییر وضعیت
+        if is_new or (old and old['status'] != self.status):
+            DailyFinanceRollup.schedule_refresh(self.created_at)
     
     def generate_tracking_code(self):
         """
@@ -402,14 +385,12 @@ class Payment(BaseModel):
                 extra_data=extra_json
             )
             
-            # اضافه کردن به لاگ‌های داخلی
-            log_entry = f"[{timezone.now().strftime('%Y-%m-%d %H:%M:%S')}] {action}: {description}\n"
-            self.logs = (self.logs or '') + log_entry
+            # اضافه کردن به رویدادهای داخلی (در save بعدی ذخیره می‌شود)
+            self.add_audit_event(f"{action}: {description}", action='INFO')
             
         except Exception as e:
-            # در صورت خطا در ثبت لاگ، فقط در لاگ‌های داخلی ذخیره کن
-            log_entry = f"[{timezone.now().strftime('%Y-%m-%d %H:%M:%S')}] LOG_ERROR: {str(e)} - {action}: {description}\n"
-            self.logs = (self.logs or '') + log_entry
+            # در صورت خطا در ثبت لاگ، فقط در رویدادهای داخلی ذخیره کن
+            self.add_audit_event(f"LOG_ERROR: {str(e)} - {action}: {description}", action='INFO')
     
     def mark_as_success(self, verification_data=None):
         """
@@ -634,18 +634,57 @@ class PaymentService:
     def check_expired_payments(cls):
         """
         ⏰ بررسی و علامت‌گذاری پرداخت‌های منقضی شده
+
+        🎯 تغییر وضعیت با UPDATE شرطی و دسته‌ای داخل یک تراکنش (مشابه لغو سفارشات منقضی)
+        🧾 رویدادهای تغییرات و لاگ‌های فعالیت با bulk_create ثبت می‌شوند
         """
-        expired_payments = Payment.objects.filter(
-            status__in=['INITIATED', 'REDIRECTED', 'PENDING'],
-            expires_at__lt=timezone.now()
-        )
-        
-        for payment in expired_payments:
-            payment.status = 'TIMEOUT'
-            payment.completed_at = timezone.now()
-            payment.error_message = 'پرداخت منقضی شد'
-            payment.save()
-            
-            payment.log_activity('TIMEOUT', 'پرداخت منقضی شد')
-        
-        return expired_payments.count() 
\ No newline at end of file
+        from core.log_export import schedule_log_export
+        from core.middleware import get_current_username
+        from core.models import ActivityLog, AuditEvent, DailyFinanceRollup
+        from core.services import ExpirySweepService
+
+        now = timezone.now()
+        username = get_current_username()
+        error_message = 'پرداخت منقضی شد'
+        status_display = dict(Payment.STATUS_CHOICES)
+        expired_total = 0
+
+        with transaction.atomic():
+            for old_status in ('INITIATED', 'REDIRECTED', 'PENDING'):
+                claimed = ExpirySweepService.claim(
+                    Payment.objects.filter(status=old_status, expires_at__lt=now),
+                    status='TIMEOUT', completed_at=now, error_message=error_message, updated_at=now,
+                )
+                if not claimed:
+                    continue
+                payments = list(Payment.objects.filter(pk__in=claimed).only('id', 'tracking_code', 'created_at'))
+
+                AuditEvent.record_bulk(Payment, {
+                    payment_id: [
+                        AuditEvent.entry(f"Payment Updated By {username}", timestamp=now),
+                        AuditEvent.entry(
+                            f"Status changed from {status_display[old_status]} to {status_display['TIMEOUT']} By {username}",
+                            field_name='status', old_value=old_status, new_value='TIMEOUT', timestamp=now,
+                        ),
+                        AuditEvent.entry(
+                            f"Error: {error_message} By {username}",
+                            field_name='error_message', new_value=error_message, timestamp=now,
+                        ),
+                        AuditEvent.entry(f"TIMEOUT: {error_message}", action='INFO', timestamp=now),
+                    ]
+                    for payment_id in claimed
+                }, actor=username)
+
+                ActivityLog.objects.bulk_create([
+                    ActivityLog.build_activity(
+                        None, 'TIMEOUT', error_message, content_object=payment, severity='MEDIUM', extra_data={}
+                    )
+                    for payment in payments
+                ])
+                DailyFinanceRollup.schedule_refresh(*(payment.created_at for payment in payments))
+                expired_total += len(claimed)
+
+            if expired_total:
+                schedule_log_export('payments')
+
+        return expired_total
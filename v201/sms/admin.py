@@ -43,6 +43,9 @@ class SMSMessageAdmin(admin.ModelAdmin):
         'phone_number', 
         'message_type', 
         'status', 
+        'priority',
+        'segments',
+        'attempts',
         'created_at', 
         'sent_at',
         'tracking_link'
@@ -51,7 +54,8 @@ class SMSMessageAdmin(admin.ModelAdmin):
     search_fields = ['phone_number', 'message_content', 'tracking_id']
     readonly_fields = [
         'tracking_id', 'created_at', 'sent_at', 'delivered_at', 
-        'api_response', 'extra_data'
+        'api_response', 'extra_data', 'encoding', 'segments', 'attempts', 'next_attempt_at',
+        'locked_by', 'locked_until', 'remote_job_id', 'remote_queued_at'
     ]
     date_hierarchy = 'created_at'
     
@@ -60,12 +64,16 @@ class SMSMessageAdmin(admin.ModelAdmin):
             'fields': ('tracking_id', 'phone_number', 'message_type', 'status')
         }),
         ('محتوای پیام', {
-            'fields': ('message_content', 'template', 'user')
+            'fields': ('message_content', 'encoding', 'segments', 'template', 'user')
         }),
         ('زمان‌بندی', {
             'fields': ('created_at', 'sent_at', 'delivered_at'),
             'classes': ('collapse',)
         }),
+        ('📤 صف ارسال', {
+            'fields': ('priority', 'attempts', 'next_attempt_at', 'expires_at', 'locked_by', 'locked_until', 'remote_job_id', 'remote_queued_at'),
+            'classes': ('collapse',)
+        }),
         ('اطلاعات فنی', {
             'fields': ('api_response', 'error_message', 'extra_data'),
             'classes': ('collapse',)
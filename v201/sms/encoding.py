@@ -0,0 +1,47 @@
+"""
+🔢 تخمین تعداد بخش (segment) پیامک پیش از ثبت در صف - HomayOMS
+📐 همان قواعد انکودر PDU سرور SMS: GSM 7-bit اگر همه کاراکترها در الفبای GSM 03.38 باشند، وگرنه UCS-2 (متن فارسی)
+✂️ پیام بلند به بخش‌های 153 (GSM) یا 67 (UCS-2) کاراکتری با سرآیند UDH تقسیم می‌شود
+"""
+
+GSM7 = 'GSM7'
+UCS2 = 'UCS2'
+
+GSM7_BASIC = frozenset(
+    '@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !"#¤%&\'()*+,-./0123456789:;<=>?'
+    '¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà'
+)
+# 🔣 کاراکترهای جدول توسعه - هر کدام دو septet (ESC + کد)
+GSM7_EXTENDED = frozenset('\f^{}\\[~]|€')
+
+SINGLE_LIMITS = {GSM7: 160, UCS2: 70}
+PART_LIMITS = {GSM7: 153, UCS2: 67}
+
+
+def estimate_segments(text):
+    """
+    📐 تخمین هزینه ارسال یک پیام
+
+    📤 خروجی: {'encoding': GSM7 یا UCS2, 'segments': تعداد بخش, 'units': septet یا code unit مصرفی}
+    """
+    text = text or ''
+    if all(char in GSM7_BASIC or char in GSM7_EXTENDED for char in text):
+        encoding = GSM7
+        units = [2 if char in GSM7_EXTENDED else 1 for char in text]
+    else:
+        encoding = UCS2
+        units = [len(char.encode('utf-16-be')) // 2 for char in text]
+
+    total = sum(units)
+    if total <= SINGLE_LIMITS[encoding]:
+        return {'encoding': encoding, 'segments': 1, 'units': total}
+
+    # ✂️ کاراکترهای دو واحدی (ESC یا surrogate pair) بین دو بخش تقسیم نمی‌شوند
+    limit = PART_LIMITS[encoding]
+    segments, size = 1, 0
+    for unit in units:
+        if size + unit > limit:
+            segments += 1
+            size = 0
+        size += unit
+    return {'encoding': encoding, 'segments': segments, 'units': total}
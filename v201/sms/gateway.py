@@ -0,0 +1,319 @@
+"""
+🔌 کلاینت HTTP مشترک سرور SMS (SIM800C) - HomayOMS
+♻️ یک requests.Session با keep-alive و connection pool برای هر پردازه؛ هر پیام یک رفت‌وبرگشت است نه دو اتصال جدید
+🩺 وضعیت سلامت با TTL کوتاه کش می‌شود و از نتیجه ارسال‌ها به صورت غیرفعال به‌روزرسانی می‌شود
+⚡ circuit breaker: پس از چند خطای پیاپی، ارسال‌ها تا پایان زمان استراحت بدون تماس شبکه‌ای رد می‌شوند
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    ⚡ سرور SMS در وضعیت قطع (circuit open) است - درخواستی ارسال نشد
+    """
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"SMS server circuit is open, retry in {retry_after:.0f} seconds")
+
+
+class CircuitBreaker:
+    """
+    ⚡ circuit breaker سه وضعیتی
+
+    🟢 closed: درخواست‌ها عادی ارسال می‌شوند و خطاهای پیاپی شمرده می‌شوند
+    🔴 open: پس از failure_threshold خطای پیاپی، تا reset_timeout ثانیه همه درخواست‌ها رد می‌شوند
+    🟡 half_open: پس از reset_timeout فقط یک درخواست آزمایشی عبور می‌کند؛ موفقیت آن مدار را می‌بندد
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold or getattr(settings, 'SMS_CIRCUIT_FAILURE_THRESHOLD', 3)
+        self.reset_timeout = reset_timeout or getattr(settings, 'SMS_CIRCUIT_RESET_SECONDS', 30)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    def is_open(self):
+        """
+        🔴 آیا درخواست‌ها فعلاً رد می‌شوند؟ (بدون مصرف فرصت درخواست آزمایشی)
+        """
+        with self._lock:
+            state = self._current_state()
+            return state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight)
+
+    def retry_after(self):
+        """
+        ⏳ ثانیه‌های باقی‌مانده تا امکان ارسال درخواست آزمایشی
+        """
+        with self._lock:
+            if self._opened_at is None or self._current_state() == self.CLOSED:
+                return 0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow_request(self):
+        """
+        🚦 اجازه ارسال یک درخواست؛ در half_open فقط یک درخواست آزمایشی مجاز است
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("SMS server circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        f"SMS server circuit opened after {self._failures} consecutive failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'times_opened': self.times_opened,
+            }
+
+
+class SMSGatewayClient:
+    """
+    🔌 کلاینت مشترک سرور SMS با connection pool، کش سلامت و circuit breaker
+
+    🔧 استفاده:
+        gateway = get_gateway_client(base_url, api_key, timeout)
+        response = gateway.post('/api/v1/verify/send', {...})  # CircuitOpenError در وضعیت قطع
+        healthy, data = gateway.check_health()
+    """
+
+    LATENCY_SAMPLES = 200
+
+    def __init__(self, base_url, api_key, timeout, pool_size=None, health_ttl=None, health_timeout=None,
+                 breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size or getattr(settings, 'SMS_HTTP_POOL_SIZE', 4)
+        self.health_ttl = health_ttl if health_ttl is not None else getattr(settings, 'SMS_HEALTH_CACHE_TTL', 15)
+        self.health_timeout = health_timeout or getattr(settings, 'SMS_HEALTH_TIMEOUT', 3)
+        self.breaker = breaker or CircuitBreaker()
+        self.session = self._build_session()
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self._health = None
+        self._health_checked = 0
+        self.stats = {'requests': 0, 'failures': 0, 'rejected': 0, 'health_checks': 0}
+        self.last_error = None
+        self.last_error_at = None
+
+    def _build_session(self):
+        session = requests.Session()
+        session.headers.update({
+            "Content-Type": "application/json",
+            "X-API-Key": self.api_key
+        })
+        # ♻️ یک pool برای یک میزبان؛ تلاش مجدد توسط SMSService/SMSDispatcher انجام می‌شود نه urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        self.session.close()
+
+    def post(self, path, payload, timeout=None):
+        """
+        📡 ارسال POST از طریق نشست مشترک
+
+        ⚡ در وضعیت قطع CircuitOpenError؛ خطای اتصال، timeout و پاسخ 5xx خطای سرور شمرده می‌شوند
+        """
+        return self.request('POST', path, payload, timeout)
+
+    def get(self, path, timeout=None):
+        """
+        🔍 درخواست GET (مثلاً وضعیت job ارسال) با همان breaker و آمار
+        """
+        return self.request('GET', path, timeout=timeout)
+
+    def request(self, method, path, payload=None, timeout=None):
+        if not self.breaker.allow_request():
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise CircuitOpenError(self.breaker.retry_after())
+
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", json=payload, timeout=timeout or self.timeout)
+        except Exception as e:
+            self._record_outcome(False, str(e))
+            raise
+
+        latency = time.monotonic() - started
+        with self._lock:
+            self._latencies.append(latency)
+        if response.status_code >= 500:
+            self._record_outcome(False, f"HTTP {response.status_code}")
+        else:
+            self._record_outcome(True)
+        return response
+
+    def _record_outcome(self, ok, error=None):
+        """
+        🩺 ثبت نتیجه یک درخواست در breaker و کش سلامت (به‌روزرسانی غیرفعال)
+        """
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+        with self._lock:
+            self.stats['requests'] += 1
+            if ok:
+                data = self._health[1] if self._health and self._health[0] else {'status': 'healthy'}
+                self._health = (True, data)
+            else:
+                self.stats['failures'] += 1
+                self.last_error = error
+                self.last_error_at = timezone.now()
+                self._health = (False, f"SMS server error: {error}")
+            self._health_checked = time.monotonic()
+
+    def check_health(self, force=False):
+        """
+        🩺 وضعیت سلامت سرور SMS
+
+        🧠 نتیجه تا SMS_HEALTH_CACHE_TTL ثانیه (یا آخرین ارسال) از کش برگردانده می‌شود؛
+        در وضعیت قطع بدون تماس شبکه‌ای ناسالم گزارش می‌شود مگر force=True باشد
+        """
+        with self._lock:
+            if not force and self._health is not None and time.monotonic() - self._health_checked < self.health_ttl:
+                return self._health
+
+        if not force and self.breaker.is_open():
+            return False, f"Circuit open: SMS server unavailable, retry in {self.breaker.retry_after():.0f} seconds"
+
+        with self._lock:
+            self.stats['health_checks'] += 1
+        try:
+            response = self.session.get(f"{self.base_url}/health", timeout=self.health_timeout)
+        except requests.RequestException as e:
+            logger.error(f"SMS server health check failed: {e}")
+            self._record_outcome(False, str(e))
+            return self._health
+
+        if response.status_code != 200:
+            health = (False, f"Server returned status code: {response.status_code}")
+        else:
+            try:
+                health = (True, response.json())
+            except ValueError:
+                health = (False, "Invalid JSON response from SMS server")
+
+        if health[0]:
+            self.breaker.record_success()
+        elif response.status_code >= 500:
+            self.breaker.record_failure()
+        with self._lock:
+            self._health = health
+            self._health_checked = time.monotonic()
+        return health
+
+    def get_stats(self):
+        """
+        📊 وضعیت breaker، تاخیر ارسال‌ها و آخرین وضعیت سلامت برای صفحه health
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self.stats)
+            health = self._health
+            health_age = time.monotonic() - self._health_checked if health is not None else None
+
+        def ms(seconds):
+            return round(seconds * 1000, 1)
+
+        stats.update({
+            'base_url': self.base_url,
+            'pool_size': self.pool_size,
+            'circuit': self.breaker.get_stats(),
+            'retry_after': round(self.breaker.retry_after(), 1),
+            'latency_samples': len(latencies),
+            'latency_avg_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'latency_p95_ms': ms(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]) if latencies else None,
+            'latency_max_ms': ms(latencies[-1]) if latencies else None,
+            'last_error': self.last_error,
+            'last_error_at': self.last_error_at,
+            'healthy': health[0] if health is not None else None,
+            'health_age_seconds': round(health_age, 1) if health_age is not None else None,
+        })
+        return stats
+
+
+_gateway_client = None
+_gateway_client_lock = threading.Lock()
+
+
+def get_gateway_client(base_url, api_key, timeout):
+    """
+    🔌 دریافت کلاینت مشترک سرور SMS (یکی برای هر پردازه)
+
+    🔄 اگر آدرس، کلید API یا timeout تغییر کند (مثلاً ویرایش SMSSettings) کلاینت جدید ساخته می‌شود
+    """
+    global _gateway_client
+    with _gateway_client_lock:
+        client = _gateway_client
+        if client is None or (client.base_url, client.api_key, client.timeout) != (base_url.rstrip('/'), api_key, timeout):
+            if client is not None:
+                client.close()
+            _gateway_client = client = SMSGatewayClient(base_url, api_key, timeout)
+        return client
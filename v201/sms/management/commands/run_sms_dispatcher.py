@@ -0,0 +1,46 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from sms.services import SMSDispatcher
+
+
+class Command(BaseCommand):
+    help = 'ارسال پیامک‌های صف (outbox) به سرور SMS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='ارسال پیام‌های آماده فعلی و خروج',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='فاصله بررسی صف خالی (ثانیه)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='تعداد پیام‌های برداشت شده در هر دور',
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        dispatcher = SMSDispatcher(worker_id, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'📤 SMS dispatcher {worker_id} started'))
+
+        try:
+            while True:
+                processed = dispatcher.run_once()
+                if processed:
+                    self.stdout.write(f'📨 {processed} پیام پردازش شد')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('🛑 SMS dispatcher stopped'))
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cancel_stale_pending(apps, schema_editor):
+    """
+    پیام‌های PENDING قدیمی (ارسال همزمان قطع شده) نباید توسط dispatcher جدید ارسال شوند
+    """
+    SMSMessage = apps.get_model('sms', 'SMSMessage')
+    SMSMessage.objects.filter(status='PENDING').update(
+        status='CANCELLED',
+        error_message='Cancelled when the SMS outbox was introduced',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms', '0003_smssettings_sms_message_format'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsmessage',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='تعداد تلاش\u200cهای ارسال انجام شده', verbose_name='تعداد تلاش'),
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='پیامی که تا این زمان ارسال نشود لغو می\u200cشود (مثلاً کد تایید منقضی)', null=True, verbose_name='زمان انقضا'),
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='locked_by',
+            field=models.CharField(blank=True, default='', help_text='dispatcher ای که پیام را در حال ارسال دارد', max_length=100, verbose_name='dispatcher'),
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='پس از این زمان، پیام رها شده دوباره قابل برداشت است', null=True, verbose_name='قفل تا'),
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='پیام تا این زمان برای ارسال مجدد منتظر می\u200cماند (backoff)', null=True, verbose_name='زمان تلاش بعدی'),
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=20, help_text='عدد کمتر زودتر ارسال می\u200cشود (کد تایید قبل از اطلاع\u200cرسانی)', verbose_name='اولویت'),
+        ),
+        migrations.AddIndex(
+            model_name='smsmessage',
+            index=models.Index(fields=['status', 'priority', 'next_attempt_at'], name='sms_smsmess_status_2e04e6_idx'),
+        ),
+        migrations.RunPython(cancel_stale_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+# 🧊 نسخه ثابت sms.encoding در زمان این migration - تغییرات بعدی انکودر نباید رفتار آن را عوض کند
+GSM7_BASIC = frozenset(
+    '@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !"#¤%&\'()*+,-./0123456789:;<=>?'
+    '¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà'
+)
+GSM7_EXTENDED = frozenset('\f^{}\\[~]|€')
+SINGLE_LIMITS = {'GSM7': 160, 'UCS2': 70}
+PART_LIMITS = {'GSM7': 153, 'UCS2': 67}
+
+
+def estimate_segments(text):
+    text = text or ''
+    if all(char in GSM7_BASIC or char in GSM7_EXTENDED for char in text):
+        encoding = 'GSM7'
+        units = [2 if char in GSM7_EXTENDED else 1 for char in text]
+    else:
+        encoding = 'UCS2'
+        units = [len(char.encode('utf-16-be')) // 2 for char in text]
+
+    if sum(units) <= SINGLE_LIMITS[encoding]:
+        return {'encoding': encoding, 'segments': 1}
+
+    limit = PART_LIMITS[encoding]
+    segments, size = 1, 0
+    for unit in units:
+        if size + unit > limit:
+            segments += 1
+            size = 0
+        size += unit
+    return {'encoding': encoding, 'segments': segments}
+
+
+def backfill_segments(apps, schema_editor):
+    """
+    🔢 محاسبه کدگذاری و تعداد بخش پیام‌های موجود
+    """
+    SMSMessage = apps.get_model('sms', 'SMSMessage')
+    batch = []
+    for message in SMSMessage.objects.only('id', 'message_content').iterator(chunk_size=500):
+        estimate = estimate_segments(message.message_content)
+        message.encoding = estimate['encoding']
+        message.segments = estimate['segments']
+        batch.append(message)
+        if len(batch) >= 500:
+            SMSMessage.objects.bulk_update(batch, ['encoding', 'segments'])
+            batch = []
+    SMSMessage.objects.bulk_update(batch, ['encoding', 'segments'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms', '0004_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsmessage',
+            name='encoding',
+            field=models.CharField(blank=True, choices=[('GSM7', 'GSM 7-bit'), ('UCS2', 'UCS-2')], default='', help_text='GSM 7-bit برای متن لاتین، UCS-2 برای متن فارسی', max_length=4, verbose_name='کدگذاری'),
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='segments',
+            field=models.PositiveSmallIntegerField(default=1, help_text='تعداد پیامک\u200cهای به هم پیوسته\u200cای که این پیام مصرف می\u200cکند', verbose_name='تعداد بخش'),
+        ),
+        migrations.RunPython(backfill_segments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms', '0005_message_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsmessage',
+            name='remote_job_id',
+            field=models.PositiveIntegerField(blank=True, help_text='شناسه پیام در صف مودم سرور SMS (پاسخ 202)', null=True, verbose_name='شناسه job سرور SMS'),
+        ),
+        migrations.AlterField(
+            model_name='smsmessage',
+            name='status',
+            field=models.CharField(choices=[('PENDING', '⏳ در انتظار'), ('QUEUED_REMOTE', '📡 در صف مودم'), ('SENT', '✅ ارسال شده'), ('DELIVERED', '📨 تحویل داده شده'), ('FAILED', '❌ ناموفق'), ('CANCELLED', '🚫 لغو شده')], default='PENDING', help_text='وضعیت فعلی پیام', max_length=20, verbose_name='وضعیت'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_remote_queued_at(apps, schema_editor):
+    SMSMessage = apps.get_model('sms', 'SMSMessage')
+    SMSMessage.objects.filter(status='QUEUED_REMOTE').update(remote_queued_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms', '0006_remote_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsmessage',
+            name='remote_queued_at',
+            field=models.DateTimeField(blank=True, help_text='پس از SMS_REMOTE_MAX_AGE_SECONDS بدون نتیجه، پیام ناموفق ثبت می\u200cشود', null=True, verbose_name='زمان سپردن به صف مودم'),
+        ),
+        migrations.RunPython(backfill_remote_queued_at, migrations.RunPython.noop),
+    ]
@@ -74,6 +74,7 @@ class SMSMessage(BaseModel):
     """
     STATUS_CHOICES = [
         ('PENDING', '⏳ در انتظار'),
+        ('QUEUED_REMOTE', '📡 در صف مودم'),
         ('SENT', '✅ ارسال شده'),
         ('DELIVERED', '📨 تحویل داده شده'),
         ('FAILED', '❌ ناموفق'),
@@ -182,6 +183,88 @@ class SMSMessage(BaseModel):
         help_text="اطلاعات اضافی مرتبط با پیام"
     )
     
+    # 🔢 هزینه ارسال - پیش از ثبت در صف تخمین زده می‌شود (sms.encoding.estimate_segments)
+    encoding = models.CharField(
+        max_length=4,
+        choices=[('GSM7', 'GSM 7-bit'), ('UCS2', 'UCS-2')],
+        blank=True,
+        default='',
+        verbose_name="کدگذاری",
+        help_text="GSM 7-bit برای متن لاتین، UCS-2 برای متن فارسی"
+    )
+    
+    segments = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="تعداد بخش",
+        help_text="تعداد پیامک‌های به هم پیوسته‌ای که این پیام مصرف می‌کند"
+    )
+    
+    # 📤 صف ارسال (outbox) - پیام‌های PENDING توسط dispatcher ارسال می‌شوند
+    priority = models.PositiveSmallIntegerField(
+        default=20,
+        verbose_name="اولویت",
+        help_text="عدد کمتر زودتر ارسال می‌شود (کد تایید قبل از اطلاع‌رسانی)"
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="تعداد تلاش",
+        help_text="تعداد تلاش‌های ارسال انجام شده"
+    )
+    
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="زمان تلاش بعدی",
+        help_text="پیام تا این زمان برای ارسال مجدد منتظر می‌ماند (backoff)"
+    )
+    
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="زمان انقضا",
+        help_text="پیامی که تا این زمان ارسال نشود لغو می‌شود (مثلاً کد تایید منقضی)"
+    )
+    
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="dispatcher",
+        help_text="dispatcher ای که پیام را در حال ارسال دارد"
+    )
+    
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="قفل تا",
+        help_text="پس از این زمان، پیام رها شده دوباره قابل برداشت است"
+    )
+    
+    # 📡 job صف مودم در سرور SMS - وضعیت نهایی با پرسش از status_url آن ثبت می‌شود
+    remote_job_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="شناسه job سرور SMS",
+        help_text="شناسه پیام در صف مودم سرور SMS (پاسخ 202)"
+    )
+    
+    remote_queued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="زمان سپردن به صف مودم",
+        help_text="پس از SMS_REMOTE_MAX_AGE_SECONDS بدون نتیجه، پیام ناموفق ثبت می‌شود"
+    )
+    
+    # 🎯 اولویت پیش‌فرض هر نوع پیام
+    TYPE_PRIORITIES = {
+        'VERIFICATION': 0,
+        'PAYMENT': 10,
+        'ORDER_STATUS': 10,
+        'NOTIFICATION': 20,
+        'MARKETING': 30,
+    }
+    
     class Meta:
         verbose_name = "پیام پیامک"
         verbose_name_plural = "پیام‌های پیامک"
@@ -191,15 +274,36 @@ class SMSMessage(BaseModel):
             models.Index(fields=['status']),
             models.Index(fields=['message_type']),
             models.Index(fields=['tracking_id']),
+            models.Index(fields=['status', 'priority', 'next_attempt_at']),  # 📤 برداشت از صف
         ]
     
     def __str__(self):
         return f"{self.phone_number} - {self.get_message_type_display()} ({self.get_status_display()})"
     
+    @classmethod
+    def priority_for(cls, message_type):
+        """اولویت پیش‌فرض برای نوع پیام"""
+        return cls.TYPE_PRIORITIES.get(message_type, cls.TYPE_PRIORITIES['NOTIFICATION'])
+    
     def mark_as_sent(self, api_response=None):
         """علامت‌گذاری پیام به عنوان ارسال شده"""
         self.status = 'SENT'
         self.sent_at = timezone.now()
+        self.locked_by = ''
+        self.locked_until = None
+        if api_response:
+            self.api_response = api_response
+        self.save()
+    
+    def mark_as_queued_remote(self, job_id, next_check_at, api_response=None):
+        """📡 پیام به صف مودم سرور SMS سپرده شد - ارسال واقعی هنوز انجام نشده است"""
+        if self.status != 'QUEUED_REMOTE':
+            self.remote_queued_at = timezone.now()
+        self.status = 'QUEUED_REMOTE'
+        self.remote_job_id = job_id
+        self.next_attempt_at = next_check_at
+        self.locked_by = ''
+        self.locked_until = None
         if api_response:
             self.api_response = api_response
         self.save()
@@ -214,6 +318,19 @@ class SMSMessage(BaseModel):
         """علامت‌گذاری پیام به عنوان ناموفق"""
         self.status = 'FAILED'
         self.error_message = error_message
+        self.locked_by = ''
+        self.locked_until = None
+        if api_response:
+            self.api_response = api_response
+        self.save()
+    
+    def schedule_retry(self, error_message, next_attempt_at, api_response=None):
+        """⏳ بازگرداندن پیام به صف برای تلاش مجدد پس از backoff"""
+        self.status = 'PENDING'
+        self.error_message = error_message
+        self.next_attempt_at = next_attempt_at
+        self.locked_by = ''
+        self.locked_until = None
         if api_response:
             self.api_response = api_response
         self.save()
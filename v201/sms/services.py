@@ -5,11 +5,15 @@
 
 import requests
 import logging
+import time
 from django.utils import timezone
+from django.db.models import Q, Sum
 from django.conf import settings
 from datetime import timedelta
 import random
 import string
+from .encoding import estimate_segments
+from .gateway import CircuitOpenError, get_gateway_client
 from .models import SMSMessage, SMSVerification, SMSTemplate, SMSSettings
 
 logger = logging.getLogger(__name__)
@@ -72,139 +76,227 @@ class SMSService:
         
         return phone
     
-    def check_server_health(self):
+    @property
+    def gateway(self):
+        """
+        🔌 کلاینت مشترک سرور SMS (connection pool، کش سلامت و circuit breaker)
+        """
+        return get_gateway_client(self.base_url, self.api_key, self.timeout)
+    
+    def check_server_health(self, force=False):
         """
         بررسی سلامت سرور SMS
+        
+        🧠 نتیجه برای مدت کوتاهی کش می‌شود و با هر ارسال به‌روز می‌شود؛ force=True سرور را مستقیماً بررسی می‌کند
         """
-        try:
-            url = f"{self.base_url}/health"
-            response = requests.get(url, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return True, data
-            else:
-                return False, f"Server returned status code: {response.status_code}"
-                
-        except requests.RequestException as e:
-            logger.error(f"SMS server health check failed: {e}")
-            return False, f"Connection error: {str(e)}"
+        return self.gateway.check_health(force=force)
     
-    def send_sms(self, phone_number, message, message_type='NOTIFICATION', user=None, template=None, extra_data=None):
+    def enqueue_sms(self, phone_number, message, message_type='NOTIFICATION', user=None, template=None,
+                    extra_data=None, expires_at=None):
         """
-        ارسال پیامک با مدیریت خطاهای پیشرفته
+        📤 ثبت پیام در صف ارسال (outbox) - بدون هیچ درخواست شبکه‌ای
+        🔢 کدگذاری و تعداد بخش پیام همین‌جا تخمین زده و ذخیره می‌شود
         """
-        # فرمت کردن شماره تلفن
-        formatted_phone = self.format_phone_number(phone_number)
-        
-        # ایجاد رکورد پیام
-        sms_message = SMSMessage.objects.create(
-            phone_number=formatted_phone,
+        estimate = estimate_segments(message)
+        return SMSMessage.objects.create(
+            phone_number=self.format_phone_number(phone_number),
             message_content=message,
             message_type=message_type,
+            encoding=estimate['encoding'],
+            segments=estimate['segments'],
+            priority=SMSMessage.priority_for(message_type),
             user=user,
             template=template,
             extra_data=extra_data or {},
+            expires_at=expires_at,
             status='PENDING'
         )
+    
+    def send_sms(self, phone_number, message, message_type='NOTIFICATION', user=None, template=None, extra_data=None,
+                 expires_at=None):
+        """
+        ارسال پیامک با مدیریت خطاهای پیشرفته
         
-        # بررسی سلامت سرور SMS قبل از ارسال
-        if not self.check_server_health():
-            error_msg = "SMS server is not available"
-            sms_message.mark_as_failed(error_msg)
-            logger.error(f"SMS server health check failed for {formatted_phone}")
-            return False, sms_message, error_msg
-        
-        # آماده‌سازی درخواست
-        url = f"{self.base_url}/api/v1/verify/send"
-        headers = {
-            "Content-Type": "application/json",
-            "X-API-Key": self.api_key
-        }
-        data = {
-            "phone_number": formatted_phone,
-            "message": message
-        }
+        📤 با SMS_ASYNC_DISPATCH (پیش‌فرض) پیام فقط در صف ثبت می‌شود و فوراً برمی‌گردد؛
+        دستور run_sms_dispatcher آن را ارسال و نتیجه را در SMSMessage ثبت می‌کند
+        """
+        sms_message = self.enqueue_sms(phone_number, message, message_type, user, template, extra_data, expires_at)
         
-        # ارسال با تلاش‌های مجدد
+        if getattr(settings, 'SMS_ASYNC_DISPATCH', True):
+            logger.info(f"SMS queued for {sms_message.phone_number} ({message_type})")
+            return True, sms_message, "SMS queued for delivery"
+        
+        return self.send_now(sms_message)
+    
+    def send_sms_now(self, phone_number, message, message_type='NOTIFICATION', user=None, template=None, extra_data=None):
+        """
+        ⚡ ارسال همزمان (برای صفحه تست) - منتظر پاسخ سرور SMS می‌ماند
+        """
+        sms_message = self.enqueue_sms(phone_number, message, message_type, user, template, extra_data)
+        return self.send_now(sms_message)
+    
+    def send_now(self, sms_message):
+        """
+        🔁 ارسال همزمان یک پیام ثبت شده با تلاش‌های مجدد
+        """
+        error_msg = "All retry attempts failed"
         for attempt in range(self.retry_attempts):
+            logger.info(f"Sending SMS attempt {attempt + 1}/{self.retry_attempts} to {sms_message.phone_number}")
+            sms_message.attempts = attempt + 1
+            success, error_msg, retryable, response_data = self.deliver(sms_message)
+            
+            if success:
+                if self.record_accepted(sms_message, response_data):
+                    return self._wait_for_modem(sms_message)
+                return True, sms_message, "SMS sent successfully"
+            
+            sms_message.mark_as_failed(error_msg, response_data)
+            if not retryable or self.gateway.breaker.is_open():
+                # ⚡ پس از باز شدن circuit breaker منتظر ماندن برای تلاش بعدی فایده‌ای ندارد
+                return False, sms_message, error_msg
+            
+            if attempt < self.retry_attempts - 1:
+                delay = self.get_retry_delay(attempt + 1)
+                logger.info(f"Retrying SMS send to {sms_message.phone_number} in {delay:.0f} seconds...")
+                time.sleep(delay)
+        
+        return False, sms_message, error_msg
+    
+    def _wait_for_modem(self, sms_message):
+        """
+        ⏳ انتظار همزمان برای نتیجه صف مودم (حداکثر SMS_REMOTE_WAIT_SECONDS)
+        
+        📡 اگر مودم تا آن زمان نتیجه نداد پیام QUEUED_REMOTE می‌ماند و SMSDispatcher (run_sms_dispatcher)
+        نتیجه نهایی را ثبت می‌کند
+        """
+        poll_seconds = getattr(settings, 'SMS_REMOTE_POLL_SECONDS', 2)
+        deadline = time.monotonic() + getattr(settings, 'SMS_REMOTE_WAIT_SECONDS', 60)
+        while time.monotonic() + poll_seconds <= deadline:
+            time.sleep(poll_seconds)
             try:
-                logger.info(f"Sending SMS attempt {attempt + 1}/{self.retry_attempts} to {formatted_phone}")
-                
-                response = requests.post(url, json=data, headers=headers, timeout=self.timeout)
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    
-                    if response_data.get('success'):
-                        # موفقیت
-                        sms_message.mark_as_sent(response_data)
-                        logger.info(f"SMS sent successfully to {formatted_phone}")
-                        return True, sms_message, "SMS sent successfully"
-                    else:
-                        # خطای API
-                        error_msg = response_data.get('message', 'Unknown API error')
-                        sms_message.mark_as_failed(error_msg, response_data)
-                        logger.error(f"SMS API error for {formatted_phone}: {error_msg}")
-                        return False, sms_message, error_msg
-                        
-                else:
-                    # خطای HTTP
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-                    sms_message.mark_as_failed(error_msg, {'status_code': response.status_code})
-                    logger.error(f"SMS HTTP error for {formatted_phone}: {error_msg}")
-                    
-                    if attempt < self.retry_attempts - 1:
-                        logger.info(f"Retrying SMS send to {formatted_phone} in 3 seconds...")
-                        import time
-                        time.sleep(3)
-                        continue
-                    else:
-                        return False, sms_message, error_msg
-                        
-            except requests.exceptions.ConnectionError as e:
-                # خطای اتصال شبکه
-                error_msg = f"Network connection error: Unable to reach SMS server"
-                sms_message.mark_as_failed(error_msg)
-                logger.error(f"SMS connection error for {formatted_phone}: {error_msg}")
-                
-                if attempt < self.retry_attempts - 1:
-                    logger.info(f"Retrying SMS send to {formatted_phone} in 3 seconds...")
-                    import time
-                    time.sleep(3)
-                    continue
-                else:
-                    return False, sms_message, error_msg
-                    
-            except requests.exceptions.Timeout as e:
-                # خطای timeout
-                error_msg = f"Request timeout: SMS server is not responding"
-                sms_message.mark_as_failed(error_msg)
-                logger.error(f"SMS timeout error for {formatted_phone}: {error_msg}")
-                
-                if attempt < self.retry_attempts - 1:
-                    logger.info(f"Retrying SMS send to {formatted_phone} in 3 seconds...")
-                    import time
-                    time.sleep(3)
-                    continue
-                else:
-                    return False, sms_message, error_msg
-                    
-            except requests.RequestException as e:
-                # سایر خطاهای requests
-                error_msg = f"Request error: {str(e)}"
-                sms_message.mark_as_failed(error_msg)
-                logger.error(f"SMS request error for {formatted_phone}: {error_msg}")
-                
-                if attempt < self.retry_attempts - 1:
-                    logger.info(f"Retrying SMS send to {formatted_phone} in 3 seconds...")
-                    import time
-                    time.sleep(3)
-                    continue
-                else:
-                    return False, sms_message, error_msg
+                state, error_msg, response_data = self.fetch_remote_status(sms_message)
+            except CircuitOpenError:
+                break
+            if state == 'SENT':
+                sms_message.mark_as_sent(response_data)
+                return True, sms_message, "SMS sent successfully"
+            if state == 'FAILED':
+                sms_message.mark_as_failed(error_msg, response_data)
+                return False, sms_message, error_msg
+        return True, sms_message, "SMS queued on the modem"
+    
+    def get_retry_delay(self, attempts):
+        """
+        ⏳ backoff نمایی با jitter برای تلاش شماره attempts
+        """
+        base = getattr(settings, 'SMS_RETRY_BACKOFF_SECONDS', 5)
+        cap = getattr(settings, 'SMS_RETRY_BACKOFF_MAX_SECONDS', 300)
+        return min(cap, base * (2 ** (attempts - 1))) + random.uniform(0, base)
+    
+    def deliver(self, sms_message):
+        """
+        📡 یک تلاش ارسال برای پیام
+        
+        📤 خروجی: (موفق؟, پیام خطا, قابل تلاش مجدد؟, پاسخ API)
+        ⚡ در وضعیت قطع circuit breaker فوراً ناموفق و غیرقابل تلاش مجدد برمی‌گردد
+        """
+        data = {
+            "phone_number": sms_message.phone_number,
+            "message": sms_message.message_content
+        }
         
-        return False, sms_message, "All retry attempts failed"
+        try:
+            response = self.gateway.post("/api/v1/verify/send", data)
+        except CircuitOpenError as e:
+            # ⚡ سرور در وضعیت قطع است - بدون تماس شبکه‌ای و بدون تلاش مجدد فوری
+            logger.warning(f"SMS to {sms_message.phone_number} not attempted: {e}")
+            return False, str(e), False, {'circuit_open': True, 'retry_after': round(e.retry_after)}
+        except requests.exceptions.ConnectionError:
+            # خطای اتصال شبکه
+            error_msg = "Network connection error: Unable to reach SMS server"
+            logger.error(f"SMS connection error for {sms_message.phone_number}: {error_msg}")
+            return False, error_msg, True, None
+        except requests.exceptions.Timeout:
+            # خطای timeout
+            error_msg = "Request timeout: SMS server is not responding"
+            logger.error(f"SMS timeout error for {sms_message.phone_number}: {error_msg}")
+            return False, error_msg, True, None
+        except requests.RequestException as e:
+            # سایر خطاهای requests
+            error_msg = f"Request error: {str(e)}"
+            logger.error(f"SMS request error for {sms_message.phone_number}: {error_msg}")
+            return False, error_msg, True, None
+        
+        # 📥 202: سرور SMS پیام را فقط در صف مودم ثبت کرده است (job_id در پاسخ) - record_accepted
+        if response.status_code not in (200, 202):
+            # خطای HTTP
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+            logger.error(f"SMS HTTP error for {sms_message.phone_number}: {error_msg}")
+            return False, error_msg, True, {'status_code': response.status_code}
+        
+        try:
+            response_data = response.json()
+        except ValueError:
+            return False, "Invalid JSON response from SMS server", True, {'status_code': response.status_code}
+        
+        if response_data.get('success'):
+            logger.info(f"SMS accepted by SMS server for {sms_message.phone_number}")
+            return True, None, False, response_data
+        
+        # خطای API - تلاش مجدد فایده‌ای ندارد
+        error_msg = response_data.get('message', 'Unknown API error')
+        logger.error(f"SMS API error for {sms_message.phone_number}: {error_msg}")
+        return False, error_msg, False, response_data
+    
+    def record_accepted(self, sms_message, response_data):
+        """
+        ✅ ثبت پاسخ موفق سرور SMS
+        
+        📡 اگر سرور job_id برگرداند پیام فقط در صف مودم است: وضعیت QUEUED_REMOTE تا SMSDispatcher
+        نتیجه نهایی را از status_url بخواند؛ سرورهای قدیمی (بدون job_id) مستقیماً SENT ثبت می‌شوند
+        خروجی: آیا پیام در صف مودم سپرده شد؟
+        """
+        job_id = (response_data or {}).get('job_id')
+        if job_id is None:
+            sms_message.mark_as_sent(response_data)
+            return False
+        
+        next_check_at = timezone.now() + timedelta(seconds=getattr(settings, 'SMS_REMOTE_POLL_SECONDS', 2))
+        sms_message.mark_as_queued_remote(job_id, next_check_at, response_data)
+        logger.info(f"SMS {sms_message.tracking_id} queued on the modem as job {job_id}")
+        return True
+    
+    def fetch_remote_status(self, sms_message):
+        """
+        🔍 خواندن وضعیت job صف مودم از سرور SMS
+        
+        📤 خروجی: (وضعیت, پیام خطا, پاسخ API) - وضعیت 'SENT'، 'FAILED' یا None (هنوز در صف / سرور در دسترس نیست)
+        ⚡ در وضعیت قطع circuit breaker خطای CircuitOpenError بالا می‌رود
+        """
+        path = sms_message.api_response.get('status_url') or f"/api/v1/verify/status/{sms_message.remote_job_id}"
+        try:
+            response = self.gateway.get(path)
+        except requests.RequestException as e:
+            logger.warning(f"Could not read SMS job {sms_message.remote_job_id} status: {e}")
+            return None, f"Request error: {str(e)}", None
+        
+        if response.status_code == 404:
+            # 🗑️ job در سرور SMS وجود ندارد (مثلاً پایگاه داده سرور پاک شده) - دیگر ارسال نخواهد شد
+            return 'FAILED', f"SMS server job {sms_message.remote_job_id} not found", None
+        if response.status_code != 200:
+            return None, f"HTTP {response.status_code}: {response.text}", None
+        
+        try:
+            job = response.json()
+        except ValueError:
+            return None, "Invalid JSON response from SMS server", None
+        
+        response_data = {**sms_message.api_response, 'job': job}
+        if job.get('status') == 'success':
+            return 'SENT', None, response_data
+        if job.get('status') == 'failed':
+            return 'FAILED', job.get('error_message') or 'SMS sending failed on the modem', response_data
+        return None, None, None
     
     def send_customer_activation_notification(self, customer, activated_by=None):
         """
@@ -451,7 +543,8 @@ Quality • Trust • Excellence"""
             message=message,
             message_type='VERIFICATION',
             user=user,
-            extra_data={'verification_code': verification_code}
+            extra_data={'verification_code': verification_code},
+            expires_at=expires_at
         )
         
         # مرتبط کردن پیامک با کد تایید
@@ -551,6 +644,10 @@ Quality • Trust • Excellence"""
         successful_messages = SMSMessage.objects.filter(status='SENT').count()
         delivered_messages = SMSMessage.objects.filter(status='DELIVERED').count()
         failed_messages = SMSMessage.objects.filter(status='FAILED').count()
+        # 🔢 تعداد پیامک‌های واقعی (بخش‌ها) ارسال شده یا در صف
+        total_segments = SMSMessage.objects.filter(
+            status__in=['PENDING', 'QUEUED_REMOTE', 'SENT', 'DELIVERED']
+        ).aggregate(total=Sum('segments'))['total'] or 0
         
         success_rate = (successful_messages / total_messages * 100) if total_messages > 0 else 0
         delivery_rate = (delivered_messages / successful_messages * 100) if successful_messages > 0 else 0
@@ -560,6 +657,7 @@ Quality • Trust • Excellence"""
             'successful_messages': successful_messages,
             'delivered_messages': delivered_messages,
             'failed_messages': failed_messages,
+            'total_segments': total_segments,
             'success_rate': round(success_rate, 2),
             'delivery_rate': round(delivery_rate, 2)
         }
@@ -655,6 +753,176 @@ class SMSNotificationService:
             return False, f"Notification error: {str(e)}"
 
 
+class SMSDispatcher:
+    """
+    📤 ارسال‌کننده صف پیامک (outbox)
+    
+    🎯 پیام‌های PENDING به ترتیب اولویت (کد تایید قبل از اطلاع‌رسانی) برداشت می‌شوند؛
+    برداشت با UPDATE شرطی (lease) انجام می‌شود تا چند dispatcher همزمان یک پیام را دوبار نفرستند
+    🔁 خطاهای موقت با backoff نمایی دوباره در صف قرار می‌گیرند و نتیجه در SMSMessage ثبت می‌شود
+    📡 پیام‌های سپرده شده به صف مودم (QUEUED_REMOTE) هر SMS_REMOTE_POLL_SECONDS از سرور SMS پرسیده می‌شوند
+    تا SENT یا FAILED (با fallback کد تایید) ثبت شوند
+    
+    🔧 استفاده:
+        dispatcher = SMSDispatcher(worker_id='host:1234')
+        dispatcher.run_once()
+    """
+    
+    def __init__(self, worker_id, sms_service=None, batch_size=None):
+        self.worker_id = worker_id
+        self.sms_service = sms_service or get_sms_service()
+        self.batch_size = batch_size or getattr(settings, 'SMS_DISPATCH_BATCH_SIZE', 5)
+        self.lease_seconds = getattr(settings, 'SMS_DISPATCH_LEASE_SECONDS', 120)
+        self.remote_poll_seconds = getattr(settings, 'SMS_REMOTE_POLL_SECONDS', 2)
+        self.remote_max_age = getattr(settings, 'SMS_REMOTE_MAX_AGE_SECONDS', 900)
+    
+    def cancel_expired(self, now=None):
+        """
+        🚫 لغو پیام‌هایی که پیش از ارسال منقضی شده‌اند (مثلاً کد تایید منقضی)
+        📡 پیام‌های منقضی در صف مودم هم دیگر پرسیده نمی‌شوند
+        """
+        now = now or timezone.now()
+        return SMSMessage.objects.filter(status__in=['PENDING', 'QUEUED_REMOTE'], expires_at__lte=now).update(
+            status='CANCELLED',
+            error_message='Expired before it could be delivered',
+            locked_by='',
+            locked_until=None,
+            updated_at=now,
+        )
+    
+    def claim_batch(self):
+        """
+        📥 برداشت دسته‌ای از پیام‌های آماده ارسال با بالاترین اولویت
+        """
+        now = timezone.now()
+        self.cancel_expired(now)
+        return self._claim('PENDING', now)
+    
+    def claim_remote_batch(self):
+        """
+        📡 برداشت پیام‌های در صف مودم که زمان پرسیدن وضعیتشان رسیده است
+        """
+        return self._claim('QUEUED_REMOTE', timezone.now())
+    
+    def _claim(self, status, now):
+        available = SMSMessage.objects.filter(status=status).filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+        ).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+        )
+        ids = list(available.order_by('priority', 'created_at').values_list('id', flat=True)[:self.batch_size])
+        if not ids:
+            return []
+        
+        lease = now + timedelta(seconds=self.lease_seconds)
+        available.filter(id__in=ids).update(locked_by=self.worker_id, locked_until=lease)
+        return list(
+            SMSMessage.objects.filter(id__in=ids, locked_by=self.worker_id, locked_until=lease)
+            .order_by('priority', 'created_at')
+        )
+    
+    def dispatch(self, sms_message):
+        """
+        📡 یک تلاش ارسال و ثبت نتیجه (ارسال شده، تلاش مجدد یا ناموفق)
+        
+        ⚡ اگر circuit breaker باز باشد تلاشی مصرف نمی‌شود: کد تایید به fallback می‌رود (در صورت فعال بودن)
+        و بقیه پیام‌ها تا زمان درخواست آزمایشی بعدی در صف می‌مانند
+        """
+        gateway = self.sms_service.gateway
+        if gateway.breaker.is_open():
+            return self._defer(sms_message, gateway.breaker.retry_after())
+        
+        sms_message.attempts += 1
+        success, error_msg, retryable, response_data = self.sms_service.deliver(sms_message)
+        
+        if success:
+            self.sms_service.record_accepted(sms_message, response_data)
+        elif retryable and sms_message.attempts < self.sms_service.retry_attempts:
+            next_attempt_at = timezone.now() + timedelta(seconds=self.sms_service.get_retry_delay(sms_message.attempts))
+            sms_message.schedule_retry(error_msg, next_attempt_at, response_data)
+            logger.info(f"SMS {sms_message.tracking_id} will be retried at {next_attempt_at}")
+        else:
+            self._fail(sms_message, error_msg, response_data)
+        return sms_message
+    
+    def check_remote(self, sms_message):
+        """
+        🔍 ثبت نتیجه نهایی پیام سپرده شده به صف مودم (ارسال شده، ناموفق یا پرسش دوباره)
+        """
+        try:
+            state, error_msg, response_data = self.sms_service.fetch_remote_status(sms_message)
+        except CircuitOpenError as e:
+            if sms_message.message_type == 'VERIFICATION' and self._fallback_enabled():
+                self._fail(sms_message, str(e), None)
+                return sms_message
+            state, error_msg, response_data = None, str(e), None
+            next_check_at = timezone.now() + timedelta(seconds=max(self.remote_poll_seconds, e.retry_after))
+        else:
+            next_check_at = timezone.now() + timedelta(seconds=self.remote_poll_seconds)
+        
+        if state == 'SENT':
+            sms_message.mark_as_sent(response_data)
+        elif state == 'FAILED':
+            logger.warning(f"SMS {sms_message.tracking_id} failed on the modem: {error_msg}")
+            self._fail(sms_message, error_msg, response_data)
+        elif self._remote_too_old(sms_message):
+            error_msg = f"SMS server did not report a result within {self.remote_max_age} seconds"
+            logger.warning(f"SMS {sms_message.tracking_id}: {error_msg}")
+            self._fail(sms_message, error_msg, None)
+        else:
+            sms_message.mark_as_queued_remote(sms_message.remote_job_id, next_check_at)
+        return sms_message
+    
+    def _remote_too_old(self, sms_message):
+        queued_at = sms_message.remote_queued_at
+        return queued_at is not None and timezone.now() - queued_at > timedelta(seconds=self.remote_max_age)
+    
+    def _defer(self, sms_message, retry_after):
+        """
+        ⏸️ بازگرداندن پیام به صف تا پایان وضعیت قطع سرور SMS
+        """
+        error_msg = f"SMS server circuit is open, retry in {retry_after:.0f} seconds"
+        if sms_message.message_type == 'VERIFICATION' and self._fallback_enabled():
+            self._fail(sms_message, error_msg, None)
+            return sms_message
+        next_attempt_at = timezone.now() + timedelta(seconds=max(1, retry_after))
+        sms_message.schedule_retry(error_msg, next_attempt_at)
+        return sms_message
+    
+    def _fallback_enabled(self):
+        return getattr(self.sms_service.settings, 'sms_fallback_to_fake', False)
+    
+    def _fail(self, sms_message, error_msg, response_data):
+        """
+        ❌ شکست نهایی - کد تایید در حالت fallback به صورت fake ارسال شده علامت می‌خورد
+        """
+        if sms_message.message_type == 'VERIFICATION' and self._fallback_enabled():
+            logger.warning(f"SMS failed for {sms_message.phone_number}, using fake SMS fallback")
+            sms_message.extra_data = {**sms_message.extra_data, 'is_fake': True, 'delivery_error': error_msg}
+            sms_message.mark_as_sent()
+            return
+        sms_message.mark_as_failed(error_msg, response_data)
+    
+    def run_once(self):
+        """
+        🔄 ارسال یک دسته - تعداد پیام‌های پردازش شده را برمی‌گرداند
+        """
+        batch = self.claim_batch()
+        for sms_message in batch:
+            try:
+                self.dispatch(sms_message)
+            except Exception as e:
+                logger.error(f"Error dispatching SMS {sms_message.tracking_id}: {e}")
+        
+        remote_batch = self.claim_remote_batch()
+        for sms_message in remote_batch:
+            try:
+                self.check_remote(sms_message)
+            except Exception as e:
+                logger.error(f"Error checking SMS {sms_message.tracking_id} on the modem queue: {e}")
+        return len(batch) + len(remote_batch)
+
+
 # نمونه‌های جهانی برای استفاده آسان (lazy initialization)
 _sms_service = None
 _sms_notification_service = None
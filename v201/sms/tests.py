@@ -0,0 +1,294 @@
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from sms.encoding import estimate_segments
+from sms.gateway import CircuitBreaker, CircuitOpenError, SMSGatewayClient
+from sms.models import SMSMessage, SMSSettings
+from sms.services import SMSDispatcher, SMSService
+
+
+class SMSOutboxTest(TestCase):
+    """Test the SMS outbox and its dispatcher"""
+
+    def setUp(self):
+        self.sms_service = SMSService()
+        self.sms_service.retry_attempts = 2
+
+    def dispatcher(self, worker_id='worker-1'):
+        return SMSDispatcher(worker_id, sms_service=self.sms_service, batch_size=5)
+
+    @override_settings(SMS_ASYNC_DISPATCH=True)
+    def test_send_sms_only_enqueues(self):
+        with mock.patch.object(SMSService, 'deliver') as deliver:
+            success, sms_message, result = self.sms_service.send_sms('09120000701', 'hello')
+
+        deliver.assert_not_called()
+        self.assertTrue(success)
+        self.assertEqual((sms_message.status, sms_message.phone_number), ('PENDING', '+989120000701'))
+
+    def test_verification_is_dispatched_first(self):
+        self.sms_service.enqueue_sms('09120000702', 'news', 'NOTIFICATION')
+        self.sms_service.enqueue_sms('09120000703', 'code : 123456', 'VERIFICATION')
+
+        batch = self.dispatcher().claim_batch()
+
+        self.assertEqual([m.message_type for m in batch], ['VERIFICATION', 'NOTIFICATION'])
+        self.assertEqual(self.dispatcher('worker-2').claim_batch(), [])
+
+    def test_success_and_backoff_retries(self):
+        sent = self.sms_service.enqueue_sms('09120000704', 'ok')
+        flaky = self.sms_service.enqueue_sms('09120000705', 'flaky')
+        outcomes = {
+            sent.pk: (True, None, False, {'success': True}),
+            flaky.pk: (False, 'Request timeout: SMS server is not responding', True, None),
+        }
+
+        with mock.patch.object(SMSService, 'deliver', side_effect=lambda m: outcomes[m.pk]):
+            self.assertEqual(self.dispatcher().run_once(), 2)
+            flaky.refresh_from_db()
+            self.assertEqual((flaky.status, flaky.attempts), ('PENDING', 1))
+            self.assertGreater(flaky.next_attempt_at, timezone.now())
+            # backoff: not claimable until next_attempt_at
+            self.assertEqual(self.dispatcher().run_once(), 0)
+
+            SMSMessage.objects.filter(pk=flaky.pk).update(next_attempt_at=timezone.now())
+            self.dispatcher().run_once()
+
+        sent.refresh_from_db()
+        flaky.refresh_from_db()
+        self.assertEqual(sent.status, 'SENT')
+        self.assertEqual((flaky.status, flaky.attempts), ('FAILED', 2))
+
+    def test_expired_verification_is_cancelled(self):
+        expired = self.sms_service.enqueue_sms('09120000706', 'code : 654321', 'VERIFICATION',
+                                               expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.dispatcher().claim_batch(), [])
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'CANCELLED')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_response(status_code=200, payload=None):
+    response = mock.Mock(status_code=status_code, text='')
+    response.json.return_value = payload or {}
+    return response
+
+
+class SMSGatewayClientTest(TestCase):
+    """Test the pooled gateway client, its health cache and circuit breaker"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+        self.gateway = SMSGatewayClient('http://sms.test/', 'key', 5, health_ttl=15, breaker=self.breaker)
+
+    def test_session_is_pooled_and_authenticated(self):
+        adapter = self.gateway.session.get_adapter('http://sms.test/api/v1/verify/send')
+
+        self.assertEqual(adapter._pool_maxsize, self.gateway.pool_size)
+        self.assertEqual(self.gateway.session.headers['X-API-Key'], 'key')
+
+    def test_breaker_opens_and_probes_after_reset(self):
+        with mock.patch.object(self.gateway.session, 'request', side_effect=requests.ConnectionError('down')) as post:
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectionError):
+                    self.gateway.post('/api/v1/verify/send', {})
+            with self.assertRaises(CircuitOpenError):
+                self.gateway.post('/api/v1/verify/send', {})
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(self.gateway.get_stats()['circuit']['state'], 'open')
+
+        self.clock.now += 30
+        with mock.patch.object(self.gateway.session, 'request', return_value=fake_response(payload={'success': True})):
+            self.gateway.post('/api/v1/verify/send', {})
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_health_is_cached_and_updated_by_sends(self):
+        with mock.patch.object(self.gateway.session, 'get', return_value=fake_response(payload={'status': 'ok'})) as get:
+            self.assertEqual(self.gateway.check_health(), (True, {'status': 'ok'}))
+            self.assertEqual(self.gateway.check_health(), (True, {'status': 'ok'}))
+        self.assertEqual(get.call_count, 1)
+
+        with mock.patch.object(self.gateway.session, 'request', return_value=fake_response(503)):
+            self.gateway.post('/api/v1/verify/send', {})
+        with mock.patch.object(self.gateway.session, 'get') as get:
+            healthy, status = self.gateway.check_health()
+        get.assert_not_called()
+        self.assertFalse(healthy)
+        self.assertEqual(self.gateway.get_stats()['latency_samples'], 1)
+
+    def test_open_circuit_skips_health_request(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.clock.now += 1
+        self.gateway.health_ttl = 0
+
+        with mock.patch.object(self.gateway.session, 'get') as get:
+            healthy, status = self.gateway.check_health()
+
+        get.assert_not_called()
+        self.assertFalse(healthy)
+        self.assertIn('Circuit open', status)
+
+    def test_dispatcher_defers_while_circuit_is_open(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        SMSSettings.get_settings()
+        SMSSettings.objects.filter(id=1).update(sms_fallback_to_fake=True)
+        sms_service = SMSService()
+        notification = sms_service.enqueue_sms('09120000711', 'news', 'NOTIFICATION')
+        verification = sms_service.enqueue_sms('09120000712', 'code : 111111', 'VERIFICATION')
+
+        with mock.patch.object(SMSService, 'gateway', new_callable=mock.PropertyMock, return_value=self.gateway), \
+                mock.patch.object(self.gateway.session, 'request') as post:
+            self.assertEqual(SMSDispatcher('worker-1', sms_service=sms_service).run_once(), 2)
+
+        post.assert_not_called()
+        notification.refresh_from_db()
+        verification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('PENDING', 0))
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(verification.status, 'SENT')
+        self.assertTrue(verification.extra_data['is_fake'])
+
+
+
+class SMSRemoteJobTest(TestCase):
+    """Test messages handed off to the SMS server's modem queue (HTTP 202)"""
+
+    def setUp(self):
+        self.gateway = SMSGatewayClient('http://sms.test/', 'key', 5, breaker=CircuitBreaker(3, 30))
+        gateway_patch = mock.patch.object(SMSService, 'gateway', new_callable=mock.PropertyMock,
+                                          return_value=self.gateway)
+        gateway_patch.start()
+        self.addCleanup(gateway_patch.stop)
+        self.sms_service = SMSService()
+
+    def run_dispatcher(self, *responses):
+        with mock.patch.object(self.gateway.session, 'request', side_effect=list(responses)) as request:
+            SMSDispatcher('worker-1', sms_service=self.sms_service).run_once()
+        SMSMessage.objects.update(next_attempt_at=timezone.now())
+        return request
+
+    def hand_off(self, message_type='NOTIFICATION', job_id=7):
+        sms_message = self.sms_service.enqueue_sms('09120000731', 'code : 222222', message_type)
+        self.run_dispatcher(fake_response(202, {
+            'success': True, 'job_id': job_id, 'status_url': f'/api/v1/verify/status/{job_id}',
+        }))
+        sms_message.refresh_from_db()
+        self.assertEqual((sms_message.status, sms_message.remote_job_id), ('QUEUED_REMOTE', job_id))
+        return sms_message
+
+    def test_queued_job_is_polled_until_sent(self):
+        sms_message = self.hand_off()
+
+        request = self.run_dispatcher(fake_response(200, {'job_id': 7, 'status': 'sending'}))
+        self.assertEqual(request.call_args.args, ('GET', 'http://sms.test/api/v1/verify/status/7'))
+        sms_message.refresh_from_db()
+        self.assertEqual(sms_message.status, 'QUEUED_REMOTE')
+
+        self.run_dispatcher(fake_response(200, {'job_id': 7, 'status': 'success'}))
+        sms_message.refresh_from_db()
+        self.assertEqual(sms_message.status, 'SENT')
+        self.assertEqual(sms_message.api_response['job']['status'], 'success')
+
+    def test_modem_failure_is_written_back(self):
+        sms_message = self.hand_off()
+
+        self.run_dispatcher(fake_response(200, {'job_id': 7, 'status': 'failed', 'error_message': 'Signal too weak'}))
+
+        sms_message.refresh_from_db()
+        self.assertEqual((sms_message.status, sms_message.error_message), ('FAILED', 'Signal too weak'))
+
+    def test_modem_failure_falls_back_for_verification(self):
+        SMSSettings.get_settings()
+        SMSSettings.objects.filter(id=1).update(sms_fallback_to_fake=True)
+        sms_message = self.hand_off('VERIFICATION')
+
+        self.run_dispatcher(fake_response(404))
+
+        sms_message.refresh_from_db()
+        self.assertEqual(sms_message.status, 'SENT')
+        self.assertTrue(sms_message.extra_data['is_fake'])
+        self.assertIn('not found', sms_message.extra_data['delivery_error'])
+
+    def test_expired_queued_job_is_cancelled(self):
+        sms_message = self.hand_off('VERIFICATION')
+        SMSMessage.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        request = self.run_dispatcher()
+
+        request.assert_not_called()
+        sms_message.refresh_from_db()
+        self.assertEqual(sms_message.status, 'CANCELLED')
+
+    @override_settings(SMS_REMOTE_MAX_AGE_SECONDS=60)
+    def test_job_lost_by_the_server_is_failed_after_max_age(self):
+        sms_message = self.hand_off()
+        SMSMessage.objects.update(remote_queued_at=timezone.now() - timedelta(seconds=61))
+
+        self.run_dispatcher(fake_response(200, {'job_id': 7, 'status': 'queued'}))
+
+        sms_message.refresh_from_db()
+        self.assertEqual(sms_message.status, 'FAILED')
+        self.assertIn('60 seconds', sms_message.error_message)
+
+    @override_settings(SMS_REMOTE_POLL_SECONDS=0)
+    def test_send_now_waits_for_the_modem(self):
+        sms_message = self.sms_service.enqueue_sms('09120000731', 'code : 222222')
+        responses = [
+            fake_response(202, {'success': True, 'job_id': 8, 'status_url': '/api/v1/verify/status/8'}),
+            fake_response(200, {'job_id': 8, 'status': 'sending'}),
+            fake_response(200, {'job_id': 8, 'status': 'success'}),
+        ]
+        with mock.patch.object(self.gateway.session, 'request', side_effect=responses):
+            success, sms_message, message = self.sms_service.send_now(sms_message)
+
+        self.assertTrue(success)
+        self.assertEqual((sms_message.status, message), ('SENT', 'SMS sent successfully'))
+
+    @override_settings(SMS_REMOTE_POLL_SECONDS=0, SMS_REMOTE_WAIT_SECONDS=0)
+    def test_send_now_leaves_slow_jobs_to_the_dispatcher(self):
+        sms_message = self.sms_service.enqueue_sms('09120000731', 'code : 222222')
+        response = fake_response(202, {'success': True, 'job_id': 9, 'status_url': '/api/v1/verify/status/9'})
+        with mock.patch.object(self.gateway.session, 'request', return_value=response):
+            success, sms_message, message = self.sms_service.send_now(sms_message)
+
+        self.assertTrue(success)
+        self.assertEqual((sms_message.status, message), ('QUEUED_REMOTE', 'SMS queued on the modem'))
+
+
+class SMSSegmentEstimateTest(TestCase):
+    """Test the segment cost estimate stored before queueing"""
+
+    def test_gsm7_and_ucs2_limits(self):
+        self.assertEqual(estimate_segments('x' * 160), {'encoding': 'GSM7', 'segments': 1, 'units': 160})
+        self.assertEqual(estimate_segments('x' * 161)['segments'], 2)
+        self.assertEqual(estimate_segments('{' * 80)['units'], 160)
+        self.assertEqual(estimate_segments('ک' * 70), {'encoding': 'UCS2', 'segments': 1, 'units': 70})
+        self.assertEqual(estimate_segments('ک' * 71)['segments'], 2)
+        self.assertEqual(estimate_segments('ک' * 134)['segments'], 2)
+        self.assertEqual(estimate_segments('ک' * 135)['segments'], 3)
+
+    def test_escape_pairs_are_not_split(self):
+        # 152 septets, then a two-septet character that must start the second part
+        self.assertEqual(estimate_segments('x' * 152 + '€' + 'x' * 10)['segments'], 2)
+        self.assertEqual(estimate_segments('x' * 152 + '€' + 'x' * 152)['segments'], 3)
+
+    def test_enqueue_stores_estimate(self):
+        sms_message = SMSService().enqueue_sms('09120000721', 'کد تایید شما: ۱۲۳۴۵۶ ' * 5, 'VERIFICATION')
+
+        sms_message.refresh_from_db()
+        self.assertEqual((sms_message.encoding, sms_message.segments), ('UCS2', 2))
@@ -484,9 +484,9 @@ def test_sms_view(request):
                 messages.error(request, 'لطفاً شماره تلفن و پیام را وارد کنید')
                 return render(request, 'sms/test_sms.html')
             
-            # ارسال پیام تست
+            # ارسال پیام تست (همزمان تا نتیجه واقعی سرور نمایش داده شود)
             sms_service = get_sms_service()
-            success, sms_message, result = sms_service.send_sms(
+            success, sms_message, result = sms_service.send_sms_now(
                 phone_number=phone_number,
                 message=message,
                 message_type='NOTIFICATION',
@@ -519,11 +519,24 @@ def test_sms_view(request):
 def health_check_view(request):
     """
     🔍 بررسی سلامت سرور SMS
+    
+    🔄 ?refresh=1 سرور را مستقیماً بررسی می‌کند (در غیر این صورت وضعیت کش شده نمایش داده می‌شود)
+    📊 ?format=json وضعیت circuit breaker و تاخیر ارسال‌ها را به صورت JSON برمی‌گرداند
     """
     try:
         # بررسی سلامت سرور
         sms_service = get_sms_service()
-        server_healthy, server_status = sms_service.check_server_health()
+        server_healthy, server_status = sms_service.check_server_health(force=request.GET.get('refresh') == '1')
+        
+        # ⚡ وضعیت circuit breaker و تاخیر ارسال‌ها در این پردازه
+        gateway_stats = sms_service.gateway.get_stats()
+        
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'server_healthy': server_healthy,
+                'server_status': server_status,
+                'gateway': gateway_stats,
+            })
         
         # آمار کلی
         stats = sms_service.get_statistics()
@@ -531,6 +544,7 @@ def health_check_view(request):
         context = {
             'server_healthy': server_healthy,
             'server_status': server_status,
+            'gateway_stats': gateway_stats,
             'stats': stats,
         }
         
@@ -93,20 +93,74 @@ document.addEventListener('DOMContentLoaded', function () {
         updateSelectionCount('cash');
         updateSelectionCount('credit');
         updateProductCounts();
-        // Add row click functionality
-        const stockRows = document.querySelectorAll('.stock-row');
-        stockRows.forEach(row => {
-            row.addEventListener('click', function (e) {
-                if (!e.target.closest('.quantity-controls')) {
-                    const plusBtn = this.querySelector('.plus-btn');
-                    if (plusBtn) {
-                        handleQuantityChange(plusBtn);
-                    }
+        initializeRowClicks();
+        initializeCatalogueLazyLoad();
+    });
+});
+
+// Add row click functionality
+function initializeRowClicks(stockRows = document.querySelectorAll('.stock-row')) {
+    stockRows.forEach(row => {
+        row.addEventListener('click', function (e) {
+            if (!e.target.closest('.quantity-controls')) {
+                const plusBtn = this.querySelector('.plus-btn');
+                if (plusBtn) {
+                    handleQuantityChange(plusBtn);
                 }
-            });
+            }
         });
     });
-});
+}
+
+// Lazy catalogue loading: fetch the next page of rows when the end of a table scrolls into view
+function initializeCatalogueLazyLoad() {
+    const sentinels = document.querySelectorAll('.catalogue-sentinel');
+    if (!sentinels.length || !('IntersectionObserver' in window)) {
+        return;
+    }
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                loadNextCataloguePage(document.getElementById(entry.target.dataset.table), observer, entry.target);
+            }
+        });
+    }, { rootMargin: '300px' });
+    sentinels.forEach(sentinel => observer.observe(sentinel));
+}
+
+async function loadNextCataloguePage(table, observer, sentinel) {
+    const cursor = table && table.dataset.nextCursor;
+    if (!cursor) {
+        observer.unobserve(sentinel);
+        return;
+    }
+    if (table.dataset.loading === '1') {
+        return;
+    }
+    table.dataset.loading = '1';
+    try {
+        const params = new URLSearchParams({ layout: 'row', section: table.dataset.section, cursor: cursor });
+        const response = await fetch(`/core/api/catalogue/?${params}`);
+        const data = response.ok ? await response.json() : null;
+        if (!data || !data.success) {
+            table.dataset.nextCursor = '';
+            return;
+        }
+        const tbody = table.querySelector('tbody');
+        const template = document.createElement('tbody');
+        template.innerHTML = data.html;
+        const rows = Array.from(template.children);
+        rows.forEach(row => tbody.appendChild(row));
+        rows.forEach(row => initializeSelectionButtons(row));
+        initializeRowClicks(rows);
+        table.dataset.nextCursor = data.next_cursor || '';
+        updateCashPurchaseStatus();
+    } catch (error) {
+        console.warn('⚠️ Could not load more products:', error);
+    } finally {
+        table.dataset.loading = '';
+    }
+}
 
 // Toggle mobile menu
 function toggleMenu() {
@@ -159,8 +213,8 @@ function showAlert(message, type = 'info', title = '') {
     return createPopup(message, type, title, 3000);
 }
 // Product selection functions
-function initializeSelectionButtons() {
-    const selectionButtons = document.querySelectorAll('.selection-btn');
+function initializeSelectionButtons(root = document) {
+    const selectionButtons = root.querySelectorAll('.selection-btn');
     selectionButtons.forEach(button => {
         button.addEventListener('click', function (e) {
             e.preventDefault();
@@ -168,7 +222,7 @@ function initializeSelectionButtons() {
             handleSelectionButtonClick(this);
         });
     });
-    const checkboxes = document.querySelectorAll('.stock-checkbox');
+    const checkboxes = root.querySelectorAll('.stock-checkbox');
     checkboxes.forEach(checkbox => {
         checkbox.addEventListener('change', function () {
             handleCheckboxChange(this);
@@ -259,20 +313,16 @@ function updateSelectionCount(section) {
     }
 }
 function updateProductCounts() {
-    // Count only selectable products (exclude un-priced products)
-    const cashRows = document.querySelectorAll('#cashStockTable .stock-row:not(.un-priced-row)');
-    const cashCount = cashRows.length;
-    const cashTotalElement = document.getElementById('cashTotalCount');
-    if (cashTotalElement) {
-        cashTotalElement.textContent = cashCount;
-    }
-    
-    const creditRows = document.querySelectorAll('#creditStockTable .stock-row:not(.un-priced-row)');
-    const creditCount = creditRows.length;
-    const creditTotalElement = document.getElementById('creditTotalCount');
-    if (creditTotalElement) {
-        creditTotalElement.textContent = creditCount;
-    }
+    // Total comes from the server (rows are loaded page by page); fall back to counting selectable rows
+    ['cash', 'credit'].forEach(section => {
+        const table = document.getElementById(section + 'StockTable');
+        const totalElement = document.getElementById(section + 'TotalCount');
+        if (!table || !totalElement) {
+            return;
+        }
+        const rows = table.querySelectorAll('.stock-row:not(.un-priced-row)');
+        totalElement.textContent = table.dataset.totalCount || rows.length;
+    });
 }
 function getTotalSelectedProducts() {
     return selectedItems.cash + selectedItems.credit;
@@ -0,0 +1,38 @@
+/**
+ * ⏳ Polling helper for background inventory sync jobs
+ * 📡 Views answer 202 with a status_url; this polls it until the job finishes
+ */
+
+function waitForSyncJob(statusUrl, onProgress, intervalMs = 1500) {
+    return new Promise((resolve, reject) => {
+        async function poll() {
+            try {
+                const response = await fetch(statusUrl, {headers: {'Accept': 'application/json'}});
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                const data = await response.json();
+                if (data.finished) {
+                    resolve(data);
+                    return;
+                }
+                if (onProgress) {
+                    onProgress(data.job, data.message);
+                }
+                setTimeout(poll, intervalMs);
+            } catch (error) {
+                reject(error);
+            }
+        }
+        poll();
+    });
+}
+
+function updateLoadingProgress(prefix) {
+    return (job) => {
+        const message = document.getElementById('loadingMessage');
+        if (message) {
+            message.textContent = `${prefix} (${job.progress_done}/${job.progress_total} - ${job.progress_percent}%)`;
+        }
+    };
+}